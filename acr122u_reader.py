@@ -1,3 +1,4 @@
+import logging
 import time
 from typing import Optional
 
@@ -6,10 +7,22 @@ from smartcard.util import toHexString
 from smartcard.CardConnection import CardConnection
 import smartcard
 
+from card_monitor import CardPresenceMonitor
+from observability import SAMPLED, TAP_TO_READ_SECONDS
+from tap_debouncer import TapDebouncer
+
+logger = logging.getLogger(__name__)
+
 class ACR122UReader:
-    def __init__(self):
+    def __init__(self, event_driven: bool = True, hold_off: float = 0.75):
         self.reader = None
         self.connection = None
+        # Con event_driven, wait_for_card espera notificaciones PC/SC en vez de sondear
+        self.event_driven = event_driven
+        self.hold_off = hold_off
+        self.monitor = None
+        # wait_for_card solo devuelve tarjetas recién llegadas, no la que sigue apoyada
+        self.debouncer = TapDebouncer(hold_off)
         self.initialize_reader()
 
     # ---------- util ----------
@@ -24,39 +37,39 @@ class ACR122UReader:
         try:
             available_readers = readers()
             if not available_readers:
-                print("❌ No se encontraron lectores ACR122U conectados")
+                logger.error("❌ No se encontraron lectores ACR122U conectados")
                 return False
 
-            print(f"✅ Lectores encontrados: {len(available_readers)}")
+            logger.info("✅ Lectores encontrados: %d", len(available_readers))
             for i, r in enumerate(available_readers):
-                print(f"  {i+1}. {r}")
+                logger.info("  %d. %s", i + 1, r)
 
             self.reader = available_readers[0]
-            print(f"🔌 Lector seleccionado: {self.reader}")
+            logger.info("🔌 Lector seleccionado: %s", self.reader)
             return True
         except Exception as e:
-            print(f"❌ Error inicializando lector: {e}")
+            logger.error("❌ Error inicializando lector: %s", e)
             return False
 
     def connect_to_reader(self) -> bool:
         """Conecta al lector ACR122U usando T=1 (contactless)."""
         try:
             if not self.reader:
-                print("❌ Lector no inicializado")
+                logger.error("❌ Lector no inicializado")
                 return False
 
             self.connection = self.reader.createConnection()
             # CLAVE: T=1 para el ACR122U PICC interface
             self.connection.connect(CardConnection.T1_protocol)
-            print("✅ Conectado al ACR122U (T=1) – listo para leer tarjetas")
+            logger.info("✅ Conectado al ACR122U (T=1) – listo para leer tarjetas")
             return True
 
         except smartcard.Exceptions.NoCardException:
             # Normal cuando aún no hay tarjeta
-            print("🔴 No hay tarjeta en el lector – coloque una tarjeta NFC")
+            logger.info("🔴 No hay tarjeta en el lector – coloque una tarjeta NFC", extra=SAMPLED)
             return False
         except Exception as e:
-            print(f"❌ Error conectando al lector: {e}")
+            logger.error("❌ Error conectando al lector: %s", e)
             return False
 
     # ---------- lectura ----------
@@ -69,11 +82,13 @@ class ACR122UReader:
 
             # APDU para obtener UID (ACR122U)
             get_uid = [0xFF, 0xCA, 0x00, 0x00, 0x00]
+            start = time.perf_counter()
             data, sw1, sw2 = self.connection.transmit(get_uid)
 
             if (sw1, sw2) == (0x90, 0x00):
+                TAP_TO_READ_SECONDS.observe(time.perf_counter() - start)
                 uid_hex = self._normalize_uid(data)
-                print(f"✅ Tarjeta detectada: UID {uid_hex}")
+                logger.info("✅ Tarjeta detectada: UID %s", uid_hex, extra=SAMPLED)
                 return uid_hex
             else:
                 # 63 00 u otro: no hay tarjeta o fallo en operación
@@ -82,54 +97,79 @@ class ACR122UReader:
         except smartcard.Exceptions.NoCardException:
             return None
         except smartcard.Exceptions.CardConnectionException as e:
-            print(f"⚠️  Conexión caída, reintentando: {e}")
+            logger.warning("⚠️  Conexión caída, reintentando: %s", e)
             self.connection = None
             return None
         except Exception as e:
-            print(f"⚠️  Error leyendo tarjeta: {e}")
+            logger.warning("⚠️  Error leyendo tarjeta: %s", e)
             return None
 
     def wait_for_card(self, timeout: int = 30) -> Optional[str]:
         """Espera una tarjeta hasta 'timeout' segundos y devuelve el UID."""
-        print("\n🎫 COLOCA UNA TARJETA NFC EN EL LECTOR…")
+        logger.info("🎫 COLOCA UNA TARJETA NFC EN EL LECTOR…")
+        if self.event_driven and self.reader:
+            return self._wait_for_card_event(timeout)
+        return self._poll_for_card(timeout)
+
+    def _wait_for_card_event(self, timeout: int) -> Optional[str]:
+        """Espera bloqueando en el cambio de estado del lector (sin sondeo)."""
+        if self.monitor is None:
+            self.monitor = CardPresenceMonitor(readers=[str(self.reader)], hold_off=self.hold_off)
+
+        uid = self.monitor.wait_for_card(timeout)
+        if uid:
+            logger.info("✅ Tarjeta detectada: UID %s", uid, extra=SAMPLED)
+        else:
+            logger.info("⏰ Timeout esperando tarjeta")
+        return uid
+
+    def _poll_for_card(self, timeout: int) -> Optional[str]:
+        """Sondeo clásico: GET UID cada 0.3 s (para lectores sin notificaciones)."""
         start = time.time()
         attempts = 0
+        reader_name = str(self.reader)
 
         while time.time() - start < timeout:
             attempts += 1
 
             if not self.connection:
                 if not self.connect_to_reader():
+                    self.debouncer.lost(reader_name)
                     time.sleep(0.5)
                     continue
 
             uid = self.read_nfc_card()
             if uid:
-                return uid
+                # La misma tarjeta aún apoyada no cuenta como un tap nuevo
+                if any(e.kind == "inserted" for e in self.debouncer.seen(reader_name, uid)):
+                    return uid
+            else:
+                self.debouncer.lost(reader_name)
+            self.debouncer.expire()
 
             if attempts % 10 == 0:
                 elapsed = int(time.time() - start)
-                print(f"⏳ Esperando tarjeta... ({elapsed}/{timeout}s)")
+                logger.debug("⏳ Esperando tarjeta... (%d/%ds)", elapsed, timeout)
 
             time.sleep(0.3)
 
-        print("⏰ Timeout esperando tarjeta")
+        logger.info("⏰ Timeout esperando tarjeta")
         return None
 
     # ---------- pruebas / cierre ----------
     def test_connection_simple(self) -> bool:
         """Conexión básica (negocia protocolo automáticamente)."""
-        print("🧪 PROBANDO CONEXIÓN SIMPLE…")
+        logger.info("🧪 PROBANDO CONEXIÓN SIMPLE…")
         if not self.reader:
-            print("❌ No se detectó el lector")
+            logger.error("❌ No se detectó el lector")
             return False
         try:
             self.connection = self.reader.createConnection()
             self.connection.connect()  # auto-negociación; en ACR122U suele elegir T=1
-            print("✅ Conexión básica establecida")
+            logger.info("✅ Conexión básica establecida")
             return True
         except Exception as e:
-            print(f"🔴 Error en conexión básica: {e}")
+            logger.error("🔴 Error en conexión básica: %s", e)
             return False
 
     def disconnect(self):
@@ -137,6 +177,6 @@ class ACR122UReader:
             if self.connection:
                 self.connection.disconnect()
                 self.connection = None
-                print("🔌 Desconectado del ACR122U")
+                logger.info("🔌 Desconectado del ACR122U")
         except:
             pass
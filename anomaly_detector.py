@@ -0,0 +1,311 @@
+"""Detector de anomalías en streaming sobre los registros de autenticación.
+
+Reglas (cada alerta también cuenta en nfc_anomalies_total{rule}):
+  failed_pin_burst   'burst_failures' intentos fallidos o más de una misma
+                     tarjeta en 'burst_window' segundos.
+  impossible_travel  Una tarjeta en dos dispositivos distintos con menos
+                     de 'min_travel_seconds' entre ambas lecturas.
+  after_hours        Acceso concedido fuera del horario permitido para el
+                     security_level del usuario ('business_hours').
+
+Los eventos se procesan por lotes en columnas NumPy (instante, tarjeta,
+dispositivo, éxito, nivel): cada lote se une a una ventana deslizante con
+los eventos recientes y cada regla es una pasada vectorizada (orden por
+tarjeta e instante + searchsorted/diferencias), sin bucles por fila. Solo
+las alertas, que son pocas, se recorren en Python.
+
+Modos:
+  replay  Recorre el historial de auth_logs en orden cronológico.
+  live    Sigue auth_logs por id (como el feed SSE) y avisa al momento.
+
+Uso:
+  python anomaly_detector.py replay [--db nfc_auth_system.db] [--desde 2025-01-01] [--json]
+  python anomaly_detector.py live [--intervalo 1.0]
+"""
+import argparse
+import json
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+
+import numpy as np
+
+from database import DatabaseManager
+from observability import ANOMALIES, setup_logging
+
+Alert = namedtuple("Alert", ["rule", "nfc_id", "device_id", "timestamp", "log_id", "detail"])
+
+RULES = ("failed_pin_burst", "impossible_travel", "after_hours")
+
+# security_level -> (hora de inicio, hora de fin) en hora local; el nivel
+# más alto configurado vale para los superiores
+DEFAULT_BUSINESS_HOURS = {
+    1: (7, 20),
+    2: (6, 22),
+    3: (0, 24),
+}
+
+
+def local_utc_offset_hours() -> float:
+    return datetime.now(timezone.utc).astimezone().utcoffset().total_seconds() / 3600
+
+
+class _Vocabulary:
+    """Códigos enteros para nfc_id/device_id (las columnas NumPy no guardan cadenas)"""
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def encode(self, values) -> np.ndarray:
+        # Solo se recorren los valores distintos del lote, no las filas
+        uniques, inverse = np.unique(np.asarray(values, dtype=object), return_inverse=True)
+        mapped = np.empty(len(uniques), dtype=np.int64)
+        for i, value in enumerate(uniques):
+            code = self.codes.get(value)
+            if code is None:
+                code = self.codes[value] = len(self.values)
+                self.values.append(value)
+            mapped[i] = code
+        return mapped[inverse.ravel()]
+
+
+class AnomalyDetector:
+    def __init__(self, burst_failures: int = 5, burst_window: float = 60.0,
+                 min_travel_seconds: float = 120.0, business_hours: dict = None,
+                 utc_offset_hours: float = 0.0, cooldown: float = None,
+                 max_buffer: int = 1_000_000):
+        self.burst_failures = burst_failures
+        self.burst_window = burst_window
+        self.min_travel_seconds = min_travel_seconds
+        self.utc_offset_hours = utc_offset_hours
+        # Una alerta por tarjeta y regla mientras dure el mismo episodio
+        self.cooldown = max(burst_window, min_travel_seconds) if cooldown is None else cooldown
+        self.max_buffer = max_buffer
+        self.horizon = max(burst_window, min_travel_seconds)
+
+        # allowed[nivel, hora]: acceso concedido dentro de horario
+        hours = DEFAULT_BUSINESS_HOURS if business_hours is None else business_hours
+        top = max(hours)
+        self._allowed = np.zeros((top + 1, 24), dtype=bool)
+        for level in range(top + 1):
+            start, end = hours.get(level) or hours[min(hours, key=lambda k: abs(k - level))]
+            self._allowed[level, start:end] = True
+
+        self._cards = _Vocabulary()
+        self._devices = _Vocabulary()
+        self._last_alert = {}
+        self.events = 0
+        self.alerts = dict.fromkeys(RULES, 0)
+        self._clear()
+
+    def _clear(self):
+        self._ts = np.empty(0, dtype=np.float64)
+        self._card = np.empty(0, dtype=np.int64)
+        self._device = np.empty(0, dtype=np.int64)
+        self._success = np.empty(0, dtype=bool)
+        self._level = np.empty(0, dtype=np.int64)
+        self._log_id = np.empty(0, dtype=np.int64)
+
+    def process_rows(self, rows):
+        """Lote de tuplas (id, epoch, nfc_id, device_id, éxito, security_level).
+
+        Es el formato de DatabaseManager.iter_auth_events/get_auth_events_after.
+        """
+        if not rows:
+            return []
+        log_id, ts, nfc_id, device_id, success, level = zip(*rows)
+        return self.process(ts, nfc_id, device_id, success, level, log_id)
+
+    def process(self, timestamps, nfc_ids, device_ids, success, security_level, log_ids=None):
+        """Procesar un lote en columnas (epoch UTC en segundos); devuelve las alertas nuevas"""
+        n = len(timestamps)
+        if n == 0:
+            return []
+
+        ts = np.concatenate((self._ts, np.asarray(timestamps, dtype=np.float64)))
+        card = np.concatenate((self._card, self._cards.encode(nfc_ids)))
+        device = np.concatenate((self._device, self._devices.encode(device_ids)))
+        ok = np.concatenate((self._success, np.asarray(success, dtype=bool)))
+        level = np.concatenate((self._level, np.asarray(security_level, dtype=np.int64)))
+        new_log_id = np.full(n, -1, dtype=np.int64) if log_ids is None else np.asarray(log_ids, dtype=np.int64)
+        log_id = np.concatenate((self._log_id, new_log_id))
+        is_new = np.zeros(len(ts), dtype=bool)
+        is_new[len(self._ts):] = True
+
+        # Orden común por (tarjeta, instante); estable para respetar la llegada
+        order = np.lexsort((ts, card))
+        hits = [
+            ("failed_pin_burst", self._failed_pin_bursts(order, ts, card, ok, is_new)),
+            ("impossible_travel", self._impossible_travel(order, ts, card, device, is_new)),
+            ("after_hours", self._after_hours(ts, ok, level, is_new)),
+        ]
+
+        alerts = []
+        for rule, (indices, details) in hits:
+            for index, detail in zip(indices.tolist(), details):
+                alert = self._alert(rule, index, detail, ts, card, device, log_id)
+                if alert is not None:
+                    alerts.append(alert)
+        alerts.sort(key=lambda alert: alert.timestamp)
+
+        # La ventana conserva solo lo que aún puede intervenir en una regla
+        keep = ts >= ts.max() - self.horizon
+        if keep.sum() > self.max_buffer:
+            keep[np.flatnonzero(keep)[:-self.max_buffer]] = False
+        self._ts, self._card, self._device = ts[keep], card[keep], device[keep]
+        self._success, self._level, self._log_id = ok[keep], level[keep], log_id[keep]
+        self.events += n
+        return alerts
+
+    def _failed_pin_bursts(self, order, ts, card, ok, is_new):
+        failed = order[~ok[order]]
+        if len(failed) < self.burst_failures:
+            return np.empty(0, dtype=np.int64), []
+
+        # Clave compuesta tarjeta·K + instante: un único searchsorted busca,
+        # para cada fallo, el primero de su tarjeta dentro de la ventana
+        relative = ts[failed] - ts[failed].min()
+        span = relative.max() + self.burst_window + 1
+        key = card[failed] * span + relative
+        first = np.searchsorted(key, key - self.burst_window, side="right")
+        count = np.arange(len(failed)) - first + 1
+
+        hit = (count >= self.burst_failures) & is_new[failed]
+        details = [f"{c} fallos en {self.burst_window:g} s" for c in count[hit].tolist()]
+        return failed[hit], details
+
+    def _impossible_travel(self, order, ts, card, device, is_new):
+        # Basta comparar lecturas consecutivas de la misma tarjeta: si dos
+        # lecturas cualesquiera violan el intervalo, también lo hace un par
+        # consecutivo entre ellas
+        same_card = card[order[1:]] == card[order[:-1]]
+        moved = device[order[1:]] != device[order[:-1]]
+        gap = ts[order[1:]] - ts[order[:-1]]
+        hit = same_card & moved & (gap < self.min_travel_seconds) & is_new[order[1:]]
+
+        previous = order[:-1][hit]
+        details = [f"{gap_s:g} s desde {self._devices.values[d]}"
+                   for gap_s, d in zip(gap[hit].tolist(), device[previous].tolist())]
+        return order[1:][hit], details
+
+    def _after_hours(self, ts, ok, level, is_new):
+        candidates = np.flatnonzero(is_new & ok)
+        local = ts[candidates] + self.utc_offset_hours * 3600
+        hour = (local // 3600 % 24).astype(np.int64)
+        lvl = np.clip(level[candidates], 0, len(self._allowed) - 1)
+        hit = ~self._allowed[lvl, hour]
+        details = [f"nivel {l} a las {h:02d}h" for l, h in zip(lvl[hit].tolist(), hour[hit].tolist())]
+        return candidates[hit], details
+
+    def _alert(self, rule, index, detail, ts, card, device, log_id):
+        timestamp = float(ts[index])
+        key = (rule, int(card[index]))
+        if rule != "after_hours":
+            last = self._last_alert.get(key)
+            if last is not None and timestamp - last < self.cooldown:
+                return None
+            self._last_alert[key] = timestamp
+
+        self.alerts[rule] += 1
+        ANOMALIES.labels(rule).inc()
+        return Alert(rule, self._cards.values[card[index]], self._devices.values[device[index]],
+                     timestamp, int(log_id[index]) if log_id[index] >= 0 else None, detail)
+
+    def reset(self):
+        """Vaciar la ventana (p. ej. antes de un replay con el mismo detector)"""
+        self._clear()
+        self._last_alert.clear()
+
+
+def format_alert(alert: Alert) -> str:
+    when = datetime.fromtimestamp(alert.timestamp, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    return f"🚨 {when} {alert.rule:<18} {alert.nfc_id} @ {alert.device_id}: {alert.detail}"
+
+
+def alert_to_dict(alert: Alert) -> dict:
+    data = alert._asdict()
+    data['timestamp'] = datetime.fromtimestamp(alert.timestamp, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    return data
+
+
+def replay(db: DatabaseManager, detector: AnomalyDetector, since=None, until=None,
+           chunk_size: int = 20_000):
+    """Alertas del historial en orden cronológico (generador)"""
+    for rows in db.iter_auth_events(chunk_size=chunk_size, since=since, until=until):
+        yield from detector.process_rows(rows)
+
+
+def live(db: DatabaseManager, detector: AnomalyDetector, last_id: int = None,
+         poll_interval: float = 1.0, batch_size: int = 20_000):
+    """Alertas de los registros nuevos según se escriben (generador sin fin)"""
+    if last_id is None:
+        last_id = db.last_auth_log_id()
+    while True:
+        rows = db.get_auth_events_after(last_id, batch_size)
+        if rows:
+            last_id = rows[-1][0]
+            yield from detector.process_rows(rows)
+        if len(rows) < batch_size:
+            time.sleep(poll_interval)
+
+
+def _emit(alerts, as_json: bool):
+    count = 0
+    for alert in alerts:
+        count += 1
+        if as_json:
+            print(json.dumps(alert_to_dict(alert), ensure_ascii=False), flush=True)
+        else:
+            print(format_alert(alert), flush=True)
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Detección de anomalías en auth_logs")
+    parser.add_argument("--db", default="nfc_auth_system.db")
+    parser.add_argument("--fallos", type=int, default=5, help="Fallos de PIN que forman una ráfaga")
+    parser.add_argument("--ventana", type=float, default=60.0, help="Ventana de la ráfaga (s)")
+    parser.add_argument("--traslado", type=float, default=120.0,
+                        help="Tiempo mínimo entre dos dispositivos distintos (s)")
+    parser.add_argument("--utc-offset", type=float, default=local_utc_offset_hours(),
+                        help="Desfase horario local para el horario permitido (horas)")
+    parser.add_argument("--json", action="store_true", help="Una alerta JSON por línea")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("replay", help="Analizar el historial")
+    p.add_argument("--desde")
+    p.add_argument("--hasta")
+
+    p = sub.add_parser("live", help="Vigilar los registros nuevos")
+    p.add_argument("--desde-id", type=int, help="Empezar tras este id de auth_logs")
+    p.add_argument("--intervalo", type=float, default=1.0, help="Segundos entre consultas")
+
+    args = parser.parse_args(argv)
+    # Con --json, stdout queda solo para las alertas
+    setup_logging(stream=sys.stderr if args.json else None)
+    detector = AnomalyDetector(burst_failures=args.fallos, burst_window=args.ventana,
+                               min_travel_seconds=args.traslado, utc_offset_hours=args.utc_offset)
+    db = DatabaseManager(args.db)
+    try:
+        if args.command == "replay":
+            start = time.perf_counter()
+            count = _emit(replay(db, detector, since=args.desde, until=args.hasta), args.json)
+            elapsed = time.perf_counter() - start
+            print(f"✅ {detector.events:,} eventos en {elapsed:.1f} s "
+                  f"({detector.events / max(elapsed, 1e-9):,.0f}/s), {count} alertas: "
+                  + ", ".join(f"{rule} {n}" for rule, n in detector.alerts.items()),
+                  file=sys.stderr)
+        else:
+            print("👀 Vigilando auth_logs (Ctrl+C para salir)", file=sys.stderr)
+            _emit(live(db, detector, last_id=args.desde_id, poll_interval=args.intervalo), args.json)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
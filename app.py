@@ -1,57 +1,150 @@
-from flask import Flask, render_template, request, redirect, url_for
-import time
+from flask import Flask, Response, abort, jsonify, render_template, request, redirect, url_for
+import atexit
 
-app = Flask(__name__)
+from bulk_enrollment import enroll_upload
+from database import DatabaseManager
+from lockout_store import LockoutStore
+from observability import record_auth_result, render_metrics, setup_logging
+from pin_hashing import verify_pin
+from rate_limiter import TokenBucketLimiter, retry_after_header
+from static_assets import StaticAssetCache, configure_jinja
 
-# --- Base de datos temporal en memoria ---
-USUARIOS_DB = {}
+# Logs por una cola, con nivel y muestreo ajustables (NFC_LOG_LEVEL, NFC_LOG_SAMPLE_RATE)
+setup_logging()
 
-# --- Variables Globales para Control de Intentos ---
-intentos_fallidos = {}
+# /static lo sirve StaticAssetCache (recursos precompilados con ETag)
+app = Flask(__name__, static_folder=None)
+
+# --- Páginas y recursos precompilados (python static_assets.py) ---
+# Plantillas minificadas + caché de bytecode; sin recarga salvo en debug
+configure_jinja(app.jinja_env, auto_reload=app.debug)
+recursos_estaticos = StaticAssetCache()
+
+# --- Base de datos SQLite compartida con server.py (con pool de conexiones) ---
+db_manager = DatabaseManager()
+atexit.register(db_manager.close)
+
+# --- Control de Intentos (compartido entre workers, caduca solo) ---
 MAX_INTENTOS = 3
 TIEMPO_BLOQUEO_SEGUNDOS = 300  # 5 minutos
+bloqueos_pin = LockoutStore("nfc_lockouts.db", max_attempts=MAX_INTENTOS,
+                            lockout_seconds=TIEMPO_BLOQUEO_SEGUNDOS)
+atexit.register(bloqueos_pin.close)
+
+# --- Límite de peticiones al endpoint de PIN (token bucket) ---
+# Por dispositivo (cabecera X-Device-ID) y por dirección del cliente;
+# se rechaza con 429 antes de tocar la base de datos. Ajustables con
+# PIN_LIMIT_DEVICE_RATE/_BURST y PIN_LIMIT_IP_RATE/_BURST (p. ej. en pruebas de carga)
+LIMITE_DISPOSITIVO = TokenBucketLimiter.from_env("PIN_LIMIT_DEVICE", rate=1.0, burst=5)
+LIMITE_IP = TokenBucketLimiter.from_env("PIN_LIMIT_IP", rate=2.0, burst=10)
+RUTAS_LIMITADAS = {'verify_manual_login'}
 # ----------------------------------------------------
 
 
+@app.before_request
+def limitar_peticiones():
+    if request.endpoint not in RUTAS_LIMITADAS:
+        return None
+
+    espera = LIMITE_IP.acquire(request.remote_addr)
+    device_id = request.headers.get('X-Device-ID')
+    if not espera and device_id:
+        espera = LIMITE_DISPOSITIVO.acquire(device_id)
+    if not espera:
+        return None
+
+    html = render_template('pin_verification.html',
+                           error_msg="Demasiadas solicitudes. Espere unos segundos.")
+    return html, 429, {'Retry-After': retry_after_header(espera)}
+
+
+def respuesta_precompilada(resultado):
+    if resultado is None:
+        return None
+    estado, cuerpo, cabeceras = resultado
+    return Response(cuerpo, status=estado, headers=cabeceras)
+
+
+def pagina_precompilada(nombre):
+    """Página ya renderizada (200/304 con ETag), o None si no se hizo el build"""
+    return respuesta_precompilada(recursos_estaticos.get_page(
+        nombre, request.headers.get('Accept-Encoding', ''), request.headers.get('If-None-Match')))
+
+
+@app.route('/static/<path:nombre>')
+def recurso_estatico(nombre):
+    respuesta = respuesta_precompilada(recursos_estaticos.get_asset(
+        nombre, request.headers.get('Accept-Encoding', ''), request.headers.get('If-None-Match')))
+    if respuesta is None:
+        abort(404)
+    return respuesta
+
+
 @app.route('/')
 def home():
-    return render_template('Home.html')
+    return pagina_precompilada('Home.html') or render_template('Home.html')
 
 
 @app.route('/registro')
 def registro_usuario():
     mensaje = request.args.get('mensaje')
+    if not mensaje:
+        respuesta = pagina_precompilada('registro_usuario.html')
+        if respuesta is not None:
+            return respuesta
     return render_template('registro_usuario.html', mensaje_exito=mensaje)
 
 
 @app.route('/submit_registro', methods=['POST'])
 def submit_registro():
-    nfc_id = request.form.get('nfc_id').strip().upper()
-    nombre_completo = request.form.get('nombre_completo').strip()
-    departamento = request.form.get('departamento')
-    security_level = request.form.get('security_level')
+    # Campos ausentes llegan como None: mismo mensaje que un campo vacío
+    nfc_id = (request.form.get('nfc_id') or "").strip().upper()
+    nombre_completo = (request.form.get('nombre_completo') or "").strip()
+    departamento = (request.form.get('departamento') or "").strip()
+    security_level = (request.form.get('security_level') or "").strip() or "1"
     pin_correcto = request.form.get('pin_correcto')
 
-    if not (nfc_id and nombre_completo and pin_correcto and len(pin_correcto) == 4):
+    if not (nfc_id and nombre_completo and departamento and pin_correcto
+            and len(pin_correcto) == 4):
         return redirect(url_for('registro_usuario', mensaje="Error: Faltan datos o PIN inválido."))
 
-    if nfc_id in USUARIOS_DB:
-        return redirect(url_for('registro_usuario', mensaje="Error: El UID NFC ya está registrado."))
+    # Mismas reglas que el alta masiva (bulk_enrollment.validate_row)
+    if not security_level.isdigit() or int(security_level) < 1:
+        return redirect(url_for('registro_usuario',
+                                mensaje="Error: El nivel de seguridad debe ser un número mayor que 0."))
 
-    USUARIOS_DB[nfc_id] = {
-        "pin_correcto": pin_correcto,
-        "nombre_completo": nombre_completo,
-        "departamento": departamento,
-        "security_level": security_level,
-    }
+    # Misma tabla nfc_users que server.py; solo se guarda el hash del PIN
+    username = nombre_completo.lower().replace(" ", "")
+    if not db_manager.register_nfc_user(nfc_id, username, nombre_completo, departamento,
+                                        int(security_level), pin=pin_correcto):
+        return redirect(url_for('registro_usuario', mensaje="Error: El UID NFC ya está registrado."))
 
-    print(f"✅ Usuario registrado: {nombre_completo} ({nfc_id})")
     return redirect(url_for('registro_usuario', mensaje=f"Usuario {nombre_completo} registrado correctamente."))
 
 
+@app.route('/registro_masivo', methods=['POST'])
+def registro_masivo():
+    """Alta masiva: fichero CSV/JSONL en el campo 'archivo'; informe JSON por fila"""
+    archivo = request.files.get('archivo')
+    if archivo is None or not archivo.filename:
+        return jsonify({"error": "Falta el fichero 'archivo' (CSV o JSONL)"}), 400
+
+    try:
+        informe = enroll_upload(db_manager, archivo.read(), archivo.filename)
+    except UnicodeDecodeError:
+        return jsonify({"error": "El fichero debe estar en UTF-8"}), 400
+    return jsonify(informe), 200 if not informe['errors'] else 207
+
+
 @app.route('/pin_verification')
 def pin_verification():
-    return render_template('pin_verification.html')
+    return pagina_precompilada('pin_verification.html') or render_template('pin_verification.html')
+
+
+@app.route('/metrics')
+def metrics():
+    cuerpo, tipo = render_metrics()
+    return Response(cuerpo, content_type=tipo)
 
 
 @app.route('/verify_manual_login', methods=['POST'])
@@ -59,29 +152,30 @@ def verify_manual_login():
     nfc_id = request.form.get('nfc_id').strip().upper()
     pin = request.form.get('pin')
 
-    if nfc_id not in USUARIOS_DB:
+    usuario = db_manager.get_user_by_nfc(nfc_id)
+    if usuario is None:
+        record_auth_result(False, "Tarjeta Invalida")
         return render_template('pin_verification.html', error_msg="Usuario no registrado.")
 
-    datos_intento = intentos_fallidos.get(nfc_id, {"intentos": 0, "bloqueado_hasta": 0})
-    ahora = time.time()
-
-    if ahora < datos_intento["bloqueado_hasta"]:
-        minutos_restantes = int((datos_intento["bloqueado_hasta"] - ahora) / 60)
+    # Clave de bloqueo = UID canónico de la fila, igual que en la búsqueda:
+    # "04:a1 b2..." y "04A1B2..." comparten contador
+    nfc_id = usuario['nfc_id']
+    segundos_bloqueo = bloqueos_pin.check(nfc_id)
+    if segundos_bloqueo > 0:
+        record_auth_result(False, "Tarjeta Bloqueada")
+        minutos_restantes = int(segundos_bloqueo / 60)
         return render_template('pin_verification.html', error_msg=f"Cuenta bloqueada. Intente en {minutos_restantes} min.")
 
-    if pin == USUARIOS_DB[nfc_id]["pin_correcto"]:
-        intentos_fallidos.pop(nfc_id, None)
-        nombre = USUARIOS_DB[nfc_id]["nombre_completo"]
+    if verify_pin(pin or "", db_manager.get_pin_hash(nfc_id)):
+        bloqueos_pin.reset(nfc_id)
+        record_auth_result(True)
+        nombre = usuario["full_name"]
         return f"✅ Bienvenido {nombre}. Acceso concedido."
     else:
-        datos_intento["intentos"] += 1
-        if datos_intento["intentos"] >= MAX_INTENTOS:
-            datos_intento["bloqueado_hasta"] = ahora + TIEMPO_BLOQUEO_SEGUNDOS
-            datos_intento["intentos"] = 0
-            intentos_fallidos[nfc_id] = datos_intento
+        record_auth_result(False, "PIN Incorrecto")
+        if bloqueos_pin.register_failure(nfc_id):
             return render_template('pin_verification.html', error_msg="Demasiados intentos fallidos. Usuario bloqueado.")
         else:
-            intentos_fallidos[nfc_id] = datos_intento
             return render_template('pin_verification.html', error_msg="PIN incorrecto.")
 
 
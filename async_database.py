@@ -0,0 +1,97 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from database import DatabaseManager
+
+
+class AsyncDatabaseManager:
+    """Variante async de DatabaseManager para el servidor FastAPI.
+
+    Cada llamada corre en un pool de hilos dedicado (del mismo tamaño que
+    el pool de conexiones), así el event loop sigue atendiendo otras
+    peticiones mientras SQLite trabaja.
+    """
+
+    def __init__(self, db_name="nfc_auth_system.db", max_workers: int = 8, **kwargs):
+        self.db = DatabaseManager(db_name, pool_size=max_workers, **kwargs)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="db-worker")
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    async def register_nfc_user(self, nfc_id: str, username: str, full_name: str,
+                                department: str, security_level: int = 1,
+                                pin: str = None) -> bool:
+        return await self._run(self.db.register_nfc_user, nfc_id, username,
+                               full_name, department, security_level, pin)
+
+    async def set_user_active(self, nfc_id: str, active: bool) -> bool:
+        return await self._run(self.db.set_user_active, nfc_id, active)
+
+    async def set_user_pin(self, nfc_id: str, pin: str = None, pin_hash: str = None) -> bool:
+        return await self._run(self.db.set_user_pin, nfc_id, pin, pin_hash)
+
+    async def deactivate_user(self, nfc_id: str) -> bool:
+        return await self._run(self.db.deactivate_user, nfc_id)
+
+    async def get_user_by_nfc(self, nfc_id: str):
+        return await self._run(self.db.get_user_by_nfc, nfc_id)
+
+    async def get_pin_hash(self, nfc_id: str):
+        return await self._run(self.db.get_pin_hash, nfc_id)
+
+    async def get_user_for_auth(self, nfc_id: str):
+        return await self._run(self.db.get_user_for_auth, nfc_id)
+
+    async def log_auth_attempt(self, user_id: int, nfc_id: str, device_id: str,
+                               success: bool, blockchain_tx_hash: str = None,
+                               failure_reason: str = None):
+        return await self._run(self.db.log_auth_attempt, user_id, nfc_id, device_id,
+                               success, blockchain_tx_hash, failure_reason)
+
+    async def get_auth_logs(self, limit: int = 50):
+        return await self._run(self.db.get_auth_logs, limit)
+
+    async def get_auth_logs_page(self, **filters) -> dict:
+        return await self._run(self.db.get_auth_logs_page, **filters)
+
+    async def get_auth_stats(self, **query) -> list:
+        return await self._run(self.db.get_auth_stats, **query)
+
+    async def get_auth_events_after(self, last_id: int, limit: int = 20_000):
+        return await self._run(self.db.get_auth_events_after, last_id, limit)
+
+    async def get_auth_logs_after(self, last_id: int, limit: int = 500):
+        return await self._run(self.db.get_auth_logs_after, last_id, limit)
+
+    async def last_auth_log_id(self) -> int:
+        return await self._run(self.db.last_auth_log_id)
+
+    def iter_auth_logs(self, **filters):
+        # Generador síncrono: StreamingResponse lo recorre en su pool de hilos
+        return self.db.iter_auth_logs(**filters)
+
+    async def get_user_changes(self, cursor: str = None, limit: int = 500) -> dict:
+        return await self._run(self.db.get_user_changes, cursor, limit)
+
+    async def import_auth_logs(self, records) -> int:
+        return await self._run(self.db.import_auth_logs, records)
+
+    async def run(self, fn, *args, **kwargs):
+        """fn(DatabaseManager, *args) en el pool de la DB, para operaciones compuestas"""
+        return await self._run(fn, self.db, *args, **kwargs)
+
+    def add_log_listener(self, callback):
+        self.db.add_log_listener(callback)
+
+    def cache_stats(self) -> dict:
+        # Solo lee contadores en memoria: no hace falta salir del event loop
+        return self.db.cache_stats()
+
+    async def close(self):
+        """Hook de apagado: vaciar logs, cerrar conexiones y el pool de hilos"""
+        await self._run(self.db.close)
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,123 @@
+"""Feed en vivo de autenticaciones para el panel de seguridad (SSE).
+
+Una sola tarea por proceso sigue auth_logs por id (id > último visto) y
+reparte cada lote nuevo a todos los suscriptores, así el coste no crece
+con el número de paneles abiertos. Se despierta en cuanto
+DatabaseManager confirma registros (add_log_listener) y, como respaldo
+para lo que escriben otros procesos, cada 'poll_interval' segundos.
+
+Los ids de auth_logs son los ids de evento SSE: un panel que reconecta
+con Last-Event-ID recupera desde la DB lo que se perdió.
+"""
+import asyncio
+import json
+
+
+class _Subscription:
+    def __init__(self, max_queue: int):
+        self.queue = asyncio.Queue(max_queue)
+        # Cliente demasiado lento: se corta el stream y, al reconectar,
+        # se pone al día desde la DB con Last-Event-ID
+        self.lagged = False
+
+
+class AuthEventFeed:
+    def __init__(self, db, poll_interval: float = 2.0, batch_size: int = 500,
+                 max_queue: int = 100):
+        self.db = db
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_queue = max_queue
+        self.last_id = 0
+        self._subscribers = set()
+        self._loop = None
+        self._wake = None
+        self._task = None
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self.last_id = await self.db.last_auth_log_id()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def notify(self, count: int = None):
+        """Hay registros nuevos (se puede llamar desde cualquier hilo)"""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._wake.set)
+
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._subscribers:
+                await self._poll()
+
+    async def _poll(self):
+        while True:
+            logs = await self.db.get_auth_logs_after(self.last_id, self.batch_size)
+            if not logs:
+                return
+            self.last_id = logs[-1]['id']
+
+            for subscription in list(self._subscribers):
+                try:
+                    subscription.queue.put_nowait(logs)
+                except asyncio.QueueFull:
+                    subscription.lagged = True
+                    self._subscribers.discard(subscription)
+            if len(logs) < self.batch_size:
+                return
+
+    async def subscribe(self, last_id: int = None, keepalive: float = 15.0):
+        """Lotes de registros nuevos; [] cada 'keepalive' segundos sin actividad.
+
+        Con 'last_id' primero entrega lo escrito después de ese id.
+        """
+        subscription = _Subscription(self.max_queue)
+        if not self._subscribers:
+            # Sin suscriptores la tarea no consulta: partir del último id actual
+            self.last_id = await self.db.last_auth_log_id()
+        self._subscribers.add(subscription)
+        live_from = self.last_id
+
+        try:
+            cursor = last_id
+            while cursor is not None and cursor < live_from:
+                logs = [log for log in await self.db.get_auth_logs_after(cursor, self.batch_size)
+                        if log['id'] <= live_from]
+                if not logs:
+                    break
+                yield logs
+                cursor = logs[-1]['id']
+
+            while not (subscription.lagged and subscription.queue.empty()):
+                try:
+                    yield await asyncio.wait_for(subscription.queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    yield []
+        finally:
+            self._subscribers.discard(subscription)
+
+
+def format_sse(logs) -> str:
+    """Lote de registros como eventos SSE 'auth' (o un comentario keep-alive)"""
+    if not logs:
+        return ": keep-alive\n\n"
+    return "".join(f"id: {log['id']}\nevent: auth\ndata: {json.dumps(log, ensure_ascii=False)}\n\n"
+                   for log in logs)
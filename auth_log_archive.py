@@ -0,0 +1,161 @@
+"""Particiones frías de auth_logs: un fichero comprimido por mes.
+
+DatabaseManager.archive_auth_logs() saca de la DB viva los meses que ya no
+están calientes. Cada mes se copia a un SQLite propio, compactado (filas en
+orden cronológico, índices creados al final y VACUUM), y se comprime con xz
+en un fichero de solo lectura auth_logs_AAAA-MM_<id máximo>.db.xz. La tabla
+auth_log_archives de la DB viva registra qué fichero guarda cada mes.
+
+Para consultarlos (get_auth_logs, exportaciones, replay del detector),
+ArchiveCache descomprime el fichero una sola vez en <directorio>/.cache y
+la consulta lo adjunta con ATTACH en modo inmutable. La caché conserva los
+últimos meses usados.
+"""
+import lzma
+import os
+import shutil
+import sqlite3
+import threading
+from urllib.request import pathname2url
+
+ARCHIVE_SUFFIX = ".db.xz"
+# xz -1 comprime un mes ~12 veces más rápido que -6 y aún lo deja en ~1/10
+ARCHIVE_PRESET = 1
+CACHE_DIR_NAME = ".cache"
+
+# Mismas columnas que auth_logs, sin AUTOINCREMENT: los ids vienen de la DB viva
+ARCHIVE_TABLE = '''
+    CREATE TABLE auth_logs (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        nfc_id TEXT NOT NULL,
+        device_id TEXT NOT NULL,
+        auth_success BOOLEAN NOT NULL,
+        auth_timestamp TIMESTAMP,
+        blockchain_tx_hash TEXT,
+        failure_reason TEXT
+    )
+'''
+
+# Lo frío se consulta por rango de fechas o por tarjeta
+ARCHIVE_INDEXES = [
+    "CREATE INDEX idx_auth_logs_ts ON auth_logs (auth_timestamp, id)",
+    "CREATE INDEX idx_auth_logs_nfc_ts ON auth_logs (nfc_id, auth_timestamp, id)",
+]
+
+AUTH_LOG_FIELDS = ("id, user_id, nfc_id, device_id, auth_success, auth_timestamp, "
+                   "blockchain_tx_hash, failure_reason")
+
+
+def archive_file_name(month: str, max_id: int) -> str:
+    return f"auth_logs_{month}_{max_id}{ARCHIVE_SUFFIX}"
+
+
+def attach_readonly(conn: sqlite3.Connection, path: str, alias: str):
+    """Adjuntar un SQLite inmutable (la conexión debe abrirse con uri=True)"""
+    uri = f"file:{pathname2url(os.path.abspath(path))}?mode=ro&immutable=1"
+    conn.execute(f"ATTACH DATABASE ? AS {alias}", (uri,))
+
+
+def build_archive(conn: sqlite3.Connection, path: str, start: str, end: str,
+                  max_id: int, previous: str = None, preset: int = ARCHIVE_PRESET) -> dict:
+    """Escribir en 'path' los registros de [start, end) con id <= max_id.
+
+    'conn' es una conexión (uri=True) a la DB viva; 'previous' es la copia
+    descomprimida del archivo anterior del mismo mes, que se fusiona (p. ej.
+    con intentos offline importados después de archivarlo). Devuelve
+    {'row_count', 'first_ts', 'last_ts'} del archivo.
+    """
+    work = path[:-len(ARCHIVE_SUFFIX)] + ".db.tmp"
+    if os.path.exists(work):
+        os.remove(work)
+
+    target = sqlite3.connect(work)
+    target.execute("PRAGMA journal_mode=OFF")
+    target.execute(ARCHIVE_TABLE)
+    target.commit()
+    target.close()
+
+    conn.execute("ATTACH DATABASE ? AS compact", (work,))
+    try:
+        sources = [f'''SELECT {AUTH_LOG_FIELDS} FROM main.auth_logs
+                       WHERE auth_timestamp >= ? AND auth_timestamp < ? AND id <= ?''']
+        if previous is not None:
+            attach_readonly(conn, previous, "previous")
+            sources.append(f"SELECT {AUTH_LOG_FIELDS} FROM previous.auth_logs")
+        conn.execute(f'''
+            INSERT OR IGNORE INTO compact.auth_logs
+            SELECT * FROM ({" UNION ALL ".join(sources)})
+            ORDER BY auth_timestamp, id
+        ''', (start, end, max_id))
+        conn.commit()
+    finally:
+        for alias in ("compact", "previous"):
+            try:
+                conn.execute(f"DETACH DATABASE {alias}")
+            except sqlite3.OperationalError:
+                pass
+
+    target = sqlite3.connect(work)
+    for statement in ARCHIVE_INDEXES:
+        target.execute(statement)
+    target.commit()
+    count, first_ts, last_ts = target.execute(
+        "SELECT COUNT(*), MIN(auth_timestamp), MAX(auth_timestamp) FROM auth_logs").fetchone()
+    target.execute("VACUUM")
+    target.close()
+
+    partial = path + ".part"
+    with open(work, "rb") as src, lzma.open(partial, "wb", preset=preset) as dst:
+        shutil.copyfileobj(src, dst, 1 << 20)
+    os.chmod(partial, 0o444)
+    os.replace(partial, path)
+    os.remove(work)
+    return {'row_count': count, 'first_ts': first_ts, 'last_ts': last_ts}
+
+
+class ArchiveCache:
+    """Copias descomprimidas de los archivos, listas para ATTACH"""
+
+    def __init__(self, directory: str, max_files: int = 4):
+        self.directory = directory
+        self.cache_dir = os.path.join(directory, CACHE_DIR_NAME)
+        self.max_files = max_files
+        self._lock = threading.Lock()
+
+    def _cached_path(self, file_name: str) -> str:
+        return os.path.join(self.cache_dir, file_name[:-len(".xz")])
+
+    def path(self, file_name: str) -> str:
+        """Ruta de la copia descomprimida de 'file_name' (la crea si falta)"""
+        cached = self._cached_path(file_name)
+        with self._lock:
+            if os.path.exists(cached):
+                os.utime(cached)
+                return cached
+
+            os.makedirs(self.cache_dir, exist_ok=True)
+            partial = cached + ".part"
+            with lzma.open(os.path.join(self.directory, file_name), "rb") as src, \
+                    open(partial, "wb") as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
+            os.chmod(partial, 0o444)
+            os.replace(partial, cached)
+            self._evict(keep=cached)
+        return cached
+
+    def discard(self, file_name: str):
+        cached = self._cached_path(file_name)
+        with self._lock:
+            if os.path.exists(cached):
+                os.remove(cached)
+
+    def _evict(self, keep: str):
+        # Los menos usados primero; en Linux borrar un fichero adjunto por
+        # otra consulta no la interrumpe
+        files = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                 if name.endswith(".db")]
+        files.sort(key=os.path.getmtime)
+        for path in files[:max(0, len(files) - self.max_files)]:
+            if path != keep:
+                os.remove(path)
@@ -0,0 +1,104 @@
+"""Exportación en streaming de auth_logs (CSV, JSONL o Parquet).
+
+Los generadores reciben los trozos de DatabaseManager.iter_auth_logs()
+y producen bytes trozo a trozo: en memoria solo hay un trozo (y su
+codificación) cada vez, sea cual sea el rango exportado. Se entregan
+tal cual a un StreamingResponse de FastAPI o se escriben a un fichero.
+
+Parquet necesita pyarrow (opcional): cada trozo es un row group y el
+pie del fichero se emite al final.
+"""
+import csv
+import io
+import json
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Opcional: sin pyarrow no hay exportación Parquet
+    pa = pq = None
+
+EXPORT_COLUMNS = ('id', 'timestamp', 'full_name', 'department', 'nfc_id', 'device_id',
+                  'success', 'blockchain_tx', 'failure_reason')
+
+
+def csv_chunks(chunks):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    yield buffer.getvalue().encode()
+
+    for chunk in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode()
+
+
+def jsonl_chunks(chunks):
+    for chunk in chunks:
+        yield "".join(json.dumps(log, ensure_ascii=False) + "\n" for log in chunk).encode()
+
+
+class _DrainableSink(io.RawIOBase):
+    """Destino de ParquetWriter que se vacía tras cada row group"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer += data
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def parquet_chunks(chunks):
+    if pq is None:
+        raise RuntimeError("La exportación Parquet necesita pyarrow")
+
+    schema = pa.schema([
+        ('id', pa.int64()), ('timestamp', pa.string()), ('full_name', pa.string()),
+        ('department', pa.string()), ('nfc_id', pa.string()), ('device_id', pa.string()),
+        ('success', pa.bool_()), ('blockchain_tx', pa.string()), ('failure_reason', pa.string()),
+    ])
+    sink = _DrainableSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+# formato: (generador, content-type, extensión)
+EXPORT_FORMATS = {
+    'csv': (csv_chunks, "text/csv", ".csv"),
+    'jsonl': (jsonl_chunks, "application/x-ndjson", ".jsonl"),
+    'parquet': (parquet_chunks, "application/vnd.apache.parquet", ".parquet"),
+}
+
+
+def available_formats():
+    return [fmt for fmt in EXPORT_FORMATS if fmt != 'parquet' or pq is not None]
+
+
+def export_auth_logs(db, fmt: str = "csv", chunk_size: int = 1000, **filters):
+    """Generador de bytes con los registros que cumplen 'filters' en formato 'fmt'"""
+    if fmt not in available_formats():
+        raise ValueError(f"Formato no disponible: {fmt} (disponibles: {', '.join(available_formats())})")
+    encode = EXPORT_FORMATS[fmt][0]
+    return encode(db.iter_auth_logs(chunk_size=chunk_size, **filters))
@@ -0,0 +1,244 @@
+import logging
+import queue
+import threading
+import time
+
+from observability import DB_COMMIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+DURABILITY_MODES = ("buffered", "commit")
+
+
+class AuthLogWriter:
+    """Escritor en segundo plano para auth_logs.
+
+    Los registros se encolan y un hilo dedicado los inserta con
+    executemany en una sola transacción por lote. Un lote se cierra al
+    llegar a batch_size registros o al pasar flush_interval segundos.
+
+    durability:
+      - "buffered": write() vuelve en cuanto el registro está en la cola.
+      - "commit":   write() espera a que el lote con el registro se confirme.
+
+    Si la cola se llena, write() bloquea hasta put_timeout segundos
+    (contrapresión) y luego lanza queue.Full.
+
+    Si un lote falla se reintenta hasta max_retries veces con espera
+    creciente. Si sigue fallando se parte en mitades hasta aislar las filas
+    que fallan solas: esas se descartan (quedan en el log de errores y en
+    'dropped'), el resto se confirma y la cola sigue avanzando. Los write()
+    en modo "commit" de una fila descartada lanzan el error.
+
+    on_flush(n), si se da, se llama tras confirmar cada lote de n registros.
+    """
+
+    def __init__(self, connection_factory, insert_sql: str, batch_size: int = 100,
+                 flush_interval: float = 0.05, max_queue: int = 10000,
+                 durability: str = "buffered", put_timeout: float = 5.0, on_flush=None,
+                 max_retries: int = 3, retry_delay: float = 0.05):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"durability debe ser uno de {DURABILITY_MODES}")
+
+        self.connection_factory = connection_factory
+        self.insert_sql = insert_sql
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.durability = durability
+        self.put_timeout = put_timeout
+        self.on_flush = on_flush
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._closed = False
+        # write()/flush() que ya pasaron la comprobación de cierre y aún no
+        # han encolado: close() los espera antes del vaciado final
+        self._in_flight = 0
+        self._state = threading.Condition()
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+
+        self._thread = threading.Thread(target=self._run, name="auth-log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, record: tuple):
+        """Encolar un registro (tupla con los parámetros de insert_sql)"""
+        done = _Completion() if self.durability == "commit" else None
+        if not self._enqueue((record, done)):
+            raise RuntimeError("El escritor de logs está cerrado")
+        if done is not None:
+            done.wait()
+            if done.error is not None:
+                raise done.error
+
+    def flush(self, timeout: float = None) -> bool:
+        """Esperar a que todo lo encolado hasta ahora esté confirmado.
+
+        Devuelve False si no se pudo (cola llena, tiempo agotado o lote fallido).
+        """
+        done = _Completion()
+        try:
+            if not self._enqueue((None, done)):
+                return True
+        except queue.Full:
+            return False
+        return done.wait(timeout) and done.error is None
+
+    def close(self):
+        """Vaciar la cola, confirmar lo pendiente y detener el hilo"""
+        with self._state:
+            if self._closed:
+                return
+            self._closed = True
+            # Lo que ya iba a encolarse entra antes del vaciado final
+            self._state.wait_for(lambda: self._in_flight == 0)
+        self._stop.set()
+        self._thread.join()
+
+    def _enqueue(self, item) -> bool:
+        """Encolar 'item' salvo que el escritor esté cerrado (False)"""
+        with self._state:
+            if self._closed:
+                return False
+            self._in_flight += 1
+        try:
+            self._queue.put(item, timeout=self.put_timeout)
+        finally:
+            with self._state:
+                self._in_flight -= 1
+                self._state.notify_all()
+        return True
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    # ---------- hilo escritor ----------
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            # Si alguien espera el commit, no se espera a que el lote se llene:
+            # se toma solo lo que ya está en la cola (group commit)
+            waiting = any(done is not None for _, done in batch)
+            remaining = 0 if waiting else deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._flush_batch(batch)
+
+        # Apagado: confirmar todo lo que quede en la cola
+        remaining = self._drain()
+        while remaining:
+            self._flush_batch(remaining[:self.batch_size])
+            remaining = remaining[self.batch_size:]
+
+    def _commit(self, records):
+        with DB_COMMIT_SECONDS.labels("batch").time(), self.connection_factory() as conn:
+            try:
+                conn.executemany(self.insert_sql, records)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def _flush_batch(self, batch):
+        records = [record for record, _ in batch if record is not None]
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if not records:
+                break
+            try:
+                self._commit(records)
+                error = None
+                break
+            except Exception as e:
+                error = e
+                logger.warning("⚠️  Lote de %d registros de autenticación fallido (intento %d): %s",
+                               len(records), attempt + 1, e)
+                if attempt < self.max_retries:
+                    time.sleep(self.retry_delay * 2 ** attempt)
+
+        failed = []
+        if error is not None:
+            # Aislar las filas que fallan: el resto del lote no se queda atascado detrás
+            failed = self._isolate(records)
+            for record, e in failed:
+                logger.error("❌ Registro de autenticación descartado %r: %s", record, e)
+            self.dropped += len(failed)
+
+        committed = len(records) - len(failed)
+        if committed:
+            self.written += committed
+            self.batches += 1
+            if self.on_flush is not None:
+                self.on_flush(committed)
+
+        errors = {id(record): e for record, e in failed}
+        for record, done in batch:
+            if done is None:
+                continue
+            if record is None:
+                # flush() se entera de cualquier descarte del lote
+                done.set(failed[0][1] if failed else None)
+            else:
+                done.set(errors.get(id(record)))
+
+    def _isolate(self, records):
+        """Confirmar por mitades; devuelve [(registro, error)] de las filas que fallan solas"""
+        if len(records) == 1:
+            try:
+                self._commit(records)
+                return []
+            except Exception as e:
+                return [(records[0], e)]
+
+        failed = []
+        middle = len(records) // 2
+        for half in (records[:middle], records[middle:]):
+            try:
+                self._commit(half)
+            except Exception:
+                failed.extend(self._isolate(half))
+        return failed
+
+
+class _Completion:
+    """Aviso de fin de lote para write() en modo "commit" y flush(), con su error"""
+
+    __slots__ = ("event", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.error = None
+
+    def set(self, error: Exception = None):
+        self.error = error
+        self.event.set()
+
+    def wait(self, timeout: float = None) -> bool:
+        return self.event.wait(timeout)
@@ -0,0 +1,91 @@
+"""Particionado mensual y retención de auth_logs.
+
+La DB viva conserva solo los últimos meses; los anteriores pasan a
+ficheros comprimidos de solo lectura (auth_log_archive.py) que
+get_auth_logs, las exportaciones y el replay del detector siguen leyendo.
+Pensado para un cron mensual (p. ej. el día 1 de madrugada).
+
+Subcomandos:
+  archive  Archivar los meses anteriores a los --meses-vivos últimos.
+  prune    Borrar los archivos de más de --meses meses (las estadísticas
+           de auth_rollups se conservan).
+  list     Meses archivados, registros y tamaño.
+
+Uso:
+  python auth_retention.py archive [--db nfc_auth_system.db] [--meses-vivos 3] [--vacuum]
+  python auth_retention.py prune --meses 24
+  python auth_retention.py list
+"""
+import argparse
+import os
+import sys
+import time
+
+from database import DatabaseManager
+from observability import setup_logging
+
+
+def cmd_archive(db: DatabaseManager, args):
+    start = time.perf_counter()
+    months = db.archive_auth_logs(
+        hot_months=args.meses_vivos,
+        progress=lambda month, rows: print(f"   🗄️  {month}: {rows:,} registros", flush=True))
+    if not months:
+        print(f"ℹ️  Nada que archivar: la DB viva solo tiene los últimos {args.meses_vivos} meses")
+        return
+    print(f"✅ {len(months)} meses archivados en {time.perf_counter() - start:.1f} s")
+
+    if args.vacuum:
+        before = os.path.getsize(db.db_name)
+        db.vacuum()
+        print(f"🧽 DB viva: {before / 1e6:.1f} MB -> {os.path.getsize(db.db_name) / 1e6:.1f} MB")
+
+
+def cmd_prune(db: DatabaseManager, args):
+    months = db.prune_auth_log_archives(args.meses)
+    print(f"🧹 {len(months)} meses borrados" + (f": {', '.join(months)}" if months else ""))
+
+
+def cmd_list(db: DatabaseManager, args):
+    archives = db.list_auth_log_archives()
+    if not archives:
+        print("ℹ️  No hay meses archivados")
+        return
+    for archive in archives:
+        print(f"   {archive['month']}  {archive['row_count']:>10,} registros  "
+              f"{archive['size_bytes'] / 1e6:8.1f} MB  {archive['file_name']}")
+    print(f"   Total: {sum(a['row_count'] for a in archives):,} registros, "
+          f"{sum(a['size_bytes'] for a in archives) / 1e6:.1f} MB en {db.archive_dir}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archivado mensual y retención de auth_logs")
+    parser.add_argument("--db", default="nfc_auth_system.db")
+    parser.add_argument("--dir", help="Directorio de archivos (por defecto <db>_archive)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("archive", help="Archivar meses antiguos")
+    p.add_argument("--meses-vivos", type=int, default=3,
+                   help="Meses que se quedan en la DB viva, incluido el actual")
+    p.add_argument("--vacuum", action="store_true", help="Compactar la DB viva al terminar")
+    p.set_defaults(func=cmd_archive)
+
+    p = sub.add_parser("prune", help="Aplicar la retención a los archivos")
+    p.add_argument("--meses", type=int, required=True, help="Conservar los últimos N meses")
+    p.set_defaults(func=cmd_prune)
+
+    p = sub.add_parser("list", help="Listar meses archivados")
+    p.set_defaults(func=cmd_list)
+
+    args = parser.parse_args(argv)
+    setup_logging()
+    db = DatabaseManager(args.db, archive_dir=args.dir)
+    try:
+        args.func(db, args)
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
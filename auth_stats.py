@@ -0,0 +1,86 @@
+"""Estadísticas de accesos desde los agregados auth_rollups.
+
+Subcomandos:
+  backfill  Reconstruir los agregados desde el historial de auth_logs
+            (necesario una vez tras la migración, o desde --desde).
+  prune     Borrar cubos antiguos de una granularidad (p. ej. minutos).
+  show      Tasa de éxito por cubo, departamento y/o dispositivo.
+
+Uso:
+  python auth_stats.py backfill [--db nfc_auth_system.db] [--desde 2025-01-01]
+  python auth_stats.py prune --granularidad minute --dias 14
+  python auth_stats.py show --granularidad hour --por department --desde 2025-06-01
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+
+from database import DatabaseManager, ROLLUP_DIMENSIONS, ROLLUP_GRANULARITIES
+from observability import setup_logging
+
+
+def cmd_backfill(db: DatabaseManager, args):
+    start = time.perf_counter()
+    days = db.rebuild_rollups(since=args.desde,
+                              progress=lambda day: print(f"\r   📅 {day}", end="", flush=True))
+    print(f"\r✅ Agregados reconstruidos: {days} días en {time.perf_counter() - start:.1f} s")
+
+
+def cmd_prune(db: DatabaseManager, args):
+    before = datetime.utcnow() - timedelta(days=args.dias)
+    removed = db.prune_rollups(args.granularidad, before)
+    print(f"🧹 {removed} cubos '{args.granularidad}' anteriores a {before:%Y-%m-%d} borrados")
+
+
+def cmd_show(db: DatabaseManager, args):
+    stats = db.get_auth_stats(args.granularidad, since=args.desde, until=args.hasta,
+                              group_by=args.por, department=args.departamento,
+                              device_id=args.dispositivo, per_bucket=not args.total)
+    if not stats:
+        print("ℹ️  Sin datos en el rango (¿falta ejecutar 'backfill'?)")
+        return
+
+    keys = [key for key in stats[0] if key in ('bucket',) + ROLLUP_DIMENSIONS]
+    for entry in stats:
+        label = " | ".join(str(entry[key] or "-") for key in keys) or "Total"
+        rate = f"{entry['success_rate']:.1%}" if entry['success_rate'] is not None else "-"
+        print(f"   {label:<50} ✅ {entry['successes']:>7}  ❌ {entry['failures']:>6}  {rate:>7}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Agregados de autenticación por minuto/hora/día")
+    parser.add_argument("--db", default="nfc_auth_system.db")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("backfill", help="Reconstruir agregados desde auth_logs")
+    p.add_argument("--desde", help="Solo desde este día (YYYY-MM-DD)")
+    p.set_defaults(func=cmd_backfill)
+
+    p = sub.add_parser("prune", help="Borrar cubos antiguos")
+    p.add_argument("--granularidad", choices=list(ROLLUP_GRANULARITIES), default="minute")
+    p.add_argument("--dias", type=int, default=14, help="Conservar los últimos N días")
+    p.set_defaults(func=cmd_prune)
+
+    p = sub.add_parser("show", help="Mostrar tasas de éxito")
+    p.add_argument("--granularidad", choices=list(ROLLUP_GRANULARITIES), default="hour")
+    p.add_argument("--por", nargs="*", choices=ROLLUP_DIMENSIONS, default=["department"])
+    p.add_argument("--desde")
+    p.add_argument("--hasta")
+    p.add_argument("--departamento")
+    p.add_argument("--dispositivo")
+    p.add_argument("--total", action="store_true", help="Sumar todo el rango (sin cubos)")
+    p.set_defaults(func=cmd_show)
+
+    args = parser.parse_args(argv)
+    setup_logging()
+    db = DatabaseManager(args.db)
+    try:
+        args.func(db, args)
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""Prueba de carga: envíos de PIN concurrentes en un event loop.
+
+Compara el handler de verify_pin llamando a DatabaseManager de forma
+bloqueante contra el mismo handler usando AsyncDatabaseManager. Cada
+envío hace lo mismo que el servidor: buscar el usuario y registrar el
+intento (con commit por intento, el peor caso).
+
+Además del throughput se mide el retraso del event loop: un "latido"
+cada 1 ms que representa a las demás peticiones (GET del formulario,
+/health...). Con llamadas bloqueantes ese latido se congela mientras
+SQLite trabaja; con la variante async sigue respondiendo.
+
+Uso: python benchmark_async_db.py [clientes] [envíos_por_cliente]
+"""
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from async_database import AsyncDatabaseManager
+from database import DatabaseManager
+
+TEST_NFC_ID = "04A1B2C3D4E5"
+DEVICE_ID = "BENCH-STATION-01"
+
+
+async def blocking_submission(db: DatabaseManager):
+    user = db.get_user_by_nfc(TEST_NFC_ID)
+    db.log_auth_attempt(user['id'], TEST_NFC_ID, DEVICE_ID, True)
+
+
+async def async_submission(db: AsyncDatabaseManager):
+    user = await db.get_user_by_nfc(TEST_NFC_ID)
+    await db.log_auth_attempt(user['id'], TEST_NFC_ID, DEVICE_ID, True)
+
+
+async def heartbeat(delays: list, stop: asyncio.Event, interval: float = 0.001):
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        delays.append(max(0.0, time.perf_counter() - expected))
+
+
+async def load(submission, db, clients: int, per_client: int):
+    async def client():
+        for _ in range(per_client):
+            await submission(db)
+            # Ceder el loop entre envíos, como entre peticiones HTTP reales
+            await asyncio.sleep(0)
+
+    delays = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(heartbeat(delays, stop))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    rate = clients * per_client / (time.perf_counter() - start)
+
+    stop.set()
+    await monitor
+    delays.sort()
+    worst = delays[-1] if delays else 0.0
+    p99 = delays[int(len(delays) * 0.99)] if delays else 0.0
+    return rate, p99 * 1000, worst * 1000
+
+
+async def benchmark(clients: int = 50, per_client: int = 40):
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        db = DatabaseManager(os.path.join(tmp, "sync.db"), cache_size=0)
+        blocking = await load(blocking_submission, db, clients, per_client)
+        db.close()
+
+        async_db = AsyncDatabaseManager(os.path.join(tmp, "async.db"), cache_size=0)
+        async_ = await load(async_submission, async_db, clients, per_client)
+        await async_db.close()
+
+    print(f"👥 {clients} clientes x {per_client} envíos")
+    for label, (rate, p99, worst) in (("bloqueante", blocking), ("async", async_)):
+        print(f"⏱️  {label:<10} {rate:7.0f} envíos/seg | retraso del loop p99 "
+              f"{p99:7.2f} ms, máx {worst:7.2f} ms")
+
+
+if __name__ == "__main__":
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    per_client = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    asyncio.run(benchmark(clients, per_client))
@@ -0,0 +1,80 @@
+"""Benchmark: DB viva con particiones mensuales archivadas frente a una sola tabla.
+
+Genera N registros (2M por defecto) repartidos en el año 2025 y mide, con
+todo en auth_logs y después de archivar todo salvo los 2 últimos meses
+(archive_auth_logs + VACUUM):
+  - tamaño de la DB viva y de los archivos comprimidos,
+  - coste de un lote de 100 inserciones (trigger de agregados incluido),
+  - últimos registros (vista de administración) y un día de un mes
+    archivado, con la caché de descompresión vacía y ya caliente.
+
+Uso: python benchmark_auth_log_archive.py [registros]
+"""
+import contextlib
+import io
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmark_auth_logs import populate
+from benchmark_auth_stats import timed, write_batches
+from database import DatabaseManager
+
+YEAR_SECONDS = 365 * 86400
+
+
+def report(label: str, db: DatabaseManager):
+    live_mb = os.path.getsize(db.db_name) / 1e6
+    rows = sqlite3.connect(db.db_name).execute("SELECT COUNT(*) FROM auth_logs").fetchone()[0]
+    print(f"📊 {label}: auth_logs {rows:,} registros, DB viva {live_mb:.1f} MB")
+    write_batches(db.db_name, batches=20)  # calentamiento
+    print(f"   lote de 100 inserciones {write_batches(db.db_name, batches=200):.2f} ms")
+    timed("últimos 50 registros", lambda: db.get_auth_logs(50), 50)
+
+
+def benchmark(count: int = 2_000_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            db = DatabaseManager(db_path, cache_size=0)
+
+        # El historial se carga sin trigger de agregados (no es lo que se mide)
+        conn = sqlite3.connect(db_path)
+        trigger_sql = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'trg_auth_logs_rollup'").fetchone()[0]
+        conn.execute("DROP TRIGGER trg_auth_logs_rollup")
+        conn.commit()
+        print(f"📦 Generando {count:,} registros sintéticos (2025)...")
+        populate(db_path, count, step=YEAR_SECONDS / count)
+        conn.execute(trigger_sql)
+        conn.commit()
+        conn.close()
+
+        report("Una sola tabla", db)
+        timed("un día de marzo", lambda: db.get_auth_logs_page(
+            limit=50, since="2025-03-10", until="2025-03-11"), 20)
+
+        print("🗄️  Archivando todo salvo noviembre y diciembre...")
+        start = time.perf_counter()
+        months = db.archive_auth_logs(hot_months=2, now=datetime(2025, 12, 15))
+        db.vacuum()
+        archives = db.list_auth_log_archives()
+        archived_mb = sum(a['size_bytes'] for a in archives) / 1e6
+        print(f"   {len(months)} meses en {time.perf_counter() - start:.1f} s, "
+              f"{sum(a['row_count'] for a in archives):,} registros en {archived_mb:.1f} MB comprimidos")
+
+        report("Particionado", db)
+        shutil.rmtree(db.archive_cache.cache_dir, ignore_errors=True)
+        timed("un día de marzo (descomprimiendo)", lambda: db.get_auth_logs_page(
+            limit=50, since="2025-03-10", until="2025-03-11"), 1)
+        timed("un día de marzo (caché)", lambda: db.get_auth_logs_page(
+            limit=50, since="2025-03-10", until="2025-03-11"), 20)
+        db.close()
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000)
@@ -0,0 +1,109 @@
+"""Benchmark: consultas de auth_logs sobre un historial sintético grande.
+
+Genera N registros (10M por defecto) en una base temporal, mide las
+consultas de la vista de administración sin índices y después de aplicar
+las migraciones de DatabaseManager (índices + paginación por clave).
+
+Uso: python benchmark_auth_logs.py [registros]
+"""
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from database import DatabaseManager, MIGRATIONS
+
+DEVICES = [f"ACR122U-STATION-{i:02d}" for i in range(1, 21)]
+USERS = [(1, "04A1B2C3D4E5"), (2, "04F6G7H8I9J0"), (3, "04K1L2M3N4O5")]
+
+
+def synthetic_rows(count: int, step: float = 3):
+    rng = random.Random(42)
+    start = datetime(2025, 1, 1)
+    for i in range(count):
+        user_id, nfc_id = rng.choice(USERS)
+        success = rng.random() > 0.05
+        ts = start + timedelta(seconds=i * step)
+        yield (user_id, nfc_id, rng.choice(DEVICES), success,
+               ts.strftime("%Y-%m-%d %H:%M:%S"), None,
+               None if success else "PIN Incorrecto")
+
+
+def populate(db_path: str, count: int, step: float = 3):
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.executemany('''
+        INSERT INTO auth_logs
+        (user_id, nfc_id, device_id, auth_success, auth_timestamp, blockchain_tx_hash, failure_reason)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', synthetic_rows(count, step))
+    conn.commit()
+    conn.close()
+
+
+def timed(label: str, fn, repeat: int = 5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    elapsed_ms = (time.perf_counter() - start) * 1000 / repeat
+    print(f"   {label:<38} {elapsed_ms:10.2f} ms")
+    return result
+
+
+def run_queries(db: DatabaseManager, repeat: int):
+    first = timed("primera página (50)", lambda: db.get_auth_logs_page(limit=50), repeat)
+    timed("página siguiente (cursor)", lambda: db.get_auth_logs_page(
+        limit=50, cursor=first['next_cursor']), repeat)
+    timed("por dispositivo", lambda: db.get_auth_logs_page(
+        device_id="ACR122U-STATION-07"), repeat)
+    timed("por tarjeta + rango de fechas", lambda: db.get_auth_logs_page(
+        nfc_id="04F6G7H8I9J0", since="2025-03-01", until="2025-03-02"), repeat)
+    timed("solo fallidos", lambda: db.get_auth_logs_page(success=False), repeat)
+
+
+def benchmark(count: int = 10_000_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+
+        # Esquema sin migraciones para medir la situación original
+        with contextlib.redirect_stdout(io.StringIO()):
+            db = DatabaseManager(db_path, cache_size=0)
+        conn = sqlite3.connect(db_path)
+        for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type='index' AND name LIKE 'idx_%'").fetchall():
+            conn.execute(f"DROP INDEX {name}")
+        # El historial sintético no necesita agregados (auth_stats.py)
+        conn.execute("DROP TRIGGER IF EXISTS trg_auth_logs_rollup")
+        conn.commit()
+        conn.close()
+
+        print(f"📦 Generando {count:,} registros sintéticos...")
+        start = time.perf_counter()
+        populate(db_path, count)
+        print(f"   listo en {time.perf_counter() - start:.1f} s")
+
+        # Sin índices cada consulta recorre la tabla entera: una sola pasada
+        print("🐢 Sin índices:")
+        run_queries(db, repeat=1)
+
+        print("🛠️  Aplicando migración de índices...")
+        start = time.perf_counter()
+        conn = sqlite3.connect(db_path)
+        _version, statements = MIGRATIONS[0]
+        for statement in statements:
+            conn.execute(statement)
+        conn.commit()
+        conn.close()
+        print(f"   listo en {time.perf_counter() - start:.1f} s")
+
+        print("🚀 Con índices:")
+        run_queries(db, repeat=20)
+        db.close()
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000)
@@ -0,0 +1,111 @@
+"""Benchmark: estadísticas desde auth_rollups frente a GROUP BY sobre auth_logs.
+
+Genera N registros sintéticos (2M por defecto), reconstruye los agregados
+con rebuild_rollups() (lo que hace 'python auth_stats.py backfill') y
+compara las consultas del panel contra el GROUP BY ad hoc equivalente.
+Mide también el coste del trigger de agregados al escribir lotes.
+
+Uso: python benchmark_auth_stats.py [registros]
+"""
+import contextlib
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from benchmark_auth_logs import populate
+from database import DatabaseManager
+
+ADHOC_QUERY = '''
+    SELECT strftime('%Y-%m-%d %H:00', al.auth_timestamp), u.department,
+           SUM(al.auth_success = 1), SUM(al.auth_success = 0)
+    FROM auth_logs al
+    LEFT JOIN nfc_users u ON u.id = al.user_id
+    WHERE al.auth_timestamp >= ? AND al.auth_timestamp < ?
+    GROUP BY 1, 2
+'''
+
+
+def timed(label: str, fn, repeat: int = 5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    elapsed_ms = (time.perf_counter() - start) * 1000 / repeat
+    print(f"   {label:<44} {elapsed_ms:10.2f} ms")
+    return result
+
+
+def write_batches(db_path: str, batches: int = 100, batch_size: int = 100) -> float:
+    """Tiempo medio por lote de inserción (como el escritor de auth_logs)"""
+    conn = sqlite3.connect(db_path)
+    rows = [(1, "04A1B2C3D4E5", f"ACR122U-STATION-{i % 20:02d}", i % 10 != 0, None, None)
+            for i in range(batch_size)]
+    start = time.perf_counter()
+    for _ in range(batches):
+        conn.executemany('''
+            INSERT INTO auth_logs
+            (user_id, nfc_id, device_id, auth_success, blockchain_tx_hash, failure_reason)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', rows)
+        conn.commit()
+    conn.close()
+    return (time.perf_counter() - start) * 1000 / batches
+
+
+def benchmark(count: int = 2_000_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            db = DatabaseManager(db_path, cache_size=0)
+
+        # El historial se carga sin trigger, como una base anterior a la migración
+        conn = sqlite3.connect(db_path)
+        trigger_sql = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'trg_auth_logs_rollup'").fetchone()[0]
+        conn.execute("DROP TRIGGER trg_auth_logs_rollup")
+        conn.commit()
+
+        print(f"📦 Generando {count:,} registros sintéticos...")
+        start = time.perf_counter()
+        populate(db_path, count)
+        print(f"   listo en {time.perf_counter() - start:.1f} s")
+
+        print("✍️  Lotes de 100 inserciones:")
+        write_batches(db_path, batches=20)  # calentamiento
+        without_trigger = write_batches(db_path)
+        conn.execute(trigger_sql)
+        conn.commit()
+        with_trigger = write_batches(db_path)
+        print(f"   sin agregados {without_trigger:.2f} ms/lote | con trigger {with_trigger:.2f} ms/lote")
+
+        print("🛠️  Backfill de agregados...")
+        start = time.perf_counter()
+        days = db.rebuild_rollups()
+        rollups = conn.execute("SELECT COUNT(*) FROM auth_rollups").fetchone()[0]
+        print(f"   {days} días, {rollups:,} cubos en {time.perf_counter() - start:.1f} s")
+
+        print("🐢 GROUP BY sobre auth_logs:")
+        timed("por hora y departamento (1 día)",
+              lambda: conn.execute(ADHOC_QUERY, ("2025-03-01", "2025-03-02")).fetchall(), 3)
+        timed("por hora y departamento (todo)",
+              lambda: conn.execute(ADHOC_QUERY, ("2000-01-01", "2100-01-01")).fetchall(), 1)
+
+        print("🚀 Desde auth_rollups:")
+        timed("por hora y departamento (1 día)", lambda: db.get_auth_stats(
+            "hour", since="2025-03-01", until="2025-03-02"), 50)
+        timed("por día y dispositivo (todo)", lambda: db.get_auth_stats(
+            "day", group_by=("device_id",)), 20)
+        timed("tasa total por departamento (todo)", lambda: db.get_auth_stats(
+            "day", per_bucket=False), 20)
+        timed("por minuto, un dispositivo (1 hora)", lambda: db.get_auth_stats(
+            "minute", group_by=(), device_id="ACR122U-STATION-07",
+            since="2025-03-01 10:00", until="2025-03-01 11:00"), 50)
+
+        conn.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000)
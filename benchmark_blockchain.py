@@ -0,0 +1,71 @@
+"""Benchmark: registros/seg de BlockchainSimulated según el tamaño de bloque,
+y latencia de get_inclusion_proof: prueba guardada al sellar frente a
+reconstruir el árbol de Merkle del bloque en cada consulta.
+
+Uso: python benchmark_blockchain.py [registros]
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+from blockchain_simulated import BlockchainSimulated
+from ledger_record import digest_from_hex
+from merkle import merkle_proof
+
+
+def benchmark(records: int = 20000, block_sizes=(1, 10, 100, 1000)):
+    for block_size in block_sizes:
+        with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+            blockchain = BlockchainSimulated(os.path.join(tmp, "ledger.db"),
+                                             block_size=block_size)
+            start = time.perf_counter()
+            for i in range(records):
+                blockchain.record_auth_attempt("bench_user", float(i), "BENCH-01", "04A1B2C3D4E5", True)
+            blockchain.close()
+            elapsed = time.perf_counter() - start
+
+        print(f"⛓️  bloques de {block_size:>5}: {records / elapsed:9.0f} registros/seg")
+
+
+def rebuilt_proof(ledger, tx_hash: str):
+    """Camino anterior: leer todas las hojas del bloque y rehacer el árbol"""
+    record = ledger.get(tx_hash)
+    leaves = [digest_from_hex(h) for h in ledger.get_block_tx_hashes(record.block_number)]
+    return merkle_proof(leaves, record.tx_index)
+
+
+def benchmark_proofs(records: int = 20000, block_sizes=(100, 1000), lookups: int = 2000):
+    for block_size in block_sizes:
+        with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+            blockchain = BlockchainSimulated(os.path.join(tmp, "ledger.db"),
+                                             block_size=block_size, block_interval_ms=60_000)
+            tx_hashes = [blockchain.record_auth_attempt("bench_user", float(i), "BENCH-01",
+                                                        "04A1B2C3D4E5", True)
+                         for i in range(records)]
+            while blockchain.pending_count():
+                blockchain.seal_block()
+            sample = random.Random(7).choices(tx_hashes, k=lookups)
+
+            timings = {}
+            for label, lookup in (("reconstruida", lambda h: rebuilt_proof(blockchain.ledger, h)),
+                                  ("guardada", blockchain.get_inclusion_proof)):
+                start = time.perf_counter()
+                for tx_hash in sample:
+                    lookup(tx_hash)
+                timings[label] = (time.perf_counter() - start) / lookups * 1e6
+            assert all(blockchain.verify_transaction(h) for h in sample[:100])
+            blockchain.close()
+
+        print(f"🌳 prueba de inclusión, bloques de {block_size:>5}: "
+              f"reconstruida {timings['reconstruida']:8.1f} µs | "
+              f"guardada {timings['guardada']:6.1f} µs")
+
+
+if __name__ == "__main__":
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    benchmark(records)
+    benchmark_proofs(records)
@@ -0,0 +1,74 @@
+"""Benchmark de alta masiva: bulk_enrollment (executemany) vs register_nfc_user.
+
+Genera un CSV de N tarjetas con pin_hash ya calculado (como una
+exportación de otro sistema) y unas pocas filas erróneas, y lo registra
+en una sola transacción. Compara con el alta de una en una (un commit
+por tarjeta) sobre una muestra, y mide aparte el coste de las filas con
+PIN en claro (un PBKDF2 por tarjeta).
+
+Uso: python benchmark_bulk_enrollment.py [tarjetas] [muestra_una_a_una]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from bulk_enrollment import enroll
+from database import DatabaseManager
+from pin_hashing import hash_pin
+
+PIN_ITERATIONS = 100_000
+
+
+def make_csv(cards: int, pin_column: str, pin_value: str) -> io.StringIO:
+    lines = [f"nfc_id,username,full_name,department,security_level,{pin_column}"]
+    for i in range(cards):
+        lines.append(f"B{i:09X},user{i},Usuario {i},Operaciones,{1 + i % 3},{pin_value}")
+    # Errores esperados: repetida, ya registrada (semilla), nivel inválido, sin nombre
+    lines.append(f"B{0:09X},dup,Duplicada,Operaciones,1,{pin_value}")
+    lines.append(f"04A1B2C3D4E5,ana,Ana,Inteligencia,3,{pin_value}")
+    lines.append(f"BADLEVEL,x,X,Operaciones,alto,{pin_value}")
+    lines.append(f"NONAME,x,,Operaciones,1,{pin_value}")
+    return io.StringIO("\n".join(lines) + "\n")
+
+
+def benchmark(cards: int = 100_000, sample: int = 2000):
+    pin_hash = hash_pin("1234", PIN_ITERATIONS)
+
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        db = DatabaseManager(os.path.join(tmp, "bulk.db"), pin_iterations=PIN_ITERATIONS)
+        start = time.perf_counter()
+        report = enroll(db, make_csv(cards, "pin_hash", pin_hash))
+        bulk_s = time.perf_counter() - start
+        db.close()
+
+        db = DatabaseManager(os.path.join(tmp, "single.db"), pin_iterations=PIN_ITERATIONS)
+        start = time.perf_counter()
+        for i in range(sample):
+            db.register_nfc_user(f"S{i:09X}", f"user{i}", f"Usuario {i}", "Operaciones", 1)
+        single_s = (time.perf_counter() - start) / sample * cards
+        db.close()
+
+        pin_cards = max(1, sample // 20)
+        db = DatabaseManager(os.path.join(tmp, "pins.db"), pin_iterations=PIN_ITERATIONS)
+        start = time.perf_counter()
+        enroll(db, make_csv(pin_cards, "pin", "1234"))
+        per_pin_ms = (time.perf_counter() - start) / pin_cards * 1000
+        db.close()
+
+    print(f"📥 Alta masiva de {cards} tarjetas (pin_hash): {bulk_s:.2f} s "
+          f"({report['inserted'] / bulk_s:.0f} tarjetas/seg)")
+    print(f"   {report['inserted']} registradas, {len(report['errors'])} errores por fila:")
+    for error in report['errors']:
+        print(f"   ❌ Fila {error['row']} ({error['nfc_id']}): {error['error']}")
+    print(f"🐢 Una a una (register_nfc_user, estimado con {sample}): {single_s:.1f} s")
+    print(f"🔐 Con PIN en claro: ~{per_pin_ms:.1f} ms por tarjeta "
+          f"(PBKDF2 {PIN_ITERATIONS} iteraciones, {os.cpu_count()} CPUs)")
+
+
+if __name__ == "__main__":
+    cards = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    sample = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    benchmark(cards, sample)
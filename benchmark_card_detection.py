@@ -0,0 +1,75 @@
+"""Benchmark: latencia tap-lectura, sondeo (sleep 0.3 s) vs notificaciones PC/SC.
+
+Usa FakePCSCBackend: no necesita lector. Una tarjeta se coloca en un
+instante aleatorio y se mide cuánto tarda cada método en devolver el
+UID, y cuántas APDUs envía al lector mientras espera.
+
+Uso: python benchmark_card_detection.py [taps]
+"""
+import math
+import random
+import statistics
+import sys
+import threading
+import time
+
+from card_monitor import CardPresenceMonitor
+from pcsc_backend import FakePCSCBackend
+
+READER = "ACS ACR122U PICC Interface 0"
+UID = "A0F9001E"
+
+
+def polling_wait(backend: FakePCSCBackend, timeout: float = 30):
+    """Réplica del bucle de ACR122UReader._poll_for_card"""
+    start = time.monotonic()
+    while time.monotonic() - start < timeout:
+        uid = backend.read_uid(READER)
+        if uid:
+            return uid
+        time.sleep(0.3)
+    return None
+
+
+def event_wait(backend: FakePCSCBackend, timeout: float = 30):
+    return CardPresenceMonitor(backend, readers=[READER]).wait_for_card(timeout)
+
+
+def measure(wait, taps: int):
+    rng = random.Random(7)
+    latencies = []
+    apdus = 0
+
+    for _ in range(taps):
+        backend = FakePCSCBackend(readers=(READER,))
+        inserted_at = {}
+
+        def tap():
+            time.sleep(rng.uniform(0.2, 0.8))
+            inserted_at['t'] = time.monotonic()
+            backend.insert_card(UID, READER)
+
+        tapper = threading.Thread(target=tap)
+        tapper.start()
+        uid = wait(backend)
+        detected = time.monotonic()
+        tapper.join()
+
+        assert uid == UID
+        latencies.append((detected - inserted_at['t']) * 1000)
+        apdus += backend.apdu_count
+
+    return latencies, apdus / taps
+
+
+def benchmark(taps: int = 20):
+    for label, wait in (("sondeo", polling_wait), ("eventos", event_wait)):
+        latencies, apdus = measure(wait, taps)
+        latencies.sort()
+        p95 = latencies[max(0, math.ceil(len(latencies) * 0.95) - 1)]
+        print(f"⏱️  {label:<8} media {statistics.mean(latencies):7.1f} ms | "
+              f"p95 {p95:7.1f} ms | APDUs por tap {apdus:4.1f}")
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
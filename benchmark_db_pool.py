@@ -0,0 +1,58 @@
+"""Benchmark: taps/seg de DatabaseManager con y sin pool de conexiones.
+
+Cada "tap" es lo que hace el servidor por autenticación: una búsqueda
+del usuario y un registro en auth_logs.
+
+Uso: python benchmark_db_pool.py [taps] [hilos]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from database import DatabaseManager
+
+TEST_NFC_ID = "04A1B2C3D4E5"
+DEVICE_ID = "BENCH-STATION-01"
+
+
+def run_taps(db: DatabaseManager, taps: int, threads: int) -> float:
+    def tap(_):
+        user = db.get_user_by_nfc(TEST_NFC_ID)
+        db.log_auth_attempt(user['id'], TEST_NFC_ID, DEVICE_ID, True)
+
+    # Silenciar los print() del camino caliente para medir solo la DB
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(tap, range(taps)))
+        elapsed = time.perf_counter() - start
+
+    return taps / elapsed
+
+
+def benchmark(taps: int = 2000, threads: int = 4):
+    results = {}
+    for label, use_pool in (("sin pool", False), ("con pool", True)):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "bench.db")
+            with contextlib.redirect_stdout(io.StringIO()):
+                db = DatabaseManager(db_path, pool_size=threads, use_pool=use_pool)
+            try:
+                results[label] = run_taps(db, taps, threads)
+            finally:
+                db.close()
+        print(f"⏱️  {label}: {results[label]:.0f} taps/seg")
+
+    speedup = results["con pool"] / results["sin pool"]
+    print(f"🚀 Mejora con pool: x{speedup:.2f}")
+    return results
+
+
+if __name__ == "__main__":
+    taps = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    benchmark(taps, threads)
@@ -0,0 +1,92 @@
+"""Benchmark de la estación edge: sincronización incremental y modo offline.
+
+Servidor sustituido por LocalSyncTransport (DatabaseManager +
+BlockchainSimulated en un directorio temporal). Mide:
+  - sincronización inicial de N usuarios frente a una incremental tras
+    cambiar unos pocos (lo que costaría un volcado completo cada vez),
+  - latencia de autenticación offline (incluye el hash del PIN),
+  - subida de la cola offline en lotes y reenvío del mismo lote (duplicados).
+
+Uso: python benchmark_edge_sync.py [usuarios] [intentos_offline]
+"""
+import contextlib
+import io
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from blockchain_simulated import BlockchainSimulated
+from database import SQL_INSERT_USER, DatabaseManager
+from edge_station import EdgeCredentialStore, EdgeSyncer, LocalSyncTransport
+from pin_hashing import hash_pin
+
+TEST_PIN = "1234"
+DEVICE_ID = "EDGE-STATION-01"
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def benchmark(users: int = 20000, attempts: int = 2000):
+    verifier = hash_pin(TEST_PIN)
+
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        db_path = os.path.join(tmp, "server.db")
+        db = DatabaseManager(db_path)
+        blockchain = BlockchainSimulated(os.path.join(tmp, "ledger.db"))
+
+        conn = sqlite3.connect(db_path)
+        conn.executemany(SQL_INSERT_USER, ((f"EDGE{i:08X}", f"user{i}", f"Usuario {i}",
+                                            "Operaciones", 1 + i % 3, verifier)
+                                           for i in range(users)))
+        conn.commit()
+        conn.close()
+
+        store = EdgeCredentialStore(os.path.join(tmp, "edge.db"))
+        syncer = EdgeSyncer(store, LocalSyncTransport(db, blockchain))
+
+        initial, initial_ms = timed(syncer.pull_users)
+
+        changed = max(1, users // 1000)
+        for i in range(changed):
+            db.set_user_active(f"EDGE{i:08X}", False)
+        incremental, incremental_ms = timed(syncer.pull_users)
+
+        latencies = []
+        for i in range(attempts):
+            nfc_id = f"EDGE{(changed + i) % users:08X}"
+            _, ms = timed(lambda: store.authenticate(nfc_id, TEST_PIN, DEVICE_ID))
+            latencies.append(ms)
+
+        batch = [attempt for _seq, attempt in store.pending_attempts(attempts)]
+        uploaded, upload_ms = timed(syncer.push_attempts)
+        replay = syncer.transport.upload_attempts(batch[:500])
+
+        local_users = store.user_count()
+        store.close()
+        blockchain.close()
+        db.close()
+
+    latencies.sort()
+    print(f"👥 Usuarios en el servidor: {users + 3} | en la estación: {local_users}")
+    print(f"🔄 Sincronización inicial:     {initial:6d} filas en {initial_ms:8.1f} ms")
+    print(f"🔄 Sincronización incremental: {incremental:6d} filas en {incremental_ms:8.1f} ms "
+          f"({changed} usuarios desactivados)")
+    print(f"🔐 Autenticación offline: media {statistics.mean(latencies):.2f} ms | "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.2f} ms")
+    print(f"📤 Subida de {uploaded} intentos offline: {upload_ms:.1f} ms "
+          f"({uploaded / (upload_ms / 1000):.0f} intentos/seg)")
+    print(f"♻️  Reenvío de un lote ya subido: {replay['imported']} importados, "
+          f"{replay['duplicates']} duplicados descartados")
+
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    attempts = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    benchmark(users, attempts)
@@ -0,0 +1,61 @@
+"""Benchmark de memoria: 1M registros del ledger como dict vs LedgerRecord.
+
+Uso: python benchmark_ledger_memory.py [registros]
+"""
+import hashlib
+import sys
+import tracemalloc
+
+from ledger_record import LedgerRecord
+
+DEVICES = [f"ACR122U-STATION-{i:02d}" for i in range(1, 11)]
+USERS = [("analopez", "04A1B2C3D4E5"), ("carlosruiz", "04F6G7H8I9J0"),
+         ("mariatorres", "04K1L2M3N4O5")]
+
+
+def source_fields(i: int):
+    # Los textos llegan como objetos nuevos (como desde HTTP o SQLite)
+    user_id, nfc_id = USERS[i % len(USERS)]
+    tx_hash = "0x" + hashlib.sha256(str(i).encode()).hexdigest()
+    return (tx_hash, "".join(user_id), float(i), "".join(DEVICES[i % len(DEVICES)]),
+            "".join(nfc_id), i % 20 != 0)
+
+
+def as_dict(i: int):
+    tx_hash, user_id, timestamp, device_id, nfc_id, success = source_fields(i)
+    return {
+        'user_id': user_id,
+        'timestamp': timestamp,
+        'device_id': device_id,
+        'nfc_id': nfc_id,
+        'success': success,
+        'tx_hash': tx_hash,
+        'block_number': i + 1,
+    }
+
+
+def as_record(i: int):
+    return LedgerRecord.from_row(*source_fields(i), block_number=i + 1)
+
+
+def measure(build, count: int) -> int:
+    tracemalloc.start()
+    records = [build(i) for i in range(count)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return current
+
+
+def benchmark(count: int = 1_000_000):
+    dict_bytes = measure(as_dict, count)
+    record_bytes = measure(as_record, count)
+
+    print(f"📦 {count:,} registros")
+    print(f"   dict:         {dict_bytes / 2**20:8.1f} MiB ({dict_bytes / count:6.0f} B/registro)")
+    print(f"   LedgerRecord: {record_bytes / 2**20:8.1f} MiB ({record_bytes / count:6.0f} B/registro)")
+    print(f"🚀 Reducción: {100 * (1 - record_bytes / dict_bytes):.0f}%")
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
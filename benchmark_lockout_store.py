@@ -0,0 +1,68 @@
+"""Benchmark del bloqueo por intentos compartido (LockoutStore).
+
+  - check()/register_failure() por segundo en un proceso.
+  - Varios procesos (como workers de gunicorn) fallando sobre la misma
+    tarjeta: el bloqueo salta tras MAX_INTENTOS fallos en total, no
+    MAX_INTENTOS por proceso como con el dict global.
+  - Un barrido de 200k tarjetas distintas no supera max_entries filas.
+
+Uso: python benchmark_lockout_store.py [operaciones] [procesos]
+"""
+import os
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+
+from lockout_store import LockoutStore
+
+MAX_INTENTOS = 3
+
+
+def fail_once(db_path: str) -> bool:
+    store = LockoutStore(db_path, max_attempts=MAX_INTENTOS, purge_interval=3600)
+    try:
+        return store.register_failure("04A1B2C3D4E5")
+    finally:
+        store.close()
+
+
+def benchmark(operations: int = 20000, processes: int = 4):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "lockouts.db")
+        store = LockoutStore(db_path, max_attempts=MAX_INTENTOS, max_entries=10_000)
+
+        start = time.perf_counter()
+        for i in range(operations):
+            store.check(f"CARD{i % 1000:04X}")
+        check_rate = operations / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for i in range(operations):
+            store.register_failure(f"CARD{i % 1000:04X}")
+        failure_rate = operations / (time.perf_counter() - start)
+
+        # Cada proceso registra fallos de la misma tarjeta
+        with Pool(processes) as pool:
+            locked = pool.map(fail_once, [db_path] * (MAX_INTENTOS * processes))
+        first_lock = locked.index(True) + 1 if True in locked else None
+
+        start = time.perf_counter()
+        for i in range(200_000):
+            store.register_failure(f"SWEEP{i:06X}", now=time.time() + i * 0.01)
+        store.purge(time.time() + 2000)
+        sweep_s = time.perf_counter() - start
+        size = store.size()
+        store.close()
+
+    print(f"🔍 check():            {check_rate:10.0f} ops/seg")
+    print(f"❌ register_failure(): {failure_rate:10.0f} ops/seg")
+    print(f"👷 {processes} procesos, {MAX_INTENTOS * processes} fallos sobre una tarjeta: "
+          f"bloqueada en el fallo nº {first_lock} (MAX_INTENTOS={MAX_INTENTOS})")
+    print(f"🧹 200k tarjetas distintas en {sweep_s:.1f} s: {size} filas (max_entries=10000)")
+
+
+if __name__ == "__main__":
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    benchmark(operations, processes)
@@ -0,0 +1,79 @@
+"""Benchmark y calibración del hash de PIN (PBKDF2-HMAC-SHA256).
+
+  1. Elige las iteraciones para que un hash tarde ~--target-ms en esta
+     máquina (valor para PIN_HASH_ITERATIONS en server.py).
+  2. Carga concurrente: --clients verificaciones simultáneas a través de
+     PinHasher con 1, 2, 4... hilos: verificaciones/seg, latencia p50/p95
+     y rechazos cuando se supera max_pending (el tope de carga).
+
+Uso: python benchmark_pin_hashing.py [--target-ms 50] [--clients 32] [--requests 200]
+"""
+import argparse
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pin_hashing import HashingBusyError, PinHasher, calibrate_iterations, hash_pin
+
+
+def load_test(iterations: int, workers: int, clients: int, requests: int, max_pending: int):
+    hasher = PinHasher(iterations, max_workers=workers, max_pending=max_pending)
+    encoded = hash_pin("1234", iterations)
+    latencies = []
+
+    def client(_):
+        start = time.perf_counter()
+        try:
+            hasher.verify("1234", encoded)
+        except HashingBusyError:
+            return
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(client, range(requests)))
+    elapsed = time.perf_counter() - start
+    stats = hasher.stats()
+    hasher.close()
+
+    latencies.sort()
+    return {
+        'per_sec': stats['verified'] / elapsed,
+        'p50': statistics.median(latencies),
+        'p95': latencies[int(len(latencies) * 0.95) - 1],
+        'busy': stats['busy_rejections'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target-ms", type=float, default=50.0)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--max-pending", type=int, default=64)
+    args = parser.parse_args()
+
+    iterations = calibrate_iterations(args.target_ms)
+    single = min(timed_hash(iterations) for _ in range(5))
+    print(f"🎯 Objetivo {args.target_ms:g} ms/hash → PIN_HASH_ITERATIONS = {iterations} "
+          f"({single:.1f} ms medidos)")
+
+    print(f"\n👥 {args.clients} clientes, {args.requests} verificaciones, "
+          f"max_pending={args.max_pending} ({os.cpu_count()} CPUs):")
+    workers = 1
+    while workers <= max(1, os.cpu_count() or 1):
+        r = load_test(iterations, workers, args.clients, args.requests, args.max_pending)
+        print(f"   {workers:2d} hilos: {r['per_sec']:7.1f} verif/seg | p50 {r['p50']:7.1f} ms | "
+              f"p95 {r['p95']:7.1f} ms | rechazadas {r['busy']}")
+        workers *= 2
+
+
+def timed_hash(iterations: int) -> float:
+    start = time.perf_counter()
+    hash_pin("1234", iterations)
+    return (time.perf_counter() - start) * 1000
+
+
+if __name__ == "__main__":
+    main()
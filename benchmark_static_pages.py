@@ -0,0 +1,80 @@
+"""Benchmark de páginas del kiosco: render Jinja por petición vs precompilado.
+
+Compara, por vista de pin_verification.html:
+  - render_template como antes (plantilla original, auto_reload activo),
+  - render con plantilla minificada + bytecode + sin auto_reload,
+  - página prerenderizada servida desde memoria (200) y revalidación (304),
+y los bytes enviados sin comprimir, gzip y brotli. Para las páginas con
+datos de server.py (templates/pin_form.html y result.html) compara el
+render original con el minificado + bytecode.
+
+Requiere ejecutar antes: python static_assets.py
+Uso: python benchmark_static_pages.py [vistas]
+"""
+import os
+import sys
+import time
+
+from jinja2 import Environment, FileSystemLoader
+
+from static_assets import BUILD_DIR, StaticAssetCache, configure_jinja
+
+PAGE = "pin_verification.html"
+# Páginas de server.py: dependen de la petición, solo se acelera el render
+SERVER_PAGES = {
+    "pin_form.html": {"nombre_completo": "Ana Lopez", "departamento": "Seguridad",
+                      "security_level": 3, "nfc_id": "04A1B2C3D4E5"},
+    "result.html": {"result_state": "PERMITTED", "message": "Acceso Concedido para Ana Lopez.",
+                    "nfc_id": "04A1B2C3D4E5", "tx_hash": "0x" + "ab" * 32},
+}
+
+
+def per_view_us(fn, views: int) -> float:
+    start = time.perf_counter()
+    for _ in range(views):
+        fn()
+    return (time.perf_counter() - start) / views * 1e6
+
+
+def benchmark(views: int = 20000):
+    before = Environment(loader=FileSystemLoader("."), autoescape=True)
+    after = Environment(loader=FileSystemLoader("."), autoescape=True)
+    configure_jinja(after)
+    cache = StaticAssetCache()
+    if not cache.pages:
+        sys.exit(f"❌ No hay build en {BUILD_DIR}/: ejecute python static_assets.py")
+
+    etag = cache.get_page(PAGE)[2]["ETag"]
+    results = {
+        "render (antes)": per_view_us(lambda: before.get_template(PAGE).render(), views),
+        "render minificado + bytecode": per_view_us(lambda: after.get_template(PAGE).render(), views),
+        "precompilado 200 (br)": per_view_us(lambda: cache.get_page(PAGE, "gzip, br"), views),
+        "precompilado 304": per_view_us(lambda: cache.get_page(PAGE, "gzip, br", etag), views),
+    }
+
+    print(f"⏱️  CPU por vista de {PAGE} ({views} vistas):")
+    for label, us in results.items():
+        print(f"   {label:<30} {us:8.2f} µs")
+
+    original = os.path.getsize(PAGE)
+    print(f"📦 Bytes enviados: original {original} B", end="")
+    for encoding in ("identity", "gzip", "br"):
+        body = cache.pages[PAGE]["bodies"].get(encoding)
+        if body is not None:
+            print(f" | {encoding} {len(body)} B", end="")
+    print(" | 304: 0 B")
+
+    before = Environment(loader=FileSystemLoader("templates"), autoescape=True)
+    after = Environment(loader=FileSystemLoader("templates"), autoescape=True)
+    configure_jinja(after)
+    print(f"⏱️  CPU por render de las páginas de server.py ({views} vistas):")
+    for page, context in SERVER_PAGES.items():
+        plain = per_view_us(lambda: before.get_template(page).render(context), views)
+        built = per_view_us(lambda: after.get_template(page).render(context), views)
+        sizes = [len(env.get_template(page).render(context).encode()) for env in (before, after)]
+        print(f"   {page:<16} antes {plain:8.2f} µs ({sizes[0]} B) | "
+              f"minificado + bytecode {built:8.2f} µs ({sizes[1]} B)")
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,59 @@
+"""Benchmark: taps/seg de ReaderStationManager según el número de lectores.
+
+Lectores simulados (FakePCSCBackend). Cada tap espera 'auth_ms'
+milisegundos en el handler, como una autenticación contra el servidor.
+
+Uso: python benchmark_station_manager.py [taps_por_lector] [auth_ms]
+"""
+import contextlib
+import io
+import sys
+import threading
+import time
+
+from pcsc_backend import FakePCSCBackend
+from station_manager import ReaderStationManager
+
+
+def run(readers: int, taps: int, auth_ms: float) -> float:
+    names = [f"ACS ACR122U PICC Interface {i}" for i in range(readers)]
+    backend = FakePCSCBackend(readers=names)
+    handled = {name: threading.Semaphore(0) for name in names}
+
+    def on_tap(tap):
+        time.sleep(auth_ms / 1000)
+        handled[tap.reader].release()
+
+    def door(name: str, index: int):
+        for n in range(taps):
+            backend.insert_card(f"04{index:02X}{n:08X}", name)
+            handled[name].acquire()
+            backend.remove_card(name)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager = ReaderStationManager(on_tap, backend=backend)
+        manager.start()
+        doors = [threading.Thread(target=door, args=(name, i)) for i, name in enumerate(names)]
+        start = time.perf_counter()
+        for thread in doors:
+            thread.start()
+        for thread in doors:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        manager.stop()
+
+    return readers * taps / elapsed
+
+
+def benchmark(taps: int = 50, auth_ms: float = 20):
+    base = None
+    for readers in (1, 2, 4, 8):
+        rate = run(readers, taps, auth_ms)
+        base = base or rate
+        print(f"🚪 {readers} lectores: {rate:7.1f} taps/seg (x{rate / base:.1f})")
+
+
+if __name__ == "__main__":
+    taps = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    auth_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+    benchmark(taps, auth_ms)
@@ -0,0 +1,375 @@
+"""Suite de benchmarks reproducible del camino de autenticación.
+
+Subcomandos:
+  enroll   Registrar tarjetas simuladas (SIM00000000...) en la DB del servidor.
+  http     Carga HTTP con N clientes concurrentes contra server.py
+           (GET /auth_pin/{uid} + POST /verify_pin) o app.py
+           (POST /verify_manual_login): p50/p95/p99 y taps/seg.
+  micro    Microbenchmarks de DatabaseManager y BlockchainSimulated.
+  compare  Comparar dos resultados JSON y salir con error si hay regresiones.
+
+Todos los resultados se pueden guardar con --json para comparar ejecuciones.
+
+Ejemplo:
+  python benchmark_suite.py enroll --db nfc_auth_system.db --cards 1000
+  PIN_LIMIT_IP_RATE=100000 PIN_LIMIT_IP_BURST=100000 uvicorn server:app --port 8000
+  python benchmark_suite.py http --url http://localhost:8000 --concurrency 16 --json actual.json
+  python benchmark_suite.py compare base.json actual.json --tolerance 0.10
+"""
+import argparse
+import contextlib
+import http.client
+import io
+import json
+import math
+import os
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlencode, urlsplit
+
+SIM_PIN = "1234"
+# Reto de un solo uso que /auth_pin deja en el formulario (tap_sessions.py)
+CHALLENGE_FIELD = re.compile(r'name="challenge" value="([^"]*)"')
+
+
+def sim_uid(i: int) -> str:
+    return f"SIM{i:08X}"
+
+
+def percentile(sorted_values, p: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies_ms) -> dict:
+    values = sorted(latencies_ms)
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'mean_ms': round(statistics.mean(values), 3),
+        'p50_ms': round(percentile(values, 50), 3),
+        'p95_ms': round(percentile(values, 95), 3),
+        'p99_ms': round(percentile(values, 99), 3),
+        'max_ms': round(values[-1], 3),
+    }
+
+
+def run_metadata(args) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec="seconds"),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'args': {k: v for k, v in vars(args).items() if k != 'func'},
+    }
+
+
+def save_json(path: str, args, results: dict):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({'meta': run_metadata(args), 'results': results}, f, indent=2)
+    print(f"💾 Resultados guardados en {path}")
+
+
+# ---------- enroll ----------
+def cmd_enroll(args):
+    from database import DatabaseManager
+    from pin_hashing import hash_pin
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = DatabaseManager(args.db)
+        pin_hash = hash_pin(args.pin, db.pin_iterations)
+        report = db.bulk_register_users(
+            (i, (sim_uid(i), f"sim{i}", f"Tarjeta Simulada {i}", "Pruebas", 1, pin_hash))
+            for i in range(args.cards))
+        db.close()
+    print(f"🎫 {report['inserted']} tarjetas simuladas registradas en {args.db} "
+          f"({len(report['errors'])} ya existían), PIN {args.pin}")
+
+
+# ---------- http ----------
+class _Client:
+    """Un kiosco simulado: conexión keep-alive propia y su X-Device-ID"""
+
+    def __init__(self, url: str, device_id: str, timeout: float):
+        parts = urlsplit(url)
+        connection_class = (http.client.HTTPSConnection if parts.scheme == "https"
+                            else http.client.HTTPConnection)
+        self.conn = connection_class(parts.hostname, parts.port, timeout=timeout)
+        self.headers = {"X-Device-ID": device_id}
+
+    def request(self, method: str, path: str, form: dict = None):
+        headers = dict(self.headers)
+        body = None
+        if form is not None:
+            body = urlencode(form)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+
+        start = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read().decode("utf-8", "replace")
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            # Reconectar en la siguiente petición
+            self.conn.close()
+            status, data = "error", ""
+        return status, data, (time.perf_counter() - start) * 1000
+
+
+def _server_tap(client: _Client, uid: str, pin: str, steps: dict):
+    status, html, ms = client.request("GET", f"/auth_pin/{uid}")
+    steps['auth_pin'].append(ms)
+    if status != 200:
+        return status, False, ms
+
+    form = {"nfc_id": uid, "pin": pin}
+    challenge = CHALLENGE_FIELD.search(html)
+    if challenge:
+        form["challenge"] = challenge.group(1)
+    status, html, verify_ms = client.request("POST", "/verify_pin", form)
+    steps['verify_pin'].append(verify_ms)
+    return status, "PERMITTED" in html, ms + verify_ms
+
+
+def _flask_tap(client: _Client, uid: str, pin: str, steps: dict):
+    status, html, ms = client.request("POST", "/verify_manual_login", {"nfc_id": uid, "pin": pin})
+    steps['verify_manual_login'].append(ms)
+    return status, "Bienvenido" in html, ms
+
+
+def cmd_http(args):
+    tap = _server_tap if args.target == "server" else _flask_tap
+    rng = random.Random(args.seed)
+    # Secuencia fija de tarjetas (misma semilla = misma carga en cada ejecución)
+    plan = [sim_uid(rng.randrange(args.cards)) if rng.random() >= args.unknown_rate
+            else f"UNKNOWN{i:08X}" for i in range(args.requests)]
+
+    lock = threading.Lock()
+    taps, statuses, granted = [], {}, [0]
+    steps = {'auth_pin': [], 'verify_pin': [], 'verify_manual_login': []}
+    next_index = [0]
+
+    def worker(n: int):
+        client = _Client(args.url, f"{args.device_prefix}-{n:03d}", args.timeout)
+        local_steps = {name: [] for name in steps}
+        local_taps, local_statuses, local_granted = [], {}, 0
+        while True:
+            with lock:
+                index = next_index[0]
+                next_index[0] += 1
+            if index >= len(plan):
+                break
+            status, ok, ms = tap(client, plan[index], args.pin, local_steps)
+            local_taps.append(ms)
+            local_statuses[str(status)] = local_statuses.get(str(status), 0) + 1
+            local_granted += ok
+
+        with lock:
+            taps.extend(local_taps)
+            granted[0] += local_granted
+            for name, values in local_steps.items():
+                steps[name].extend(values)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    results = {
+        'http': {
+            'target': args.target,
+            'concurrency': args.concurrency,
+            'taps': len(taps),
+            'granted': granted[0],
+            'duration_s': round(elapsed, 3),
+            'taps_per_sec': round(len(taps) / elapsed, 2),
+            'status_codes': statuses,
+            'tap': summarize(taps),
+            'steps': {name: summarize(values) for name, values in steps.items() if values},
+        }
+    }
+
+    r = results['http']
+    print(f"🌐 {args.target} @ {args.url}: {r['taps']} taps, {args.concurrency} clientes, "
+          f"{r['duration_s']} s")
+    print(f"   ⚡ {r['taps_per_sec']} taps/seg | concedidos {r['granted']} | códigos {statuses}")
+    _print_latency("tap completo", r['tap'])
+    for name, summary in r['steps'].items():
+        _print_latency(name, summary)
+    if '429' in statuses:
+        print("   ⚠️  Hubo 429: suba PIN_LIMIT_IP_RATE/_BURST en el servidor para medir el camino completo")
+    if args.json:
+        save_json(args.json, args, results)
+
+
+def _print_latency(label: str, summary: dict):
+    if summary.get('count'):
+        print(f"   ⏱️  {label:<22} p50 {summary['p50_ms']:8.2f} ms | p95 {summary['p95_ms']:8.2f} ms | "
+              f"p99 {summary['p99_ms']:8.2f} ms")
+
+
+# ---------- micro ----------
+def _measure(fn, operations: int) -> dict:
+    latencies = []
+    start = time.perf_counter()
+    for i in range(operations):
+        t0 = time.perf_counter()
+        fn(i)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - start
+    return dict(summarize(latencies), ops_per_sec=round(operations / elapsed, 1))
+
+
+def cmd_micro(args):
+    from blockchain_simulated import BlockchainSimulated
+    from database import DatabaseManager
+
+    n = args.operations
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        db = DatabaseManager(os.path.join(tmp, "micro.db"))
+        db.bulk_register_users((i, (sim_uid(i), f"sim{i}", f"Sim {i}", "Pruebas", 1, None))
+                               for i in range(args.cards))
+        uncached = DatabaseManager(os.path.join(tmp, "micro.db"), cache_size=0)
+        batched = DatabaseManager(os.path.join(tmp, "micro.db"), async_logs=True)
+
+        results['db.get_user_by_nfc (caché)'] = _measure(
+            lambda i: db.get_user_by_nfc(sim_uid(i % 100)), n)
+        results['db.get_user_by_nfc (sin caché)'] = _measure(
+            lambda i: uncached.get_user_by_nfc(sim_uid(i % args.cards)), n)
+        results['db.log_auth_attempt (commit)'] = _measure(
+            lambda i: db.log_auth_attempt(1, sim_uid(i % args.cards), "MICRO", True), n)
+        results['db.log_auth_attempt (por lotes)'] = _measure(
+            lambda i: batched.log_auth_attempt(1, sim_uid(i % args.cards), "MICRO", True), n)
+        batched.log_writer.flush()
+        results['db.get_auth_logs_page (50)'] = _measure(
+            lambda i: db.get_auth_logs_page(limit=50), max(1, n // 10))
+
+        blockchain = BlockchainSimulated(os.path.join(tmp, "ledger.db"), block_interval_ms=10**9)
+        tx_hashes = []
+        results['blockchain.record_auth_attempt'] = _measure(
+            lambda i: tx_hashes.append(blockchain.record_auth_attempt(
+                f"sim{i}", 1_700_000_000 + i, "MICRO", sim_uid(i), True)), n)
+        results['blockchain.verify_transaction'] = _measure(
+            lambda i: blockchain.verify_transaction(tx_hashes[i % len(tx_hashes)]), max(1, n // 10))
+
+        blockchain.close()
+        for manager in (batched, uncached, db):
+            manager.close()
+
+    print(f"🔬 Microbenchmarks ({n} operaciones):")
+    for name, r in results.items():
+        print(f"   {name:<36} {r['ops_per_sec']:>10.0f} ops/seg | p50 {r['p50_ms']:.3f} ms | "
+              f"p99 {r['p99_ms']:.3f} ms")
+    if args.json:
+        save_json(args.json, args, {'micro': results})
+
+
+# ---------- compare ----------
+def _flatten(results: dict):
+    """Métricas comparables: (nombre, valor, True si mayor es mejor)"""
+    metrics = []
+    http_result = results.get('http')
+    if http_result:
+        metrics.append(("http.taps_per_sec", http_result['taps_per_sec'], True))
+        for p in ("p95_ms", "p99_ms"):
+            if p in http_result['tap']:
+                metrics.append((f"http.tap.{p}", http_result['tap'][p], False))
+    for name, r in results.get('micro', {}).items():
+        metrics.append((f"{name}.ops_per_sec", r['ops_per_sec'], True))
+        metrics.append((f"{name}.p99_ms", r['p99_ms'], False))
+    return metrics
+
+
+def cmd_compare(args):
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = {name: value for name, value, _ in _flatten(json.load(f)['results'])}
+    with open(args.current, encoding="utf-8") as f:
+        current = _flatten(json.load(f)['results'])
+
+    regressions = 0
+    print(f"📊 {args.baseline} → {args.current} (tolerancia {args.tolerance:.0%}):")
+    for name, value, higher_is_better in current:
+        if name not in baseline or not baseline[name]:
+            continue
+        change = (value - baseline[name]) / baseline[name]
+        worse = -change if higher_is_better else change
+        regressed = worse > args.tolerance
+        regressions += regressed
+        mark = "❌" if regressed else "✅"
+        print(f"   {mark} {name:<48} {baseline[name]:>12.3f} → {value:>12.3f} ({change:+.1%})")
+
+    if regressions:
+        print(f"❌ {regressions} métricas empeoraron más de un {args.tolerance:.0%}")
+        return 1
+    print("✅ Sin regresiones")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Suite de benchmarks del camino de autenticación")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("enroll", help="Registrar tarjetas simuladas")
+    p.add_argument("--db", default="nfc_auth_system.db")
+    p.add_argument("--cards", type=int, default=1000)
+    p.add_argument("--pin", default=SIM_PIN)
+    p.set_defaults(func=cmd_enroll)
+
+    p = sub.add_parser("http", help="Prueba de carga HTTP")
+    p.add_argument("--url", default="http://localhost:8000")
+    p.add_argument("--target", choices=("server", "flask"), default="server")
+    p.add_argument("--concurrency", type=int, default=8)
+    p.add_argument("--requests", type=int, default=1000, help="Taps totales")
+    p.add_argument("--cards", type=int, default=1000, help="Tarjetas simuladas registradas")
+    p.add_argument("--unknown-rate", type=float, default=0.0,
+                   help="Fracción de taps con tarjetas no registradas")
+    p.add_argument("--pin", default=SIM_PIN)
+    p.add_argument("--device-prefix", default="LOADTEST")
+    p.add_argument("--timeout", type=float, default=30.0)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--json")
+    p.set_defaults(func=cmd_http)
+
+    p = sub.add_parser("micro", help="Microbenchmarks de DB y blockchain")
+    p.add_argument("--operations", type=int, default=5000)
+    p.add_argument("--cards", type=int, default=1000)
+    p.add_argument("--json")
+    p.set_defaults(func=cmd_micro)
+
+    p = sub.add_parser("compare", help="Comparar dos resultados JSON")
+    p.add_argument("baseline")
+    p.add_argument("current")
+    p.add_argument("--tolerance", type=float, default=0.10)
+    p.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""Benchmark: autenticación con y sin el reto de sesión de /tap.
+
+Modo local (por defecto): resolución del usuario y del verificador del
+PIN por autenticación con DatabaseManager real, sin caché de usuarios
+(cada búsqueda llega a SQLite). La verificación del PIN y el registro del
+intento son iguales en los dos flujos y se dejan fuera.
+  - antes: /tap busca al usuario y /authenticate lo vuelve a buscar,
+  - después: /tap lo busca una vez y abre la sesión; /authenticate la consume.
+
+Modo HTTP (--url http://localhost:8000): latencia extremo a extremo de
+POST /tap + POST /authenticate contra un server.py en marcha, enviando o
+no el reto (incluye el hash real del PIN del servidor).
+
+Uso: python benchmark_tap_session.py [autenticaciones] [--url URL] [--uid UID]
+"""
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from database import TEST_USER_PIN, DatabaseManager
+from tap_sessions import TapSessionStore
+
+TEST_NFC_ID = "04A1B2C3D4E5"
+DEVICE_ID = "BENCH-STATION-01"
+BENCH_PIN_ITERATIONS = 1000
+
+
+def local_benchmark(auths: int):
+    sessions = TapSessionStore()
+
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        db = DatabaseManager(os.path.join(tmp, "bench.db"), cache_size=0,
+                             pin_iterations=BENCH_PIN_ITERATIONS)
+
+        def before():
+            db.get_user_by_nfc(TEST_NFC_ID)                          # /tap
+            return db.get_user_for_auth(TEST_NFC_ID)                 # /authenticate
+
+        def after():
+            user, pin_hash = db.get_user_for_auth(TEST_NFC_ID)       # /tap
+            challenge = sessions.open(TEST_NFC_ID, DEVICE_ID, user, pin_hash)
+            return sessions.consume(challenge, TEST_NFC_ID, DEVICE_ID)  # /authenticate
+
+        # Los dos flujos resuelven el mismo verificador del PIN
+        assert before()[1] == after()[1]
+        results = {label: measure(fn, auths) for label, fn in (("sin reto", before),
+                                                               ("con reto", after))}
+        db.close()
+    report(results, "trabajo de backend (2 -> 1 lectura de nfc_users)")
+
+
+def http_benchmark(auths: int, url: str, uid: str):
+    import requests
+
+    session = requests.Session()
+    session.headers["X-Device-ID"] = DEVICE_ID
+
+    def flow(use_challenge: bool):
+        def run():
+            tap = session.post(f"{url}/tap/{uid}", params={"device_id": DEVICE_ID}, timeout=5)
+            tap.raise_for_status()
+            session.post(f"{url}/authenticate", timeout=10, json={
+                "nfc_id": uid,
+                "pin": TEST_USER_PIN,
+                "device_id": DEVICE_ID,
+                "challenge": tap.json()["challenge"] if use_challenge else None,
+            }).raise_for_status()
+        return run
+
+    results = {label: measure(flow(use_challenge), auths)
+               for label, use_challenge in (("sin reto", False), ("con reto", True))}
+    report(results, f"extremo a extremo ({url})")
+
+
+def measure(fn, count: int):
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(results: dict, title: str):
+    print(f"⏱️  Latencia por autenticación, {title}:")
+    for label, latencies in results.items():
+        latencies.sort()
+        p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+        print(f"   {label:<10} media {statistics.mean(latencies):8.4f} ms | p95 {p95:8.4f} ms")
+
+
+def _option(args, name: str, default=None):
+    if name not in args:
+        return args, default
+    value = args[args.index(name) + 1]
+    return [a for a in args if a not in (name, value)], value
+
+
+if __name__ == "__main__":
+    args, url = _option(sys.argv[1:], "--url")
+    args, uid = _option(args, "--uid", TEST_NFC_ID)
+    auths = int(args[0]) if args else 2000
+
+    if url:
+        http_benchmark(auths, url, uid)
+    else:
+        local_benchmark(auths)
@@ -0,0 +1,43 @@
+"""Benchmark: ráfaga de lecturas de tarjetas contra get_user_by_nfc.
+
+Mezcla tarjetas registradas y una desconocida, con y sin caché de
+usuarios, y muestra cuántas búsquedas llegaron realmente a SQLite.
+
+Uso: python benchmark_user_cache.py [lecturas]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from database import DatabaseManager
+
+CARDS = ["04A1B2C3D4E5", "04F6G7H8I9J0", "04K1L2M3N4O5", "DEADBEEF"]
+
+
+def flood(db: DatabaseManager, taps: int) -> float:
+    start = time.perf_counter()
+    for i in range(taps):
+        db.get_user_by_nfc(CARDS[i % len(CARDS)])
+    return taps / (time.perf_counter() - start)
+
+
+def benchmark(taps: int = 20000):
+    for label, cache_size in (("sin caché", 0), ("con caché", 1024)):
+        with tempfile.TemporaryDirectory() as tmp:
+            with contextlib.redirect_stdout(io.StringIO()):
+                db = DatabaseManager(os.path.join(tmp, "bench.db"), cache_size=cache_size)
+            try:
+                rate = flood(db, taps)
+                stats = db.cache_stats()
+            finally:
+                db.close()
+
+        disk = taps if cache_size == 0 else stats['misses']
+        print(f"⏱️  {label}: {rate:.0f} lecturas/seg, consultas a SQLite: {disk}/{taps}")
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -2,46 +2,172 @@ from web3 import Web3
 import json
 from datetime import datetime
 import hashlib
+import logging
+import threading
+
+from ledger_record import LedgerRecord, digest_from_hex
+from ledger_store import SQLiteLedgerStore, compute_block_hash, GENESIS_HASH
+from merkle import verify_merkle_proof
+from observability import LEDGER_RECORD_SECONDS, SAMPLED, setup_logging, timed
+
+logger = logging.getLogger(__name__)
 
 class BlockchainSimulated:
-    """Simulador de Blockchain para desarrollo"""
+    """Simulador de Blockchain para desarrollo.
+
+    Los intentos se acumulan como transacciones pendientes y se sellan en
+    un bloque cada 'block_size' registros o cada 'block_interval_ms'
+    milisegundos (lo que ocurra antes). Cada bloque lleva la raíz de
+    Merkle de sus transacciones y el hash del bloque anterior.
+    """
     
-    def __init__(self):
-        print("🔗 Blockchain SIMULADA iniciada")
-        self.records = []
+    def __init__(self, ledger_path: str = "blockchain_ledger.db",
+                 block_size: int = 100, block_interval_ms: int = 500):
+        # Ledger persistente: sobrevive a reinicios y no se relee al arrancar
+        self.ledger = SQLiteLedgerStore(ledger_path)
+        self.block_size = block_size
+        self.block_interval = block_interval_ms / 1000
+
+        # Pendientes indexados por el hash binario (32 bytes)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._seal_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sealer = threading.Thread(target=self._seal_periodically,
+                                        name="block-sealer", daemon=True)
+        self._sealer.start()
+        logger.info("🔗 Blockchain SIMULADA iniciada (%d bloques)", self.ledger.block_count())
     
+    @staticmethod
+    def compute_tx_hash(user_id: str, timestamp: float, device_id: str,
+                        nfc_id: str, success: bool) -> str:
+        """SHA-256 completo de una serialización canónica de los campos"""
+        tx_data = json.dumps([user_id, timestamp, device_id, nfc_id, bool(success)],
+                             separators=(',', ':'))
+        return f"0x{hashlib.sha256(tx_data.encode()).hexdigest()}"
+    
+    @timed(LEDGER_RECORD_SECONDS)
     def record_auth_attempt(self, user_id: str, timestamp: float, 
                           device_id: str, nfc_id: str, success: bool):
         """Registrar autenticación en blockchain simulada"""
+        tx_hash = self.compute_tx_hash(user_id, timestamp, device_id, nfc_id, success)
+        record = LedgerRecord.from_row(tx_hash, user_id, timestamp, device_id, nfc_id, success)
+
+        with self._lock:
+            self._pending[record.tx_digest] = record
+            block_full = len(self._pending) >= self.block_size
+
+        logger.info("✅ Registro en blockchain simulada: %s (pendiente)", tx_hash, extra=SAMPLED)
+        if block_full:
+            self.seal_block()
         
-        # Crear hash único para la transacción
-        tx_data = f"{user_id}{timestamp}{device_id}{nfc_id}{success}"
-        tx_hash = hashlib.sha256(tx_data.encode()).hexdigest()[:20]
-        
-        record = {
-            'user_id': user_id,
-            'timestamp': timestamp,
-            'device_id': device_id,
-            'nfc_id': nfc_id,
-            'success': success,
-            'tx_hash': f"0x{tx_hash}",
-            'block_number': len(self.records) + 1
+        return tx_hash
+    
+    def seal_block(self):
+        """Sellar las transacciones pendientes en un bloque nuevo"""
+        with self._seal_lock:
+            with self._lock:
+                if not self._pending:
+                    return None
+                records = list(self._pending.values())[:self.block_size]
+
+            block = self.ledger.append_block(records)
+
+            # Quitar de pendientes solo después de confirmar el bloque, así
+            # verify_transaction nunca ve un hueco entre ambos estados
+            with self._lock:
+                for record in records:
+                    self._pending.pop(record.tx_digest, None)
+
+        if block:
+            logger.info("⛓️  Bloque %d sellado: %d tx, merkle %s…",
+                        block['block_number'], block['tx_count'], block['merkle_root'][:18])
+        return block
+    
+    def _seal_periodically(self):
+        while not self._stop.wait(self.block_interval):
+            while self.pending_count():
+                self.seal_block()
+    
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+    
+    def get_record(self, tx_hash: str):
+        """Obtener el registro completo de una transacción (None si está pendiente o no existe)"""
+        return self.ledger.get(tx_hash)
+    
+    def has_transaction(self, tx_hash: str) -> bool:
+        """¿Ya se registró esta transacción (pendiente o sellada)?"""
+        digest = digest_from_hex(tx_hash)
+        with self._lock:
+            if digest in self._pending:
+                return True
+        return self.ledger.get(tx_hash) is not None
+    
+    def get_block(self, block_number: int):
+        return self.ledger.get_block(block_number)
+    
+    def get_inclusion_proof(self, tx_hash: str):
+        """Prueba de Merkle de que tx_hash está incluida en su bloque (guardada al sellar)"""
+        inclusion = self.ledger.get_inclusion_proof(tx_hash)
+        if inclusion is None:
+            return None
+
+        block_number, root, proof = inclusion
+        return {
+            'tx_hash': tx_hash,
+            'block_number': block_number,
+            'merkle_root': root,
+            'proof': [(sibling.hex(), is_left) for sibling, is_left in proof],
         }
-        
-        self.records.append(record)
-        print(f"✅ Registro en blockchain simulada: {record['tx_hash']}")
-        
-        return record['tx_hash']
+    
+    @staticmethod
+    def verify_inclusion_proof(inclusion: dict) -> bool:
+        """Comprobar una prueba de inclusión en O(log n) hashes"""
+        proof = [(bytes.fromhex(sibling), is_left) for sibling, is_left in inclusion['proof']]
+        root = bytes.fromhex(inclusion['merkle_root'][2:])
+        return verify_merkle_proof(digest_from_hex(inclusion['tx_hash']), proof, root)
     
     def verify_transaction(self, tx_hash: str):
-        """Verificar transacción"""
-        for record in self.records:
-            if record['tx_hash'] == tx_hash:
+        """Verificar transacción (pendiente, o sellada con prueba de Merkle válida)"""
+        try:
+            digest = digest_from_hex(tx_hash)
+        except ValueError:
+            return False
+
+        with self._lock:
+            if digest in self._pending:
                 return True
-        return False
+
+        inclusion = self.get_inclusion_proof(tx_hash)
+        return inclusion is not None and self.verify_inclusion_proof(inclusion)
+    
+    def verify_chain(self) -> bool:
+        """Recorrer toda la cadena comprobando enlaces y hashes de bloque"""
+        prev_hash = GENESIS_HASH
+        for block in self.ledger.iter_blocks():
+            expected = compute_block_hash(block['block_number'], prev_hash, block['merkle_root'],
+                                          block['sealed_at'], block['tx_count'])
+            if block['prev_hash'] != prev_hash or block['block_hash'] != expected:
+                return False
+            prev_hash = block['block_hash']
+        return True
+    
+    def close(self):
+        """Detener el sellado periódico y sellar lo pendiente"""
+        self._stop.set()
+        self._sealer.join()
+        while self.pending_count():
+            self.seal_block()
+        self.ledger.close()
 
 # Prueba rápida
 if __name__ == "__main__":
+    setup_logging()
     blockchain = BlockchainSimulated()
     tx = blockchain.record_auth_attempt("test_user", datetime.now().timestamp(), "device_01", "NFC123", True)
-    print(f"Transacción: {tx}")
\ No newline at end of file
+    print(f"Transacción: {tx}")
+    blockchain.seal_block()
+    print(f"Verificada: {blockchain.verify_transaction(tx)}")
+    blockchain.close()
@@ -0,0 +1,162 @@
+"""Alta masiva de tarjetas NFC desde CSV o JSONL.
+
+Columnas / claves: nfc_id, username, full_name, department,
+security_level (opcional, 1 por defecto) y, opcionalmente, pin (4
+dígitos, se guarda su hash) o pin_hash (verificador ya calculado con
+pin_hashing.hash_pin). Sin PIN la tarjeta queda registrada pero no puede
+autenticarse hasta que se le asigne uno.
+
+Uso: python bulk_enrollment.py usuarios.csv [--db nfc_auth_system.db] [--errores errores.csv]
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from database import DatabaseManager
+from observability import setup_logging
+from pin_hashing import hash_pin, pin_iterations
+from user_cache import normalize_nfc_id
+
+REQUIRED_FIELDS = ('nfc_id', 'username', 'full_name', 'department')
+
+
+def detect_format(filename: str) -> str:
+    return "jsonl" if filename.lower().endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+def read_rows(stream, fmt: str = "csv"):
+    """Filas del fichero como (número de fila, dict o None, error)"""
+    if fmt == "csv":
+        # Fila 1 = cabecera, así el número coincide con el de la hoja de cálculo
+        for row_number, row in enumerate(csv.DictReader(stream), start=2):
+            yield row_number, row, None
+        return
+
+    for row_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield row_number, None, f"JSON inválido: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield row_number, None, "Cada línea debe ser un objeto JSON"
+            continue
+        yield row_number, row, None
+
+
+def validate_row(row: dict):
+    """Devuelve (valores, pin en claro o None, error)"""
+    missing = [field for field in REQUIRED_FIELDS if not str(row.get(field) or "").strip()]
+    if missing:
+        return None, None, f"Faltan campos: {', '.join(missing)}"
+
+    try:
+        security_level = int(row.get('security_level') or 1)
+    except (TypeError, ValueError):
+        return None, None, f"security_level inválido: {row.get('security_level')!r}"
+    if security_level < 1:
+        return None, None, "security_level debe ser al menos 1"
+
+    pin = str(row.get('pin') or "").strip() or None
+    pin_hash = str(row.get('pin_hash') or "").strip() or None
+    if pin and not (len(pin) == 4 and pin.isdigit()):
+        return None, None, "El PIN debe tener 4 dígitos"
+    if pin_hash and pin_iterations(pin_hash) is None:
+        return None, None, "pin_hash no es un verificador válido"
+
+    values = (normalize_nfc_id(str(row['nfc_id'])), str(row['username']).strip(),
+              str(row['full_name']).strip(), str(row['department']).strip(),
+              security_level, pin_hash)
+    return values, pin, None
+
+
+def enroll(db: DatabaseManager, stream, fmt: str = "csv", hash_workers: int = None) -> dict:
+    """Validar, hashear PINs en paralelo y registrar todo en una transacción.
+
+    Devuelve el informe de DatabaseManager.bulk_register_users con los
+    errores de formato/validación añadidos y 'without_pin'.
+    """
+    users = []
+    plain_pins = []
+    errors = []
+
+    for row_number, row, error in read_rows(stream, fmt):
+        if error is None:
+            values, pin, error = validate_row(row)
+        if error is not None:
+            errors.append({'row': row_number, 'nfc_id': (row or {}).get('nfc_id'), 'error': error})
+            continue
+        if pin:
+            plain_pins.append((len(users), pin))
+        users.append((row_number, values))
+
+    # PBKDF2 libera el GIL: con hilos se usan todos los núcleos. Este es
+    # el paso caro de un alta con PIN en claro (un hash por tarjeta)
+    if plain_pins:
+        workers = hash_workers or os.cpu_count() or 1
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            hashes = executor.map(lambda pin: hash_pin(pin, db.pin_iterations),
+                                  [pin for _index, pin in plain_pins])
+            for (index, _pin), pin_hash in zip(plain_pins, hashes):
+                row_number, values = users[index]
+                users[index] = (row_number, values[:5] + (pin_hash,))
+
+    report = db.bulk_register_users(users)
+    report['errors'] = sorted(errors + report['errors'], key=lambda error: error['row'])
+    report['without_pin'] = sum(1 for _row, values in users if values[5] is None)
+    return report
+
+
+def enroll_upload(db: DatabaseManager, data: bytes, filename: str) -> dict:
+    """Alta masiva desde un fichero subido por HTTP (bytes)"""
+    stream = io.StringIO(data.decode("utf-8-sig"), newline="")
+    return enroll(db, stream, detect_format(filename))
+
+
+def write_error_report(errors, path: str):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=['row', 'nfc_id', 'error'])
+        writer.writeheader()
+        writer.writerows(errors)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Alta masiva de tarjetas NFC (CSV/JSONL)")
+    parser.add_argument("archivo")
+    parser.add_argument("--db", default="nfc_auth_system.db")
+    parser.add_argument("--formato", choices=("csv", "jsonl"))
+    parser.add_argument("--errores", help="Guardar los errores por fila en este CSV")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    fmt = args.formato or detect_format(args.archivo)
+    db = DatabaseManager(args.db)
+    try:
+        start = time.perf_counter()
+        with open(args.archivo, newline="", encoding="utf-8-sig") as stream:
+            report = enroll(db, stream, fmt)
+        elapsed = time.perf_counter() - start
+    finally:
+        db.close()
+
+    print(f"📥 {report['inserted']} tarjetas registradas en {elapsed:.2f} s "
+          f"({report['without_pin']} sin PIN), {len(report['errors'])} errores")
+    for error in report['errors'][:20]:
+        print(f"   ❌ Fila {error['row']} ({error['nfc_id']}): {error['error']}")
+    if len(report['errors']) > 20:
+        print(f"   ... y {len(report['errors']) - 20} más")
+    if args.errores and report['errors']:
+        write_error_report(report['errors'], args.errores)
+        print(f"📝 Errores guardados en {args.errores}")
+    return 0 if not report['errors'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Optional
+
+from observability import TAP_TO_READ_SECONDS
+from pcsc_backend import PNP_NOTIFICATION, SCARD_STATE_UNAWARE, is_card_present, is_reader_gone
+from tap_debouncer import CardEvent, TapDebouncer
+
+logger = logging.getLogger(__name__)
+
+
+class CardPresenceMonitor:
+    """Monitor de presencia de tarjetas basado en notificaciones PC/SC.
+
+    En lugar de sondear con sleep + APDU, bloquea en el cambio de estado
+    del lector y solo lee el UID cuando una tarjeta acaba de llegar.
+
+    APIs:
+      - wait_for_card(timeout): bloqueante, devuelve el UID.
+      - start(on_card, on_removed=None) / stop(): callbacks en un hilo.
+      - async for event in monitor.cards(): iterador asíncrono.
+
+    Con hotplug=True vigila todos los lectores conectados y también
+    detecta lectores que se conectan o desconectan en caliente.
+
+    Los eventos pasan por un TapDebouncer: una tarjeta que parpadea o se
+    retira y vuelve antes de 'hold_off' segundos no genera eventos nuevos.
+    """
+
+    def __init__(self, backend=None, readers=None, poll_timeout: float = 1.0,
+                 hotplug: bool = False, hold_off: float = 0.75):
+        if backend is None:
+            from pcsc_backend import PCSCBackend
+            backend = PCSCBackend()
+
+        self.backend = backend
+        self.readers = list(readers) if readers else backend.list_readers()
+        self.poll_timeout = poll_timeout
+        self.hotplug = hotplug
+
+        self._states = {reader: SCARD_STATE_UNAWARE for reader in self.readers}
+        if hotplug:
+            self._states[PNP_NOTIFICATION] = SCARD_STATE_UNAWARE
+        self.debouncer = TapDebouncer(hold_off)
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---------- núcleo ----------
+    def poll_events(self, timeout: float):
+        """Esperar hasta 'timeout' segundos y devolver los CardEvent ocurridos"""
+        changed = self.backend.wait_for_change(self._states, timeout)
+        events = []
+
+        for reader, state in changed.items():
+            now = time.monotonic()
+            if reader == PNP_NOTIFICATION:
+                self._states[reader] = state
+                events.extend(self._sync_readers(now))
+                continue
+
+            if is_reader_gone(state):
+                events.extend(self._drop_reader(reader, now))
+                continue
+            self._states[reader] = state
+
+            uid = self.backend.read_uid(reader) if is_card_present(state) else None
+            if uid is not None:
+                # Tap-to-read: desde el aviso de cambio hasta tener el UID
+                TAP_TO_READ_SECONDS.observe(time.monotonic() - now)
+                events.extend(self.debouncer.seen(reader, uid, now))
+            else:
+                self.debouncer.lost(reader, now)
+
+        events.extend(self.debouncer.expire())
+        return events
+
+    def _sync_readers(self, now: float):
+        events = []
+        current = set(self.backend.list_readers())
+
+        for reader in sorted(current - set(self.readers)):
+            self.readers.append(reader)
+            self._states[reader] = SCARD_STATE_UNAWARE
+            events.append(CardEvent("reader_added", reader, None, now))
+
+        for reader in [r for r in self.readers if r not in current]:
+            events.extend(self._drop_reader(reader, now))
+        return events
+
+    def _drop_reader(self, reader: str, now: float):
+        if reader not in self._states:
+            return []
+
+        events = []
+        del self._states[reader]
+        if reader in self.readers:
+            self.readers.remove(reader)
+        events.extend(self.debouncer.forget(reader, now))
+        events.append(CardEvent("reader_removed", reader, None, now))
+        return events
+
+    def events(self, timeout: float = None):
+        """Generador de CardEvent hasta 'timeout' segundos (None = sin límite) o stop()"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while not self._stop.is_set():
+            wait = self.poll_timeout
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                wait = min(wait, remaining)
+            removal_due = self.debouncer.next_deadline()
+            if removal_due is not None:
+                # Despertar a tiempo para emitir el "removed" pendiente
+                wait = max(0.0, min(wait, removal_due - time.monotonic()))
+            for event in self.poll_events(wait):
+                yield event
+
+    # ---------- API bloqueante ----------
+    def wait_for_card(self, timeout: float = 30) -> Optional[str]:
+        """Esperar la llegada de una tarjeta y devolver su UID"""
+        if self._thread is None:
+            self._stop.clear()
+        for event in self.events(timeout):
+            if event.kind == "inserted":
+                return event.uid
+        return None
+
+    # ---------- API con callbacks ----------
+    def start(self, on_card=None, on_removed=None, on_event=None):
+        """Atender tarjetas en un hilo: on_card(reader, uid) / on_removed(reader, uid).
+
+        on_event(event) recibe todos los CardEvent, incluidos reader_added/reader_removed.
+        """
+        self._stop.clear()
+        callbacks = {"inserted": on_card, "removed": on_removed}
+
+        def run():
+            for event in self.events():
+                try:
+                    if on_event is not None:
+                        on_event(event)
+                    callback = callbacks.get(event.kind)
+                    if callback is not None:
+                        callback(event.reader, event.uid)
+                except Exception as e:
+                    logger.warning("⚠️  Error en callback de tarjeta: %s", e)
+
+        self._thread = threading.Thread(target=run, name="card-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.backend.cancel()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    # ---------- API asíncrona ----------
+    async def cards(self):
+        """Iterador asíncrono de CardEvent (el monitor corre en un hilo aparte)"""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+
+        def forward(kind):
+            def callback(reader, uid):
+                event = CardEvent(kind, reader, uid, time.monotonic())
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            return callback
+
+        self.start(forward("inserted"), forward("removed"))
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            await loop.run_in_executor(None, self.stop)
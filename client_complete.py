@@ -1,33 +1,129 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import os
+import threading
 import time
+from contextlib import contextmanager
 from datetime import datetime
 from acr122u_reader import ACR122UReader
+from edge_station import EdgeCredentialStore, EdgeSyncer, HTTPSyncTransport
+from observability import serve_metrics, setup_logging
+from station_auth import StationSigner
 
 class CompleteAuthClient:
-    def __init__(self, api_url: str, device_id: str):
+    def __init__(self, api_url: str, device_id: str, retries: int = 3,
+                 backoff_factor: float = 0.2, health_interval: float = 15.0,
+                 pool_size: int = 4, edge_db: str = None, sync_interval: float = 30.0):
         self.api_url = api_url
         self.device_id = device_id
         self.nfc_reader = ACR122UReader()
+
+        # Sesión HTTP persistente: reutiliza conexiones keep-alive en vez de
+        # abrir un TCP nuevo por petición, con reintentos y backoff
+        self.session = requests.Session()
+        # El servidor limita los intentos de PIN por dispositivo
+        self.session.headers["X-Device-ID"] = device_id
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 503, 504),
+            # POST /authenticate solo se reintenta si no llegó a enviarse
+            allowed_methods=frozenset({"GET"}),
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # Estado de salud cacheado, refrescado en segundo plano
+        self.health_interval = health_interval
+        self.server_healthy = None
+        self.health_checked_at = 0.0
+        self._stop = threading.Event()
+        self._health_thread = None
+
+        # Tiempos por paso del último flujo (ms)
+        self.last_timings = {}
+        # Reto de un solo uso emitido por /tap para la tarjeta en curso
+        self.tap_challenge = None
+
+        # Modo edge: copia local de credenciales para autenticar sin servidor
+        self.edge_store = None
+        self.edge_syncer = None
+        self.offline = False
+        # La sincronización va firmada con el secreto de estación (NFC_STATION_SECRET)
+        signer = StationSigner.from_env(device_id) if edge_db else None
+        if edge_db and signer is None:
+            print("⚠️  Sin NFC_STATION_SECRET: modo edge desactivado")
+        elif edge_db:
+            self.edge_store = EdgeCredentialStore(edge_db)
+            self.edge_syncer = EdgeSyncer(self.edge_store,
+                                          HTTPSyncTransport(self.session, api_url, signer),
+                                          interval=sync_interval)
+    
+    @contextmanager
+    def _timed(self, step: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.last_timings[step] = (time.perf_counter() - start) * 1000
+    
+    def start_health_monitor(self):
+        """Refrescar el estado del servidor cada health_interval segundos"""
+        if self._health_thread is not None:
+            return
+
+        def run():
+            while not self._stop.wait(self.health_interval):
+                self.refresh_health(verbose=False)
+
+        self.refresh_health(verbose=False)
+        self._health_thread = threading.Thread(target=run, name="health-monitor", daemon=True)
+        self._health_thread.start()
+        if self.edge_syncer is not None:
+            self.edge_syncer.start()
+    
+    def close(self):
+        self._stop.set()
+        if self._health_thread is not None:
+            self._health_thread.join()
+            self._health_thread = None
+        if self.edge_syncer is not None:
+            self.edge_syncer.stop()
+            self.edge_store.close()
+        self.session.close()
     
     def start_auth_flow(self):
         print("\n" + "="*60)
         print("       SISTEMA DE AUTENTICACIÓN MFA COMPLETO")
         print("="*60)
+        self.last_timings = {}
          
-        # Verificar conexión con servidor
-        if not self.check_server_health():
-            return False
+        # Verificar conexión con servidor (estado cacheado si está fresco)
+        with self._timed("health"):
+            healthy = self.check_server_health()
+        self.offline = not healthy
+        if self.offline:
+            if self.edge_store is None:
+                return False
+            print(f"📴 MODO OFFLINE: autenticación con la copia local "
+                  f"({self.edge_store.pending_count()} intentos pendientes de subir)")
         
         # Paso 1: Lectura NFC FÍSICA
         print("\n🎫 COLOCAR TARJETA NFC EN EL LECTOR ACR122U...")
-        nfc_id = self.nfc_reader.wait_for_card(30)
+        with self._timed("tap_to_read"):
+            nfc_id = self.nfc_reader.wait_for_card(30)
         
         if not nfc_id:
             print("❌ No se detectó tarjeta NFC")
             return False
         
         # Obtener información del usuario
-        user_info = self.get_user_info(nfc_id)
+        with self._timed("user_lookup"):
+            user_info = self.get_user_info(nfc_id)
         if not user_info:
             print("❌ Tarjeta no registrada en el sistema")
             return False
@@ -37,7 +133,8 @@ class CompleteAuthClient:
         
         # Paso 2: Ingreso de PIN
         print("\n🔒 INGRESE SU PIN:")
-        pin = input("   PIN: ").strip()
+        with self._timed("pin_entry"):
+            pin = input("   PIN: ").strip()
         
         if not pin:
             print("❌ PIN requerido")
@@ -45,7 +142,9 @@ class CompleteAuthClient:
         
         # Paso 3: Autenticación COMPLETA
         print("\n⏳ VERIFICANDO CREDENCIALES...")
-        auth_result = self.authenticate(pin, nfc_id)
+        with self._timed("authenticate"):
+            auth_result = self.authenticate(pin, nfc_id)
+        self.show_timings()
         
         if auth_result.get('success'):
             self.show_success_message(auth_result)
@@ -56,47 +155,90 @@ class CompleteAuthClient:
     
     def check_server_health(self):
         """Verificar que el servidor esté funcionando"""
+        # Con el monitor en marcha y un "sano" reciente, no hay petición;
+        # si el último resultado fue negativo se vuelve a comprobar al momento
+        fresh = time.monotonic() - self.health_checked_at < self.health_interval
+        if self._health_thread is not None and fresh and self.server_healthy:
+            return True
+        return self.refresh_health()
+    
+    def refresh_health(self, verbose: bool = True):
         try:
-            response = requests.get(f"{self.api_url}/health", timeout=5)
-            if response.status_code == 200:
-                print("✅ Servidor conectado correctamente")
-                return True
-            else:
-                print("❌ Servidor no responde correctamente")
-                return False
-        except:
-            print("❌ No se puede conectar al servidor")
-            print("   Ejecute primero: python main.py")
-            return False
+            response = self.session.get(f"{self.api_url}/health", timeout=5)
+            healthy = response.status_code == 200
+            if verbose:
+                if healthy:
+                    print("✅ Servidor conectado correctamente")
+                else:
+                    print("❌ Servidor no responde correctamente")
+        except requests.RequestException:
+            healthy = False
+            if verbose:
+                print("❌ No se puede conectar al servidor")
+                print("   Ejecute primero: python main.py")
+
+        # Al volver la conexión, subir ya la cola de intentos offline
+        if healthy and self.server_healthy is False and self.edge_syncer is not None:
+            self.edge_syncer.trigger()
+
+        self.server_healthy = healthy
+        self.health_checked_at = time.monotonic()
+        return healthy
     
     def get_user_info(self, nfc_id: str):
+        """Una sola llamada (/tap): datos del usuario + reto para /authenticate"""
+        self.tap_challenge = None
+        if self.offline:
+            return self.edge_store.get_user(nfc_id)
         try:
-            response = requests.get(f"{self.api_url}/user/{nfc_id}", timeout=5)
+            response = self.session.post(
+                f"{self.api_url}/tap/{nfc_id}",
+                params={"device_id": self.device_id},
+                timeout=5
+            )
             if response.status_code == 200:
-                return response.json()
+                data = response.json()
+                self.tap_challenge = data.get("challenge")
+                return data["user"]
             return None
-        except:
+        except (requests.RequestException, ValueError, KeyError):
             return None
     
     def authenticate(self, pin: str, nfc_id: str):
+        if self.offline:
+            return self.edge_store.authenticate(nfc_id, pin, self.device_id)
         try:
             auth_data = {
                 "pin": pin,
                 "nfc_id": nfc_id,
-                "device_id": self.device_id
+                "device_id": self.device_id,
+                # Con el reto, el servidor no vuelve a buscar al usuario
+                "challenge": self.tap_challenge,
             }
+            # Un solo uso: un reintento necesita otra lectura de la tarjeta
+            self.tap_challenge = None
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_url}/authenticate",
                 json=auth_data,
                 timeout=10
             )
+            if response.status_code in (429, 503):
+                espera = response.headers.get("Retry-After", "unos")
+                motivo = "Demasiados intentos" if response.status_code == 429 else "Servidor ocupado"
+                return {"success": False,
+                        "message": f"{motivo}, reintente en {espera} segundos"}
             
             return response.json()
             
         except Exception as e:
             return {"success": False, "message": f"Error de conexión: {str(e)}"}
     
+    def show_timings(self):
+        steps = ", ".join(f"{step} {ms:.0f} ms" for step, ms in self.last_timings.items()
+                          if step != "pin_entry")
+        print(f"   ⏱️  {steps}")
+    
     def show_success_message(self, auth_result: dict):
         print("\n" + "🎉" * 25)
         print("        ✅ AUTENTICACIÓN EXITOSA")
@@ -104,7 +246,7 @@ class CompleteAuthClient:
         print(f"   👤 Usuario: {auth_result['user']['full_name']}")
         print(f"   🏢 Departamento: {auth_result['user']['department']}")
         print(f"   🔐 Nivel Seguridad: {auth_result['user']['security_level']}")
-        print(f"   🔗 Blockchain: {auth_result['blockchain_tx']}")
+        print(f"   🔗 Blockchain: {auth_result['blockchain_tx'] or 'pendiente de sincronizar'}")
         print(f"   🕐 Hora: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print("\n   🚀 ACCESO CONCEDIDO AL SISTEMA")
     
@@ -119,7 +261,13 @@ class CompleteAuthClient:
         print("\n   ⚠️  ACCESO DENEGADO")
 
 if __name__ == "__main__":
-    client = CompleteAuthClient("http://localhost:8000", "ACR122U-STATION-01")
+    setup_logging()
+    # Métricas del kiosco (tap-to-read, PIN offline) en su propio puerto
+    if os.environ.get("NFC_METRICS_PORT"):
+        serve_metrics(int(os.environ["NFC_METRICS_PORT"]))
+    client = CompleteAuthClient("http://localhost:8000", "ACR122U-STATION-01",
+                                edge_db="edge_station.db")
+    client.start_health_monitor()
     
     try:
         while True:
@@ -135,4 +283,6 @@ if __name__ == "__main__":
             print("\n" + "-"*60)
     
     except KeyboardInterrupt:
-        print("\n\n⏹️  Aplicación interrumpida por el usuario")
\ No newline at end of file
+        print("\n\n⏹️  Aplicación interrumpida por el usuario")
+    finally:
+        client.close()
\ No newline at end of file
@@ -0,0 +1,110 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class PoolClosedError(RuntimeError):
+    """El pool ya fue cerrado y no entrega más conexiones"""
+
+
+class ConnectionPool:
+    """Pool de conexiones SQLite persistentes y seguro entre hilos.
+
+    Cada conexión se abre una sola vez con WAL activado y un caché de
+    sentencias preparadas propio, de modo que las consultas repetidas
+    (mismo texto SQL) no se vuelven a compilar en cada lectura de tarjeta.
+    """
+
+    def __init__(self, db_name: str, size: int = 5, timeout: float = 5.0,
+                 wal: bool = True, cached_statements: int = 128):
+        if size < 1:
+            raise ValueError("El tamaño del pool debe ser al menos 1")
+
+        self.db_name = db_name
+        self.size = size
+        self.timeout = timeout
+        self.wal = wal
+        self.cached_statements = cached_statements
+
+        self._pool = queue.LifoQueue(maxsize=size)
+        self._all = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _create_connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_name,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        if self.wal:
+            conn.execute("PRAGMA journal_mode=WAL")
+            # En WAL, NORMAL sigue siendo seguro ante caídas del proceso
+            conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        if self._closed:
+            raise PoolClosedError("El pool de conexiones está cerrado")
+
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+
+        # Crear conexiones de forma perezosa hasta alcanzar el tamaño máximo
+        with self._lock:
+            if len(self._all) < self.size:
+                conn = self._create_connection()
+                self._all.append(conn)
+                return conn
+
+        try:
+            return self._pool.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError("No hay conexiones libres en el pool") from None
+
+    def _release(self, conn: sqlite3.Connection):
+        if self._closed:
+            with self._lock:
+                if conn in self._all:
+                    self._all.remove(conn)
+            conn.close()
+            return
+        self._pool.put_nowait(conn)
+
+    @contextmanager
+    def connection(self):
+        """Prestar una conexión; se devuelve al pool al salir del bloque."""
+        conn = self._acquire()
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._release(conn)
+
+    def close(self):
+        """Cerrar todas las conexiones (hook de apagado)."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+
+        # Las conexiones prestadas en este momento se cierran al devolverse
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._all.remove(conn)
+            conn.close()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
@@ -1,168 +1,1179 @@
 import sqlite3
-from datetime import datetime
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 import hashlib
+import heapq
+import itertools
+import logging
+import os
+
+from auth_log_archive import ArchiveCache, archive_file_name, attach_readonly, build_archive
+from auth_log_writer import AuthLogWriter
+from connection_pool import ConnectionPool
+from observability import DB_COMMIT_SECONDS, SAMPLED, USER_LOOKUP_SECONDS, setup_logging, timed
+from pin_hashing import DEFAULT_ITERATIONS, hash_pin
+from user_cache import UserCache, normalize_nfc_id
+
+logger = logging.getLogger(__name__)
+
+# Sentencias del camino caliente: al usar siempre el mismo texto SQL,
+# cada conexión del pool las reutiliza desde su caché de sentencias.
+SQL_INSERT_USER = '''
+    INSERT INTO nfc_users (nfc_id, username, full_name, department, security_level, pin_hash)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+SQL_SELECT_USER = '''
+    SELECT id, nfc_id, username, full_name, department, security_level, is_active, pin_hash
+    FROM nfc_users
+    WHERE nfc_id = ? AND is_active = TRUE
+'''
+
+SQL_INSERT_AUTH_LOG = '''
+    INSERT INTO auth_logs
+    (user_id, nfc_id, device_id, auth_success, blockchain_tx_hash, failure_reason)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+# Migraciones de esquema: (versión, sentencias). La versión aplicada se
+# guarda en PRAGMA user_version, así cada migración corre una sola vez.
+MIGRATIONS = [
+    (1, [
+        # Vista de administración: últimos registros, desempate por id
+        "CREATE INDEX IF NOT EXISTS idx_auth_logs_ts ON auth_logs (auth_timestamp, id)",
+        "CREATE INDEX IF NOT EXISTS idx_auth_logs_nfc_ts ON auth_logs (nfc_id, auth_timestamp, id)",
+        "CREATE INDEX IF NOT EXISTS idx_auth_logs_device_ts ON auth_logs (device_id, auth_timestamp, id)",
+        "CREATE INDEX IF NOT EXISTS idx_auth_logs_user_ts ON auth_logs (user_id, auth_timestamp, id)",
+        # Los fallos son pocos: índice parcial para filtrar solo por ellos
+        "CREATE INDEX IF NOT EXISTS idx_auth_logs_failed_ts ON auth_logs (auth_timestamp, id) "
+        "WHERE auth_success = 0",
+    ]),
+    (2, [
+        # Verificador salado del PIN (pin_hashing.py); nunca el PIN en claro
+        "ALTER TABLE nfc_users ADD COLUMN pin_hash TEXT",
+    ]),
+    (3, [
+        # Agregados por minuto/hora/día, departamento y dispositivo. El
+        # historial previo se carga con: python auth_stats.py backfill
+        """CREATE TABLE IF NOT EXISTS auth_rollups (
+            granularity TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            department TEXT NOT NULL,
+            device_id TEXT NOT NULL,
+            successes INTEGER NOT NULL DEFAULT 0,
+            failures INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (granularity, bucket, department, device_id)
+        ) WITHOUT ROWID""",
+        # Cada INSERT en auth_logs (log_auth_attempt, lote del escritor,
+        # importación offline) suma en la misma transacción
+        """CREATE TRIGGER IF NOT EXISTS trg_auth_logs_rollup AFTER INSERT ON auth_logs
+        BEGIN
+            INSERT INTO auth_rollups (granularity, bucket, department, device_id,
+                                      successes, failures)
+            SELECT g.granularity, strftime(g.fmt, NEW.auth_timestamp),
+                   COALESCE((SELECT department FROM nfc_users WHERE id = NEW.user_id), ''),
+                   NEW.device_id, NEW.auth_success = 1, NEW.auth_success = 0
+            FROM (SELECT 'minute' AS granularity, '%Y-%m-%d %H:%M' AS fmt
+                  UNION ALL SELECT 'hour', '%Y-%m-%d %H:00'
+                  UNION ALL SELECT 'day', '%Y-%m-%d') AS g
+            WHERE true
+            ON CONFLICT (granularity, bucket, department, device_id) DO UPDATE SET
+                successes = successes + excluded.successes,
+                failures = failures + excluded.failures;
+        END""",
+    ]),
+    (4, [
+        # Meses de auth_logs archivados (ver archive_auth_logs). Los
+        # registros del mes con id <= max_id están en el fichero; si aún
+        # quedan en la DB viva (borrado por lotes en curso) no se leen
+        """CREATE TABLE IF NOT EXISTS auth_log_archives (
+            month TEXT PRIMARY KEY,
+            file_name TEXT NOT NULL,
+            max_id INTEGER NOT NULL,
+            row_count INTEGER NOT NULL,
+            first_ts TIMESTAMP,
+            last_ts TIMESTAMP,
+            size_bytes INTEGER NOT NULL,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+    ]),
+    (5, [
+        # Contador de cambios de nfc_users para la sincronización edge. Lo
+        # asignan los triggers dentro de la transacción que escribe la fila,
+        # con el bloqueo de escritura tomado: los números se hacen visibles
+        # en orden de commit, aunque la transacción dure mucho (altas masivas)
+        "ALTER TABLE nfc_users ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0",
+        "UPDATE nfc_users SET change_seq = id",
+        "CREATE INDEX IF NOT EXISTS idx_nfc_users_change_seq ON nfc_users (change_seq)",
+        """CREATE TRIGGER IF NOT EXISTS trg_nfc_users_seq_insert AFTER INSERT ON nfc_users
+        BEGIN
+            UPDATE nfc_users SET change_seq = (SELECT MAX(change_seq) FROM nfc_users) + 1
+            WHERE id = NEW.id;
+        END""",
+        # La guarda evita volver a numerar la fila que acaba de numerar un trigger
+        """CREATE TRIGGER IF NOT EXISTS trg_nfc_users_seq_update AFTER UPDATE ON nfc_users
+        WHEN NEW.change_seq = OLD.change_seq
+        BEGIN
+            UPDATE nfc_users SET change_seq = (SELECT MAX(change_seq) FROM nfc_users) + 1
+            WHERE id = NEW.id;
+        END""",
+    ]),
+]
+
+# Formato de cubo de cada granularidad de auth_rollups (strftime de SQLite)
+ROLLUP_GRANULARITIES = {
+    'minute': '%Y-%m-%d %H:%M',
+    'hour': '%Y-%m-%d %H:00',
+    'day': '%Y-%m-%d',
+}
+ROLLUP_DIMENSIONS = ('department', 'device_id')
+
+# Reconstrucción de un día: minutos desde auth_logs, horas y día desde
+# los minutos (un solo recorrido de los registros). Los minutos se suman:
+# un día archivado puede tener registros en el archivo y en la DB viva
+SQL_REBUILD_MINUTE_ROLLUPS = '''
+    INSERT INTO auth_rollups (granularity, bucket, department, device_id, successes, failures)
+    SELECT 'minute', strftime('%Y-%m-%d %H:%M', al.auth_timestamp),
+           COALESCE(u.department, ''), al.device_id,
+           SUM(al.auth_success = 1), SUM(al.auth_success = 0)
+    FROM {table} al
+    LEFT JOIN nfc_users u ON u.id = al.user_id
+    WHERE al.auth_timestamp >= ? AND al.auth_timestamp < date(?, '+1 day') AND al.id > ?
+    GROUP BY 2, 3, 4
+    ON CONFLICT (granularity, bucket, department, device_id) DO UPDATE SET
+        successes = successes + excluded.successes,
+        failures = failures + excluded.failures
+'''
+
+SQL_REBUILD_COARSE_ROLLUPS = '''
+    INSERT INTO auth_rollups (granularity, bucket, department, device_id, successes, failures)
+    SELECT ?, strftime(?, bucket), department, device_id, SUM(successes), SUM(failures)
+    FROM auth_rollups
+    WHERE granularity = 'minute' AND bucket >= ? AND bucket < date(?, '+1 day')
+    GROUP BY 2, 3, 4
+'''
+
+# Espera máxima de una lectura a que el escritor por lotes confirme lo encolado
+LOG_FLUSH_TIMEOUT = 5.0
+
+# PIN de los usuarios de prueba sembrados en init_database()
+TEST_USER_PIN = "1234"
+
+# Sincronización incremental de estaciones edge: cambios de nfc_users en
+# orden de change_seq, incluidos los desactivados para que se borren
+SQL_SELECT_USER_CHANGES = '''
+    SELECT id, nfc_id, username, full_name, department, security_level,
+           is_active, updated_at, pin_hash, change_seq
+    FROM nfc_users
+    WHERE change_seq > ?
+    ORDER BY change_seq
+    LIMIT ?
+'''
+
+# Intentos autenticados offline: conservan la hora original de la estación
+SQL_IMPORT_AUTH_LOG = '''
+    INSERT INTO auth_logs
+    (user_id, nfc_id, device_id, auth_success, blockchain_tx_hash, failure_reason,
+     auth_timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Columnas de los registros de autenticación (ver _auth_log_from_row)
+SQL_AUTH_LOG_COLUMNS = '''
+    al.auth_timestamp, u.full_name, u.department, al.nfc_id, al.device_id,
+    al.auth_success, al.blockchain_tx_hash, al.failure_reason, al.id
+'''
+
+# Eventos compactos para el detector de anomalías (ver iter_auth_events)
+SQL_AUTH_EVENT_COLUMNS = '''
+    al.id, CAST(strftime('%s', al.auth_timestamp) AS INTEGER), al.nfc_id, al.device_id,
+    al.auth_success, COALESCE(u.security_level, 0)
+'''
+
+SQL_SET_USER_ACTIVE = '''
+    UPDATE nfc_users
+    SET is_active = ?, updated_at = CURRENT_TIMESTAMP
+    WHERE nfc_id = ?
+'''
+
+SQL_SET_USER_PIN = '''
+    UPDATE nfc_users
+    SET pin_hash = ?, updated_at = CURRENT_TIMESTAMP
+    WHERE nfc_id = ?
+'''
+
 
 class DatabaseManager:
-    def __init__(self, db_name="nfc_auth_system.db"):
+    def __init__(self, db_name="nfc_auth_system.db", pool_size: int = 5,
+                 use_pool: bool = True, cache_size: int = 1024,
+                 cache_ttl: float = 300.0, async_logs: bool = False,
+                 log_batch_size: int = 100, log_flush_interval: float = 0.05,
+                 log_durability: str = "buffered",
+                 pin_iterations: int = DEFAULT_ITERATIONS,
+                 archive_dir: str = None, archive_cache_files: int = 4):
         self.db_name = db_name
+        # Meses archivados de auth_logs (por defecto junto a la DB)
+        self.archive_dir = archive_dir or os.path.splitext(db_name)[0] + "_archive"
+        self.archive_cache = ArchiveCache(self.archive_dir, archive_cache_files)
+        # Coste del hash de PIN para los PIN nuevos o cambiados
+        self.pin_iterations = pin_iterations
+        self.pool = ConnectionPool(db_name, size=pool_size) if use_pool else None
+        # cache_size=0 desactiva la caché de usuarios
+        self.user_cache = UserCache(cache_size, cache_ttl) if cache_size else None
         self.init_database()
-    
-    def init_database(self):
-        """Inicializar la base de datos con todas las tablas"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        # Tabla de usuarios NFC
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS nfc_users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nfc_id TEXT UNIQUE NOT NULL,
-                username TEXT NOT NULL,
-                full_name TEXT NOT NULL,
-                department TEXT NOT NULL,
-                security_level INTEGER DEFAULT 1,
-                is_active BOOLEAN DEFAULT TRUE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Tabla de registros de autenticación
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS auth_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                nfc_id TEXT NOT NULL,
-                device_id TEXT NOT NULL,
-                auth_success BOOLEAN NOT NULL,
-                auth_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                blockchain_tx_hash TEXT,
-                failure_reason TEXT,
-                FOREIGN KEY (user_id) REFERENCES nfc_users (id)
+
+        # Avisados (con el nº de registros) tras cada commit en auth_logs
+        self._log_listeners = []
+
+        # Con async_logs, log_auth_attempt encola y un hilo escribe por lotes
+        self.log_writer = None
+        if async_logs:
+            self.log_writer = AuthLogWriter(
+                self._connection, SQL_INSERT_AUTH_LOG,
+                batch_size=log_batch_size,
+                flush_interval=log_flush_interval,
+                durability=log_durability,
+                on_flush=self._notify_log_listeners,
             )
-        ''')
-        
-        # Insertar usuarios de prueba
-        test_users = [
-            ("04A1B2C3D4E5", "analopez", "Ana Lopez", "Inteligencia", 3),
-            ("04F6G7H8I9J0", "carlosruiz", "Carlos Ruiz", "Analisis", 2),
-            ("04K1L2M3N4O5", "mariatorres", "Maria Torres", "Operaciones", 2),
-        ]
-        
-        for nfc_id, username, full_name, department, security_level in test_users:
-            cursor.execute('''
-                INSERT OR IGNORE INTO nfc_users (nfc_id, username, full_name, department, security_level)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (nfc_id, username, full_name, department, security_level))
-        
-        conn.commit()
-        conn.close()
-        print("✅ Base de datos inicializada correctamente")
-    
-    def register_nfc_user(self, nfc_id: str, username: str, full_name: str, 
-                         department: str, security_level: int = 1) -> bool:
-        """Registrar nuevo usuario NFC"""
+
+    @contextmanager
+    def _connection(self):
+        """Conexión del pool, o una conexión efímera si el pool está desactivado"""
+        if self.pool is not None:
+            with self.pool.connection() as conn:
+                yield conn
+            return
+
         conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
         try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _source_connection(self, archive: dict = None):
+        """Conexión para leer auth_logs: la del pool o, para un mes archivado,
+        una propia con su fichero adjunto como 'archive' (ver _source_table)"""
+        if archive is None:
+            with self._connection() as conn:
+                yield conn
+            return
+
+        path = self.archive_cache.path(archive['file_name'])
+        conn = sqlite3.connect(self.db_name, uri=True, timeout=5.0)
+        try:
+            attach_readonly(conn, path, "archive")
+            yield conn
+        finally:
+            conn.close()
+
+    def add_log_listener(self, callback):
+        """Llamar a callback(n) cada vez que se confirman n registros de autenticación.
+
+        Se invoca desde el hilo que escribió (p. ej. el escritor por lotes):
+        debe ser rápido y no bloquear.
+        """
+        self._log_listeners.append(callback)
+
+    def _flush_logs(self):
+        """Antes de leer auth_logs: esperar (acotado) a los registros aún en cola"""
+        if self.log_writer is not None and not self.log_writer.flush(LOG_FLUSH_TIMEOUT):
+            logger.warning("⚠️  Logs de autenticación sin confirmar tras %.0f s: "
+                           "la lectura puede no incluir los más recientes", LOG_FLUSH_TIMEOUT)
+
+    def _notify_log_listeners(self, count: int):
+        for callback in self._log_listeners:
+            try:
+                callback(count)
+            except Exception as e:
+                logger.warning("⚠️  Error avisando de registros nuevos: %s", e)
+
+    def close(self):
+        """Hook de apagado: vaciar los logs pendientes y cerrar las conexiones"""
+        if self.log_writer is not None:
+            self.log_writer.close()
+        if self.pool is not None:
+            self.pool.close()
+
+    def init_database(self):
+        """Inicializar la base de datos con todas las tablas"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+
+            # Tabla de usuarios NFC
             cursor.execute('''
-                INSERT INTO nfc_users (nfc_id, username, full_name, department, security_level)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (nfc_id, username, full_name, department, security_level))
-            
+                CREATE TABLE IF NOT EXISTS nfc_users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    nfc_id TEXT UNIQUE NOT NULL,
+                    username TEXT NOT NULL,
+                    full_name TEXT NOT NULL,
+                    department TEXT NOT NULL,
+                    security_level INTEGER DEFAULT 1,
+                    is_active BOOLEAN DEFAULT TRUE,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+
+            # Tabla de registros de autenticación
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS auth_logs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    nfc_id TEXT NOT NULL,
+                    device_id TEXT NOT NULL,
+                    auth_success BOOLEAN NOT NULL,
+                    auth_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    blockchain_tx_hash TEXT,
+                    failure_reason TEXT,
+                    FOREIGN KEY (user_id) REFERENCES nfc_users (id)
+                )
+            ''')
+
+            # Insertar usuarios de prueba
+            test_users = [
+                ("04A1B2C3D4E5", "analopez", "Ana Lopez", "Inteligencia", 3),
+                ("04F6G7H8I9J0", "carlosruiz", "Carlos Ruiz", "Analisis", 2),
+                ("04K1L2M3N4O5", "mariatorres", "Maria Torres", "Operaciones", 2),
+            ]
+
+            for nfc_id, username, full_name, department, security_level in test_users:
+                cursor.execute('''
+                    INSERT OR IGNORE INTO nfc_users (nfc_id, username, full_name, department, security_level)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (nfc_id, username, full_name, department, security_level))
+
+            conn.commit()
+            previous_version = self.migrate_database(conn)
+
+            # PIN de prueba para los usuarios sembrados que aún no tienen hash.
+            # Antes de la migración 2 no había PIN por usuario y toda tarjeta
+            # entraba con ese mismo PIN: las tarjetas de entonces lo conservan
+            # hasta que se les asigne uno propio (set_user_pin, register_my_card.py)
+            if previous_version < 2:
+                pending = conn.execute(
+                    "SELECT nfc_id FROM nfc_users WHERE pin_hash IS NULL").fetchall()
+            else:
+                pending = conn.execute(f'''
+                    SELECT nfc_id FROM nfc_users
+                    WHERE pin_hash IS NULL AND nfc_id IN ({", ".join("?" * len(test_users))})
+                ''', [user[0] for user in test_users]).fetchall()
+            for (nfc_id,) in pending:
+                conn.execute(SQL_SET_USER_PIN, (hash_pin(TEST_USER_PIN, self.pin_iterations), nfc_id))
+            conn.commit()
+
+            legacy = len({nfc_id for (nfc_id,) in pending} - {user[0] for user in test_users})
+            if legacy:
+                logger.warning("⚠️  %d tarjetas anteriores al PIN por usuario conservan el PIN "
+                               "compartido de prueba: asígneles uno propio", legacy)
+        logger.info("✅ Base de datos inicializada correctamente")
+
+    def migrate_database(self, conn) -> int:
+        """Aplicar las migraciones de esquema pendientes; devuelve la versión de partida"""
+        current = conn.execute("PRAGMA user_version").fetchone()[0]
+
+        for version, statements in MIGRATIONS:
+            if version <= current:
+                continue
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+            logger.info("🛠️  Migración de esquema %s aplicada", version)
+        return current
+
+    def register_nfc_user(self, nfc_id: str, username: str, full_name: str,
+                         department: str, security_level: int = 1, pin: str = None) -> bool:
+        """Registrar nuevo usuario NFC (con 'pin' se guarda solo su hash)"""
+        nfc_id = normalize_nfc_id(nfc_id)
+        pin_hash = hash_pin(pin, self.pin_iterations) if pin else None
+        with self._connection() as conn:
+            try:
+                conn.execute(SQL_INSERT_USER,
+                             (nfc_id, username, full_name, department, security_level, pin_hash))
+                conn.commit()
+                self._invalidate_user(nfc_id)
+                logger.info("✅ Usuario %s registrado con NFC: %s", full_name, nfc_id)
+                return True
+
+            except sqlite3.IntegrityError:
+                conn.rollback()
+                logger.warning("❌ Error: La tarjeta NFC %s ya está registrada", nfc_id)
+                return False
+
+    def bulk_register_users(self, users, chunk_size: int = 500) -> dict:
+        """Alta masiva en una sola transacción (executemany).
+
+        'users' son pares (fila, (nfc_id, username, full_name, department,
+        security_level, pin_hash)) ya validados; 'fila' solo sirve para el
+        informe. Las tarjetas ya registradas o repetidas en la entrada se
+        devuelven como errores por fila sin abortar el resto del lote.
+        Devuelve {'inserted': n, 'errors': [{'row', 'nfc_id', 'error'}]}.
+        """
+        pending = {}
+        errors = []
+        for row, values in users:
+            nfc_id = normalize_nfc_id(values[0])
+            if nfc_id in pending:
+                errors.append({'row': row, 'nfc_id': nfc_id,
+                               'error': f"Tarjeta repetida (fila {pending[nfc_id][0]})"})
+                continue
+            pending[nfc_id] = (row, (nfc_id,) + tuple(values[1:]))
+
+        with self._connection() as conn:
+            # Reservar la escritura ya: nadie puede registrar las mismas
+            # tarjetas entre la comprobación y el INSERT
+            conn.execute("BEGIN IMMEDIATE")
+            nfc_ids = list(pending)
+            for start in range(0, len(nfc_ids), chunk_size):
+                chunk = nfc_ids[start:start + chunk_size]
+                existing = conn.execute(
+                    f"SELECT nfc_id FROM nfc_users WHERE nfc_id IN ({', '.join('?' * len(chunk))})",
+                    chunk).fetchall()
+                for (nfc_id,) in existing:
+                    row, _values = pending.pop(nfc_id)
+                    errors.append({'row': row, 'nfc_id': nfc_id,
+                                   'error': "La tarjeta NFC ya está registrada"})
+
+            conn.executemany(SQL_INSERT_USER, (values for _row, values in pending.values()))
             conn.commit()
-            print(f"✅ Usuario {full_name} registrado con NFC: {nfc_id}")
-            return True
-            
-        except sqlite3.IntegrityError:
-            print(f"❌ Error: La tarjeta NFC {nfc_id} ya está registrada")
+
+        # Las tarjetas nuevas pueden estar en caché como desconocidas
+        if self.user_cache is not None and pending:
+            self.user_cache.clear()
+
+        errors.sort(key=lambda error: error['row'])
+        logger.info("✅ Alta masiva: %d usuarios registrados, %d errores", len(pending), len(errors))
+        return {'inserted': len(pending), 'errors': errors}
+
+    def set_user_active(self, nfc_id: str, active: bool) -> bool:
+        """Activar o desactivar una tarjeta NFC"""
+        nfc_id = normalize_nfc_id(nfc_id)
+        with self._connection() as conn:
+            cursor = conn.execute(SQL_SET_USER_ACTIVE, (active, nfc_id))
+            conn.commit()
+        self._invalidate_user(nfc_id)
+
+        if cursor.rowcount == 0:
+            logger.warning("❌ Error: La tarjeta NFC %s no está registrada", nfc_id)
             return False
-        finally:
-            conn.close()
-    
+
+        estado = "activada" if active else "desactivada"
+        logger.info("✅ Tarjeta NFC %s %s", nfc_id, estado)
+        return True
+
+    def set_user_pin(self, nfc_id: str, pin: str = None, pin_hash: str = None) -> bool:
+        """Cambiar el PIN de una tarjeta (o guardar un hash ya calculado)"""
+        nfc_id = normalize_nfc_id(nfc_id)
+        if pin_hash is None:
+            pin_hash = hash_pin(pin, self.pin_iterations)
+        with self._connection() as conn:
+            cursor = conn.execute(SQL_SET_USER_PIN, (pin_hash, nfc_id))
+            conn.commit()
+        self._invalidate_user(nfc_id)
+        return cursor.rowcount > 0
+
+    def deactivate_user(self, nfc_id: str) -> bool:
+        """Desactivar una tarjeta NFC (p. ej. tarjeta perdida)"""
+        return self.set_user_active(nfc_id, False)
+
     def get_user_by_nfc(self, nfc_id: str):
         """Obtener usuario por ID NFC"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, nfc_id, username, full_name, department, security_level, is_active
-            FROM nfc_users 
-            WHERE nfc_id = ? AND is_active = TRUE
-        ''', (nfc_id,))
-        
-        result = cursor.fetchone()
-        conn.close()
-        
+        user = self._lookup_user(nfc_id)
+        if user is None:
+            return None
+        # El hash del PIN no sale de aquí: el usuario viaja en respuestas. Solo
+        # get_user_changes lo entrega, y /sync/users únicamente a estaciones firmadas
+        return {key: value for key, value in user.items() if key != 'pin_hash'}
+
+    def get_pin_hash(self, nfc_id: str):
+        """Verificador del PIN de una tarjeta activa (misma caché que el usuario)"""
+        user = self._lookup_user(nfc_id)
+        return user['pin_hash'] if user else None
+
+    def get_user_for_auth(self, nfc_id: str):
+        """(usuario sin el hash, verificador del PIN) en una sola búsqueda.
+
+        Para verificar un PIN: el usuario y su hash salen de la misma fila.
+        (None, None) si la tarjeta no existe o está inactiva.
+        """
+        user = self._lookup_user(nfc_id)
+        if user is None:
+            return None, None
+        return {key: value for key, value in user.items() if key != 'pin_hash'}, user['pin_hash']
+
+    @timed(USER_LOOKUP_SECONDS)
+    def _lookup_user(self, nfc_id: str):
+        nfc_id = normalize_nfc_id(nfc_id)
+
+        if self.user_cache is not None:
+            user = self.user_cache.get(nfc_id)
+            if user is not UserCache.MISSING:
+                return user
+
+        with self._connection() as conn:
+            result = conn.execute(SQL_SELECT_USER, (nfc_id,)).fetchone()
+
+        user = None
         if result:
-            return {
+            user = {
                 'id': result[0],
                 'nfc_id': result[1],
                 'username': result[2],
                 'full_name': result[3],
                 'department': result[4],
                 'security_level': result[5],
-                'is_active': bool(result[6])
+                'is_active': bool(result[6]),
+                'pin_hash': result[7]
             }
-        return None
-    
-    def log_auth_attempt(self, user_id: int, nfc_id: str, device_id: str, 
-                        success: bool, blockchain_tx_hash: str = None, 
+
+        # También se cachean las tarjetas desconocidas (búsqueda negativa)
+        if self.user_cache is not None:
+            self.user_cache.put(nfc_id, user)
+        return user
+
+    def _invalidate_user(self, nfc_id: str):
+        if self.user_cache is not None:
+            self.user_cache.invalidate(nfc_id)
+
+    def cache_stats(self) -> dict:
+        """Contadores de aciertos/fallos de la caché de usuarios"""
+        if self.user_cache is None:
+            return {'hits': 0, 'misses': 0, 'hit_rate': 0.0, 'size': 0, 'max_size': 0}
+        return self.user_cache.stats()
+
+    def log_auth_attempt(self, user_id: int, nfc_id: str, device_id: str,
+                        success: bool, blockchain_tx_hash: str = None,
                         failure_reason: str = None):
         """Registrar intento de autenticación"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO auth_logs 
-            (user_id, nfc_id, device_id, auth_success, blockchain_tx_hash, failure_reason)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (user_id, nfc_id, device_id, success, blockchain_tx_hash, failure_reason))
-        
-        conn.commit()
-        conn.close()
-        
-        status = "EXITOSA" if success else "FALLIDA"
-        print(f"📝 Autenticación {status} registrada para NFC: {nfc_id}")
-    
+        # Misma forma que en nfc_users y en los filtros (_auth_log_filters)
+        nfc_id = normalize_nfc_id(nfc_id)
+        record = (user_id, nfc_id, device_id, success, blockchain_tx_hash, failure_reason)
+
+        if self.log_writer is not None:
+            self.log_writer.write(record)
+        else:
+            with DB_COMMIT_SECONDS.labels("single").time(), self._connection() as conn:
+                conn.execute(SQL_INSERT_AUTH_LOG, record)
+                conn.commit()
+            self._notify_log_listeners(1)
+
+        logger.info("📝 Autenticación %s registrada para NFC: %s",
+                    "EXITOSA" if success else "FALLIDA", nfc_id, extra=SAMPLED)
+
+    def get_user_changes(self, cursor: str = None, limit: int = 500) -> dict:
+        """Usuarios modificados después de 'cursor' (último change_seq visto).
+
+        Devuelve {'users', 'next_cursor', 'watermark'}: next_cursor pide la
+        página siguiente de esta misma sincronización (None al terminar) y
+        watermark es la marca a guardar para la próxima. change_seq lo
+        numeran los triggers de la migración 5 en orden de commit, así que
+        ningún cambio confirmado después puede caer detrás de la marca.
+        """
+        since_seq = _decode_change_cursor(cursor) if cursor else 0
+
+        with self._connection() as conn:
+            rows = conn.execute(SQL_SELECT_USER_CHANGES, (since_seq, limit)).fetchall()
+
+        users = [{
+            'id': row[0],
+            'nfc_id': row[1],
+            'username': row[2],
+            'full_name': row[3],
+            'department': row[4],
+            'security_level': row[5],
+            'is_active': bool(row[6]),
+            'updated_at': row[7],
+            'pin_hash': row[8],
+        } for row in rows]
+
+        watermark = cursor
+        if users:
+            watermark = str(rows[-1][9])
+        next_cursor = watermark if len(users) == limit else None
+        return {'users': users, 'next_cursor': next_cursor, 'watermark': watermark}
+
+    def get_card_owners(self, nfc_ids, chunk_size: int = 500) -> dict:
+        """{nfc_id normalizado: {'id', 'username', 'is_active'}} de las tarjetas registradas.
+
+        Incluye las inactivas: un intento offline pudo hacerse antes de que
+        la estación supiera de la baja. Las tarjetas desconocidas no aparecen.
+        """
+        nfc_ids = sorted({normalize_nfc_id(nfc_id) for nfc_id in nfc_ids})
+        owners = {}
+        with self._connection() as conn:
+            for start in range(0, len(nfc_ids), chunk_size):
+                chunk = nfc_ids[start:start + chunk_size]
+                rows = conn.execute(
+                    f"SELECT nfc_id, id, username, is_active FROM nfc_users "
+                    f"WHERE nfc_id IN ({', '.join('?' * len(chunk))})", chunk).fetchall()
+                for nfc_id, user_id, username, is_active in rows:
+                    owners[nfc_id] = {'id': user_id, 'username': username,
+                                      'is_active': bool(is_active)}
+        return owners
+
+    def import_auth_logs(self, records) -> int:
+        """Insertar en una sola transacción intentos registrados offline.
+
+        'records' son tuplas (user_id, nfc_id, device_id, success,
+        blockchain_tx_hash, failure_reason, auth_timestamp).
+        """
+        records = list(records)
+        if not records:
+            return 0
+
+        with DB_COMMIT_SECONDS.labels("import").time(), self._connection() as conn:
+            conn.executemany(SQL_IMPORT_AUTH_LOG, records)
+            conn.commit()
+        self._notify_log_listeners(len(records))
+        logger.info("📥 %d autenticaciones offline importadas", len(records))
+        return len(records)
+
     def get_auth_logs(self, limit: int = 50):
         """Obtener últimos registros de autenticación"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT 
-                al.auth_timestamp,
-                u.full_name,
-                u.department,
-                al.nfc_id,
-                al.device_id,
-                al.auth_success,
-                al.blockchain_tx_hash,
-                al.failure_reason
-            FROM auth_logs al
-            JOIN nfc_users u ON al.user_id = u.id
-            ORDER BY al.auth_timestamp DESC
-            LIMIT ?
-        ''', (limit,))
-        
-        logs = []
-        for row in cursor.fetchall():
-            logs.append({
-                'timestamp': row[0],
-                'full_name': row[1],
-                'department': row[2],
-                'nfc_id': row[3],
-                'device_id': row[4],
-                'success': bool(row[5]),
-                'blockchain_tx': row[6],
-                'failure_reason': row[7]
-            })
-        
-        conn.close()
-        return logs
+        return self.get_auth_logs_page(limit=limit)['logs']
+
+    def get_auth_logs_page(self, limit: int = 50, cursor: str = None,
+                           since=None, until=None, device_id: str = None,
+                           nfc_id: str = None, user_id: int = None,
+                           success: bool = None) -> dict:
+        """Página de registros de autenticación (más recientes primero).
+
+        Paginación por clave (keyset): next_cursor apunta al último registro
+        devuelto y se pasa como cursor para pedir la página siguiente, sin
+        OFFSET, así el coste no crece con la profundidad de la página.
+        since/until aceptan datetime o texto 'YYYY-MM-DD HH:MM:SS'.
+        """
+        self._flush_logs()
+
+        conditions, params = _auth_log_filters(since, until, device_id, nfc_id, user_id, success)
+        if cursor:
+            cursor_ts, cursor_id = _decode_cursor(cursor)
+            conditions.append("(al.auth_timestamp, al.id) < (?, ?)")
+            params.extend([cursor_ts, cursor_id])
+
+        # De lo más reciente a lo más antiguo, entrando en los meses
+        # archivados solo si la página no se llena antes
+        rows = []
+        for start, end, sources in self._auth_log_segments(since, until, descending=True):
+            segment_rows = []
+            for archive, min_id in sources:
+                segment_conditions, segment_params = _segment_filters(start, end, min_id)
+                segment_rows.extend(self._select_auth_log_rows(
+                    archive, SQL_AUTH_LOG_COLUMNS, conditions + segment_conditions,
+                    params + segment_params, limit - len(rows), descending=True, join="JOIN"))
+            if len(sources) > 1:
+                segment_rows.sort(key=lambda row: (row[0], row[8]), reverse=True)
+            rows.extend(segment_rows[:limit - len(rows)])
+            if len(rows) >= limit:
+                break
+
+        logs = [_auth_log_from_row(row) for row in rows]
+
+        next_cursor = None
+        if len(logs) == limit:
+            next_cursor = _encode_cursor(logs[-1]['timestamp'], logs[-1]['id'])
+
+        return {'logs': logs, 'next_cursor': next_cursor}
+
+    def iter_auth_logs(self, chunk_size: int = 1000, since=None, until=None,
+                       device_id: str = None, nfc_id: str = None, user_id: int = None,
+                       success: bool = None):
+        """Registros en orden cronológico, en listas de hasta 'chunk_size'.
+
+        Para exportaciones: la memoria no depende del rango pedido. Incluye
+        los intentos con tarjetas desconocidas (full_name/department None).
+        """
+        conditions, params = _auth_log_filters(since, until, device_id, nfc_id, user_id, success)
+        for rows in self._iter_auth_log_rows(SQL_AUTH_LOG_COLUMNS, conditions, params,
+                                             chunk_size, since, until):
+            yield [_auth_log_from_row(row) for row in rows]
+
+    def iter_auth_events(self, chunk_size: int = 20_000, since=None, until=None):
+        """Eventos compactos en orden cronológico para análisis (anomaly_detector.py).
+
+        Trozos de tuplas (id, segundos epoch UTC, nfc_id, device_id,
+        éxito 0/1, security_level; 0 si la tarjeta es desconocida).
+        """
+        conditions, params = _auth_log_filters(since, until)
+        yield from self._iter_auth_log_rows(SQL_AUTH_EVENT_COLUMNS, conditions, params,
+                                            chunk_size, since, until)
+
+    def get_auth_events_after(self, last_id: int, limit: int = 20_000):
+        """Eventos compactos con id mayor que 'last_id' (modo en vivo del detector)"""
+        self._flush_logs()
+        with self._connection() as conn:
+            return conn.execute(f'''
+                SELECT {SQL_AUTH_EVENT_COLUMNS}
+                FROM auth_logs al
+                LEFT JOIN nfc_users u ON al.user_id = u.id
+                WHERE al.id > ?
+                ORDER BY al.id
+                LIMIT ?
+            ''', (last_id, limit)).fetchall()
+
+    def _iter_auth_log_rows(self, columns: str, conditions, params, chunk_size: int,
+                            since=None, until=None):
+        """Trozos de filas en orden (auth_timestamp, id) por paginación por clave.
+
+        Cada trozo es una consulta corta: la conexión vuelve al pool entre
+        trozos y la memoria no depende del rango recorrido. Recorre los
+        meses archivados que caen en [since, until) y luego la DB viva.
+        """
+        self._flush_logs()
+
+        for start, end, sources in self._auth_log_segments(since, until):
+            streams = []
+            for archive, min_id in sources:
+                segment_conditions, segment_params = _segment_filters(start, end, min_id)
+                streams.append(self._iter_source_rows(
+                    archive, columns, conditions + segment_conditions,
+                    params + segment_params, chunk_size))
+
+            if len(streams) == 1:
+                chunks = streams[0]
+            else:
+                # Mes archivado con registros llegados después: mezcla ordenada
+                merged = heapq.merge(*(itertools.chain.from_iterable(stream) for stream in streams),
+                                     key=lambda row: row[-2:])
+                chunks = iter(lambda: list(itertools.islice(merged, chunk_size)), [])
+            for rows in chunks:
+                yield [row[:-2] for row in rows]
+
+    def _iter_source_rows(self, archive, columns: str, conditions, params, chunk_size: int):
+        """Trozos de una sola fuente (DB viva o archivo), con auth_timestamp e id al final"""
+        after = None
+        while True:
+            page_conditions = list(conditions)
+            page_params = list(params)
+            if after is not None:
+                page_conditions.append("(al.auth_timestamp, al.id) > (?, ?)")
+                page_params.extend(after)
+
+            rows = self._select_auth_log_rows(
+                archive, f"{columns}, al.auth_timestamp, al.id",
+                page_conditions, page_params, chunk_size)
+            if not rows:
+                return
+            yield rows
+            if len(rows) < chunk_size:
+                return
+            after = rows[-1][-2:]
+
+    def _select_auth_log_rows(self, archive, columns: str, conditions, params, limit: int,
+                              descending: bool = False, join: str = "LEFT JOIN"):
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        order = "DESC" if descending else "ASC"
+        with self._source_connection(archive) as conn:
+            return conn.execute(f'''
+                SELECT {columns}
+                FROM {_source_table(archive)} al
+                {join} nfc_users u ON al.user_id = u.id
+                {where}
+                ORDER BY al.auth_timestamp {order}, al.id {order}
+                LIMIT ?
+            ''', list(params) + [limit]).fetchall()
+
+    def _auth_log_segments(self, since=None, until=None, descending: bool = False):
+        """Tramos de tiempo consecutivos [inicio, fin) y de dónde leer cada uno.
+
+        Cada tramo lleva sus fuentes (archivo o None para la DB viva, id
+        mínimo exclusivo). Un mes archivado se lee de su fichero y, en la
+        DB viva, solo lo llegado después (id > max_id). Sin archivos hay un
+        único tramo, la DB viva completa.
+        """
+        since = _format_timestamp(since) if since is not None else None
+        until = _format_timestamp(until) if until is not None else None
+
+        segments = []
+        edge = None
+        for archive in self.list_auth_log_archives():
+            start, end = _month_bounds(archive['month'])
+            if edge != start:
+                segments.append((edge, start, [(None, 0)]))
+            segments.append((start, end, [(archive, 0), (None, archive['max_id'])]))
+            edge = end
+        segments.append((edge, None, [(None, 0)]))
+
+        segments = [(start, end, sources) for start, end, sources in segments
+                    if (end is None or since is None or end > since)
+                    and (start is None or until is None or start < until)]
+        return segments[::-1] if descending else segments
+
+    def get_auth_stats(self, granularity: str = "hour", since=None, until=None,
+                       group_by=('department',), department: str = None,
+                       device_id: str = None, per_bucket: bool = True):
+        """Concedidos/denegados desde auth_rollups (no recorre auth_logs).
+
+        group_by: dimensiones a desglosar ('department', 'device_id' o
+        ninguna). Con per_bucket=False se suma todo el rango. since/until
+        se redondean al cubo de la granularidad; until es exclusivo.
+        Los intentos con tarjeta desconocida tienen department ''.
+        """
+        if granularity not in ROLLUP_GRANULARITIES:
+            raise ValueError(f"Granularidad inválida: {granularity} "
+                             f"(válidas: {', '.join(ROLLUP_GRANULARITIES)})")
+        dimensions = list(group_by or ())
+        invalid = [d for d in dimensions if d not in ROLLUP_DIMENSIONS]
+        if invalid:
+            raise ValueError(f"No se puede agrupar por: {', '.join(invalid)}")
+
+        bucket_format = ROLLUP_GRANULARITIES[granularity]
+        conditions = ["granularity = ?"]
+        params = [granularity]
+        if since is not None:
+            conditions.append("bucket >= strftime(?, ?)")
+            params.extend([bucket_format, _format_timestamp(since)])
+        if until is not None:
+            conditions.append("bucket < strftime(?, ?)")
+            params.extend([bucket_format, _format_timestamp(until)])
+        if department is not None:
+            conditions.append("department = ?")
+            params.append(department)
+        if device_id is not None:
+            conditions.append("device_id = ?")
+            params.append(device_id)
+
+        keys = (['bucket'] if per_bucket else []) + dimensions
+        columns = "".join(f"{key}, " for key in keys)
+        group = f"GROUP BY {', '.join(keys)} ORDER BY {', '.join(keys)}" if keys else ""
+
+        self._flush_logs()
+        with self._connection() as conn:
+            rows = conn.execute(f'''
+                SELECT {columns}SUM(successes), SUM(failures)
+                FROM auth_rollups
+                WHERE {' AND '.join(conditions)}
+                {group}
+            ''', params).fetchall()
+
+        stats = []
+        for row in rows:
+            successes, failures = row[-2] or 0, row[-1] or 0
+            total = successes + failures
+            entry = dict(zip(keys, row))
+            entry.update(successes=successes, failures=failures, total=total,
+                         success_rate=round(successes / total, 4) if total else None)
+            stats.append(entry)
+        return stats
+
+    def rebuild_rollups(self, since=None, progress=None) -> int:
+        """Recalcular auth_rollups desde auth_logs (todo, o desde el día de 'since').
+
+        Trabaja día a día, cada uno en su transacción: los escritores solo
+        esperan lo que tarda un día y los intentos que llegan mientras
+        tanto no se cuentan dos veces. Usa el departamento actual de cada
+        usuario. progress(día) se llama tras cada día. Devuelve los días.
+        """
+        self._flush_logs()
+
+        archives = self.list_auth_log_archives()
+        with self._connection() as conn:
+            first, last = conn.execute(
+                "SELECT date(MIN(auth_timestamp)), date(MAX(auth_timestamp)) FROM auth_logs"
+            ).fetchone()
+            # Los meses archivados también cuentan (ver archive_auth_logs)
+            bounds = [first, last] + [date for archive in archives
+                                      for date in (archive['first_ts'], archive['last_ts'])]
+            bounds = [conn.execute("SELECT date(?)", (b,)).fetchone()[0] for b in bounds if b]
+            first, last = (min(bounds), max(bounds)) if bounds else (None, None)
+            if since is not None:
+                first = conn.execute("SELECT date(?)", (_format_timestamp(since),)).fetchone()[0]
+                last = max(last or first, first)
+        if first is None:
+            return 0
+
+        segments = self._auth_log_segments(first)
+        day = datetime.strptime(first, "%Y-%m-%d")
+        end = datetime.strptime(last, "%Y-%m-%d")
+        days = 0
+        while day <= end:
+            bucket = day.strftime("%Y-%m-%d")
+            while segments[0][1] is not None and segments[0][1] <= bucket:
+                segments.pop(0)
+            sources = segments[0][2]
+            archive = next((archive for archive, _ in sources if archive is not None), None)
+            with self._source_connection(archive) as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                # Con la granularidad en la condición el borrado usa la clave primaria
+                conn.execute('''
+                    DELETE FROM auth_rollups
+                    WHERE granularity IN ('minute', 'hour', 'day')
+                      AND bucket >= ? AND bucket < date(?, '+1 day')
+                ''', (bucket, bucket))
+                for source, min_id in sources:
+                    conn.execute(SQL_REBUILD_MINUTE_ROLLUPS.format(table=_source_table(source)),
+                                 (bucket, bucket, min_id))
+                for granularity in ('hour', 'day'):
+                    conn.execute(SQL_REBUILD_COARSE_ROLLUPS, (
+                        granularity, ROLLUP_GRANULARITIES[granularity], bucket, bucket))
+                conn.commit()
+            days += 1
+            if progress is not None:
+                progress(bucket)
+            day += timedelta(days=1)
+        return days
+
+    def prune_rollups(self, granularity: str, before) -> int:
+        """Borrar cubos de 'granularity' anteriores a 'before' (p. ej. minutos viejos)"""
+        if granularity not in ROLLUP_GRANULARITIES:
+            raise ValueError(f"Granularidad inválida: {granularity}")
+        with self._connection() as conn:
+            removed = conn.execute(
+                "DELETE FROM auth_rollups WHERE granularity = ? AND bucket < strftime(?, ?)",
+                (granularity, ROLLUP_GRANULARITIES[granularity], _format_timestamp(before))).rowcount
+            conn.commit()
+        return removed
+
+    def get_auth_logs_after(self, last_id: int, limit: int = 500):
+        """Registros con id mayor que 'last_id' en orden de escritura (feed en vivo)"""
+        with self._connection() as conn:
+            rows = conn.execute(f'''
+                SELECT {SQL_AUTH_LOG_COLUMNS}
+                FROM auth_logs al
+                LEFT JOIN nfc_users u ON al.user_id = u.id
+                WHERE al.id > ?
+                ORDER BY al.id
+                LIMIT ?
+            ''', (last_id, limit)).fetchall()
+        return [_auth_log_from_row(row) for row in rows]
+
+    def last_auth_log_id(self) -> int:
+        with self._connection() as conn:
+            # El último id asignado puede estar ya archivado: sqlite_sequence
+            # lo conserva (AUTOINCREMENT no reutiliza ids)
+            return conn.execute('''
+                SELECT MAX(COALESCE(MAX(id), 0),
+                           COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'auth_logs'), 0))
+                FROM auth_logs
+            ''').fetchone()[0]
+
+    def list_auth_log_archives(self):
+        """Meses archivados en orden cronológico (filas de auth_log_archives)"""
+        with self._connection() as conn:
+            cursor = conn.execute('''
+                SELECT month, file_name, max_id, row_count, first_ts, last_ts, size_bytes, archived_at
+                FROM auth_log_archives
+                ORDER BY month
+            ''')
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def archive_auth_logs(self, hot_months: int = 3, now: datetime = None,
+                          delete_batch: int = 5000, progress=None):
+        """Pasar a ficheros comprimidos los meses anteriores a los 'hot_months' últimos.
+
+        Cada mes se archiva con auth_log_archive.build_archive, se registra
+        en auth_log_archives y después se borra de la DB viva por lotes de
+        'delete_batch' filas, cada uno en su transacción, para no frenar
+        las escrituras. Lo que llegue más tarde para un mes ya archivado
+        (importaciones offline) se fusiona en la siguiente ejecución.
+        auth_rollups no cambia: las estadísticas conservan lo archivado.
+        progress(mes, registros) se llama tras cada mes. Devuelve los meses.
+        """
+        if hot_months < 1:
+            raise ValueError("Hay que conservar al menos el mes actual (hot_months >= 1)")
+        self._flush_logs()
+
+        cutoff = _month_bounds(_shift_month((now or datetime.utcnow()).strftime("%Y-%m"),
+                                            1 - hot_months))[0]
+        os.makedirs(self.archive_dir, exist_ok=True)
+        previous_archives = {archive['month']: archive for archive in self.list_auth_log_archives()}
+
+        archived = []
+        after = ""
+        while True:
+            with self._connection() as conn:
+                month = conn.execute('''
+                    SELECT strftime('%Y-%m', MIN(auth_timestamp)) FROM auth_logs
+                    WHERE auth_timestamp >= ? AND auth_timestamp < ?
+                ''', (after, cutoff)).fetchone()[0]
+                if month is None:
+                    break
+                start, end = _month_bounds(month)
+                max_id = conn.execute(
+                    "SELECT MAX(id) FROM auth_logs WHERE auth_timestamp >= ? AND auth_timestamp < ?",
+                    (start, end)).fetchone()[0]
+
+            previous = previous_archives.get(month)
+            if previous is not None:
+                max_id = max(max_id, previous['max_id'])
+            file_name = archive_file_name(month, max_id)
+            path = os.path.join(self.archive_dir, file_name)
+
+            conn = sqlite3.connect(self.db_name, uri=True, timeout=5.0)
+            try:
+                stats = build_archive(conn, path, start, end, max_id, previous=(
+                    self.archive_cache.path(previous['file_name']) if previous else None))
+            finally:
+                conn.close()
+
+            with self._connection() as conn:
+                conn.execute('''
+                    INSERT OR REPLACE INTO auth_log_archives
+                    (month, file_name, max_id, row_count, first_ts, last_ts, size_bytes)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (month, file_name, max_id, stats['row_count'], stats['first_ts'],
+                      stats['last_ts'], os.path.getsize(path)))
+                conn.commit()
+
+            # Desde aquí las lecturas ya usan el archivo: el borrado por
+            # lotes no se ve ni duplica registros
+            while True:
+                with self._connection() as conn:
+                    removed = conn.execute('''
+                        DELETE FROM auth_logs WHERE id IN (
+                            SELECT id FROM auth_logs
+                            WHERE auth_timestamp >= ? AND auth_timestamp < ? AND id <= ?
+                            LIMIT ?)
+                    ''', (start, end, max_id, delete_batch)).rowcount
+                    conn.commit()
+                if removed < delete_batch:
+                    break
+
+            if previous is not None and previous['file_name'] != file_name:
+                self.archive_cache.discard(previous['file_name'])
+                old_path = os.path.join(self.archive_dir, previous['file_name'])
+                if os.path.exists(old_path):
+                    os.remove(old_path)
+
+            logger.info("🗄️  auth_logs %s archivado: %d registros en %s",
+                        month, stats['row_count'], file_name)
+            archived.append(month)
+            if progress is not None:
+                progress(month, stats['row_count'])
+            after = end
+        return archived
+
+    def prune_auth_log_archives(self, retention_months: int, now: datetime = None):
+        """Borrar los archivos de meses anteriores a los 'retention_months' últimos.
+
+        Política de retención: los registros desaparecen, pero auth_rollups
+        (estadísticas) se conserva. Devuelve los meses borrados.
+        """
+        cutoff = _shift_month((now or datetime.utcnow()).strftime("%Y-%m"), -retention_months)
+        expired = [archive for archive in self.list_auth_log_archives() if archive['month'] < cutoff]
+        if not expired:
+            return []
+
+        with self._connection() as conn:
+            conn.executemany("DELETE FROM auth_log_archives WHERE month = ?",
+                             [(archive['month'],) for archive in expired])
+            conn.commit()
+        for archive in expired:
+            self.archive_cache.discard(archive['file_name'])
+            path = os.path.join(self.archive_dir, archive['file_name'])
+            if os.path.exists(path):
+                os.remove(path)
+            logger.info("🧹 Archivo de auth_logs %s borrado por retención", archive['month'])
+        return [archive['month'] for archive in expired]
+
+    def vacuum(self):
+        """Devolver al disco el espacio libre de la DB viva (tras archivar mucho)"""
+        with self._connection() as conn:
+            conn.execute("VACUUM")
+
+
+def _auth_log_filters(since=None, until=None, device_id=None, nfc_id=None,
+                      user_id=None, success=None):
+    """Condiciones WHERE (sobre el alias 'al') y sus parámetros"""
+    conditions = []
+    params = []
+    if since is not None:
+        conditions.append("al.auth_timestamp >= ?")
+        params.append(_format_timestamp(since))
+    if until is not None:
+        conditions.append("al.auth_timestamp < ?")
+        params.append(_format_timestamp(until))
+    if device_id is not None:
+        conditions.append("al.device_id = ?")
+        params.append(device_id)
+    if nfc_id is not None:
+        conditions.append("al.nfc_id = ?")
+        params.append(normalize_nfc_id(nfc_id))
+    if user_id is not None:
+        conditions.append("al.user_id = ?")
+        params.append(user_id)
+    if success is not None:
+        # Literal (no parámetro) para que SQLite pueda usar el índice parcial
+        conditions.append("al.auth_success = 1" if success else "al.auth_success = 0")
+    return conditions, params
+
+
+def _auth_log_from_row(row) -> dict:
+    return {
+        'id': row[8],
+        'timestamp': row[0],
+        'full_name': row[1],
+        'department': row[2],
+        'nfc_id': row[3],
+        'device_id': row[4],
+        'success': bool(row[5]),
+        'blockchain_tx': row[6],
+        'failure_reason': row[7]
+    }
+
+
+def _source_table(archive) -> str:
+    return "archive.auth_logs" if archive is not None else "main.auth_logs"
+
+
+def _segment_filters(start, end, min_id: int = 0):
+    """Condiciones de un tramo de _auth_log_segments"""
+    conditions = []
+    params = []
+    if start is not None:
+        conditions.append("al.auth_timestamp >= ?")
+        params.append(start)
+    if end is not None:
+        conditions.append("al.auth_timestamp < ?")
+        params.append(end)
+    if min_id:
+        conditions.append("al.id > ?")
+        params.append(min_id)
+    return conditions, params
+
+
+def _shift_month(month: str, months: int) -> str:
+    """'AAAA-MM' desplazado 'months' meses"""
+    year, mon = map(int, month.split("-"))
+    index = year * 12 + mon - 1 + months
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def _month_bounds(month: str):
+    """Inicio del mes y del siguiente, comparables con auth_timestamp"""
+    return f"{month}-01", f"{_shift_month(month, 1)}-01"
+
+
+def _format_timestamp(value) -> str:
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return str(value)
+
+
+def _encode_cursor(timestamp: str, log_id: int) -> str:
+    return f"{timestamp}|{log_id}"
+
+
+def _decode_cursor(cursor: str):
+    timestamp, _, log_id = cursor.rpartition("|")
+    if not timestamp or not log_id.isdigit():
+        raise ValueError(f"Cursor de paginación inválido: {cursor}")
+    return timestamp, int(log_id)
+
+
+def _decode_change_cursor(cursor: str) -> int:
+    # Las marcas anteriores a change_seq eran "updated_at|id": se vuelve a
+    # sincronizar desde el principio (las estaciones aplican upserts)
+    if "|" in cursor:
+        return 0
+    if not cursor.isdigit():
+        raise ValueError(f"Cursor de sincronización inválido: {cursor}")
+    return int(cursor)
 
 if __name__ == "__main__":
+    setup_logging()
     db = DatabaseManager()
-    print("✅ Base de datos creada exitosamente")
\ No newline at end of file
+    print("✅ Base de datos creada exitosamente")
+    db.close()
@@ -0,0 +1,406 @@
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlencode, urlsplit
+
+from connection_pool import ConnectionPool
+from lockout_store import LockoutStore
+from observability import record_auth_result
+from pin_hashing import verify_pin
+from station_auth import StationSigner
+from user_cache import normalize_nfc_id
+
+logger = logging.getLogger(__name__)
+
+SQL_UPSERT_EDGE_USER = '''
+    INSERT INTO edge_users
+    (nfc_id, user_id, username, full_name, department, security_level, pin_verifier)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (nfc_id) DO UPDATE SET
+        user_id = excluded.user_id,
+        username = excluded.username,
+        full_name = excluded.full_name,
+        department = excluded.department,
+        security_level = excluded.security_level,
+        pin_verifier = excluded.pin_verifier
+'''
+
+SQL_SELECT_EDGE_USER = '''
+    SELECT user_id, nfc_id, username, full_name, department, security_level, pin_verifier
+    FROM edge_users
+    WHERE nfc_id = ?
+'''
+
+SQL_INSERT_OUTBOX = '''
+    INSERT INTO edge_outbox
+    (user_id, username, nfc_id, device_id, success, failure_reason, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+OUTBOX_FIELDS = ('user_id', 'username', 'nfc_id', 'device_id', 'success',
+                 'failure_reason', 'timestamp')
+
+
+class EdgeCredentialStore:
+    """Copia local de credenciales para autenticar sin servidor.
+
+    Guarda los usuarios activos de nfc_users con su verificador de PIN
+    (nunca el PIN) y una cola de salida con los intentos autenticados
+    offline, que EdgeSyncer sube en bloque cuando vuelve la conexión.
+    La marca de agua de la última sincronización (change_seq) se
+    guarda junto a los datos, así la estación solo pide lo que cambió.
+    Los PIN fallidos se cuentan en un LockoutStore sobre la misma base,
+    con la política del servidor: offline tampoco se puede probar PINs
+    sin límite.
+    """
+
+    def __init__(self, db_path: str = "edge_station.db", max_attempts: int = 3,
+                 lockout_seconds: float = 300):
+        # Una base en memoria solo existe dentro de su conexión
+        self.pool = ConnectionPool(db_path, size=1 if db_path == ":memory:" else 2)
+        self.lockouts = LockoutStore(db_path, max_attempts=max_attempts,
+                                     lockout_seconds=lockout_seconds, pool_size=1)
+        with self.pool.connection() as conn:
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS edge_users (
+                    nfc_id TEXT PRIMARY KEY,
+                    user_id INTEGER NOT NULL,
+                    username TEXT NOT NULL,
+                    full_name TEXT NOT NULL,
+                    department TEXT NOT NULL,
+                    security_level INTEGER NOT NULL,
+                    pin_verifier TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS edge_outbox (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    username TEXT NOT NULL,
+                    nfc_id TEXT NOT NULL,
+                    device_id TEXT NOT NULL,
+                    success BOOLEAN NOT NULL,
+                    failure_reason TEXT,
+                    timestamp REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS edge_meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+            ''')
+            conn.commit()
+
+    # ---------- credenciales ----------
+    def apply_user_changes(self, users, watermark: str = None) -> int:
+        """Aplicar una página de cambios del servidor y avanzar la marca de agua"""
+        with self.pool.connection() as conn:
+            active = [(normalize_nfc_id(u['nfc_id']), u['id'], u['username'], u['full_name'],
+                       u['department'], u['security_level'], u['pin_hash'] or "")
+                      for u in users if u['is_active']]
+            removed = [(normalize_nfc_id(u['nfc_id']),) for u in users if not u['is_active']]
+
+            conn.executemany(SQL_UPSERT_EDGE_USER, active)
+            conn.executemany("DELETE FROM edge_users WHERE nfc_id = ?", removed)
+            if watermark is not None:
+                conn.execute("INSERT OR REPLACE INTO edge_meta (key, value) VALUES ('watermark', ?)",
+                             (watermark,))
+            conn.commit()
+        return len(users)
+
+    def watermark(self):
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT value FROM edge_meta WHERE key = 'watermark'").fetchone()
+        return row[0] if row else None
+
+    def get_user(self, nfc_id: str):
+        with self.pool.connection() as conn:
+            row = conn.execute(SQL_SELECT_EDGE_USER, (normalize_nfc_id(nfc_id),)).fetchone()
+        if row is None:
+            return None
+        return {
+            'id': row[0],
+            'nfc_id': row[1],
+            'username': row[2],
+            'full_name': row[3],
+            'department': row[4],
+            'security_level': row[5],
+            'pin_verifier': row[6],
+        }
+
+    def user_count(self) -> int:
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM edge_users").fetchone()[0]
+
+    # ---------- autenticación offline ----------
+    def authenticate(self, nfc_id: str, pin: str, device_id: str) -> dict:
+        """Verificar tarjeta + PIN con la copia local y encolar el intento.
+
+        Devuelve un resultado con la misma forma que POST /authenticate;
+        la transacción de blockchain se genera al subir el intento.
+        """
+        nfc_id = normalize_nfc_id(nfc_id)
+        user = self.get_user(nfc_id)
+        locked_seconds = self.lockouts.check(nfc_id) if user else 0.0
+        success = bool(user and not locked_seconds and verify_pin(pin, user['pin_verifier']))
+        message = "Autenticación offline exitosa"
+
+        if success:
+            failure_reason = None
+            self.lockouts.reset(nfc_id)
+        elif locked_seconds:
+            failure_reason = "Tarjeta Bloqueada"
+            message = f"Cuenta bloqueada. Intente en {int(locked_seconds / 60)} min."
+        elif user:
+            failure_reason = message = "PIN Incorrecto"
+            if self.lockouts.register_failure(nfc_id):
+                message = "Demasiados intentos fallidos. Usuario bloqueado."
+        else:
+            failure_reason = message = "Tarjeta Invalida"
+        record_auth_result(success, failure_reason)
+
+        with self.pool.connection() as conn:
+            conn.execute(SQL_INSERT_OUTBOX, (
+                user['id'] if user else 0,
+                user['username'] if user else "UNKNOWN",
+                nfc_id, device_id, success, failure_reason, time.time()))
+            conn.commit()
+
+        if user:
+            user = {k: v for k, v in user.items() if k != 'pin_verifier'}
+        return {
+            "success": success,
+            "message": message,
+            "user": user,
+            "blockchain_tx": None,
+            "offline": True,
+        }
+
+    # ---------- cola de salida ----------
+    def pending_attempts(self, limit: int = 500):
+        """Intentos aún no subidos, en orden: lista de (seq, intento)"""
+        with self.pool.connection() as conn:
+            rows = conn.execute(f'''
+                SELECT seq, {", ".join(OUTBOX_FIELDS)}
+                FROM edge_outbox
+                ORDER BY seq
+                LIMIT ?
+            ''', (limit,)).fetchall()
+
+        attempts = []
+        for row in rows:
+            attempt = dict(zip(OUTBOX_FIELDS, row[1:]))
+            attempt['success'] = bool(attempt['success'])
+            attempts.append((row[0], attempt))
+        return attempts
+
+    def ack_attempts(self, up_to_seq: int):
+        """Borrar de la cola los intentos ya aceptados por el servidor"""
+        with self.pool.connection() as conn:
+            conn.execute("DELETE FROM edge_outbox WHERE seq <= ?", (up_to_seq,))
+            conn.commit()
+
+    def pending_count(self) -> int:
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM edge_outbox").fetchone()[0]
+
+    def close(self):
+        self.lockouts.close()
+        self.pool.close()
+
+
+# ---------- lado servidor ----------
+def _check_attempt(attempt, owner) -> bool:
+    """¿Concuerda el intento subido con el dueño de la tarjeta en nfc_users?"""
+    if owner is None:
+        # Tarjeta desconocida: la estación solo puede haber registrado un rechazo
+        return not attempt['success'] and attempt['user_id'] == 0
+    return attempt['user_id'] == owner['id'] and attempt['username'] == owner['username']
+
+
+def record_offline_attempts(blockchain, owners, attempts):
+    """Registrar en blockchain los intentos subidos por una estación edge.
+
+    'owners' es DatabaseManager.get_card_owners() de las tarjetas del lote:
+    un intento cuyo usuario no corresponde a la tarjeta, o un éxito con una
+    tarjeta no registrada, se rechaza antes de tocar el ledger.
+    Devuelve (filas para DatabaseManager.import_auth_logs, duplicados,
+    rechazados). El hash de transacción es determinista, así que un lote
+    reenviado (p. ej. se perdió la respuesta) se reconoce y no se duplica.
+    """
+    rows = []
+    duplicates = 0
+    rejected = 0
+
+    for attempt in attempts:
+        nfc_id = normalize_nfc_id(attempt['nfc_id'])
+        if not _check_attempt(attempt, owners.get(nfc_id)):
+            rejected += 1
+            continue
+
+        tx_hash = blockchain.compute_tx_hash(attempt['username'], attempt['timestamp'],
+                                             attempt['device_id'], attempt['nfc_id'],
+                                             attempt['success'])
+        if blockchain.has_transaction(tx_hash):
+            duplicates += 1
+            continue
+
+        blockchain.record_auth_attempt(
+            user_id=attempt['username'],
+            timestamp=attempt['timestamp'],
+            device_id=attempt['device_id'],
+            nfc_id=attempt['nfc_id'],
+            success=attempt['success']
+        )
+        # Misma representación que CURRENT_TIMESTAMP (UTC) en auth_logs
+        auth_timestamp = datetime.fromtimestamp(attempt['timestamp'], timezone.utc)
+        rows.append((attempt['user_id'], nfc_id, attempt['device_id'],
+                     attempt['success'], tx_hash, attempt['failure_reason'],
+                     auth_timestamp.strftime("%Y-%m-%d %H:%M:%S")))
+    return rows, duplicates, rejected
+
+
+def import_offline_attempts(db, blockchain, attempts, station_id: str = None) -> dict:
+    """Validar, registrar en blockchain e importar un lote de intentos offline.
+
+    Todo síncrono (SQLite y ledger): el servidor lo ejecuta en el pool de
+    la DB con AsyncDatabaseManager.run para no bloquear el event loop.
+    """
+    owners = db.get_card_owners(attempt['nfc_id'] for attempt in attempts)
+    rows, duplicates, rejected = record_offline_attempts(blockchain, owners, attempts)
+    if rejected:
+        logger.warning("🚫 %d intentos offline rechazados de la estación %s: "
+                       "usuario y tarjeta no concuerdan", rejected, station_id or "local")
+    return {"imported": db.import_auth_logs(rows), "duplicates": duplicates,
+            "rejected": rejected}
+
+
+# ---------- transportes ----------
+class HTTPSyncTransport:
+    """Sincronización contra server.py (/sync/users y /sync/auth_logs)"""
+
+    def __init__(self, session, api_url: str, signer: StationSigner, timeout: float = 10):
+        self.session = session
+        self.api_url = api_url
+        # El servidor solo atiende peticiones firmadas por una estación (station_auth.py)
+        self.signer = signer
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, query: str = "", body: bytes = b"") -> dict:
+        url = f"{self.api_url}{path}" + (f"?{query}" if query else "")
+        headers = self.signer.headers(method, urlsplit(url).path, query, body)
+        if body:
+            headers["Content-Type"] = "application/json"
+        response = self.session.request(method, url, data=body or None, headers=headers,
+                                        timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def fetch_user_changes(self, cursor: str = None, limit: int = 500) -> dict:
+        params = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        # La cadena firmada es exactamente la que se envía
+        return self._request("GET", "/sync/users", urlencode(params))
+
+    def upload_attempts(self, attempts) -> dict:
+        body = json.dumps({"attempts": attempts}).encode()
+        return self._request("POST", "/sync/auth_logs", body=body)
+
+
+class LocalSyncTransport:
+    """Servidor sustituido por DatabaseManager + BlockchainSimulated locales (pruebas)"""
+
+    def __init__(self, db_manager, blockchain):
+        self.db = db_manager
+        self.blockchain = blockchain
+
+    def fetch_user_changes(self, cursor: str = None, limit: int = 500) -> dict:
+        return self.db.get_user_changes(cursor, limit)
+
+    def upload_attempts(self, attempts) -> dict:
+        return import_offline_attempts(self.db, self.blockchain, attempts)
+
+
+# ---------- sincronización ----------
+class EdgeSyncer:
+    """Mantiene EdgeCredentialStore al día con el servidor.
+
+    Cada sincronización baja solo los usuarios cambiados desde la marca de
+    agua y sube la cola de intentos offline en lotes de 'batch_size'. Un
+    lote se borra de la cola solo cuando el servidor lo ha aceptado.
+    """
+
+    def __init__(self, store: EdgeCredentialStore, transport, interval: float = 30.0,
+                 batch_size: int = 500):
+        self.store = store
+        self.transport = transport
+        self.interval = interval
+        self.batch_size = batch_size
+        self.last_sync = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def pull_users(self) -> int:
+        """Bajar los cambios de usuarios desde la última marca de agua"""
+        cursor = self.store.watermark()
+        applied = 0
+        while True:
+            changes = self.transport.fetch_user_changes(cursor, self.batch_size)
+            applied += self.store.apply_user_changes(changes['users'], changes['watermark'])
+            cursor = changes['next_cursor']
+            if cursor is None:
+                return applied
+
+    def push_attempts(self) -> int:
+        """Subir la cola de intentos offline; devuelve cuántos se aceptaron"""
+        uploaded = 0
+        while True:
+            batch = self.store.pending_attempts(self.batch_size)
+            if not batch:
+                return uploaded
+            result = self.transport.upload_attempts([attempt for _seq, attempt in batch])
+            if result.get('rejected'):
+                # No se reintentan: el servidor nunca aceptará esos intentos
+                logger.warning("⚠️  El servidor rechazó %d intentos offline", result['rejected'])
+            self.store.ack_attempts(batch[-1][0])
+            uploaded += len(batch)
+
+    def sync_once(self) -> bool:
+        try:
+            uploaded = self.push_attempts()
+            applied = self.pull_users()
+        except Exception as e:
+            logger.warning("⚠️  Sincronización edge fallida: %s", e)
+            return False
+
+        self.last_sync = time.time()
+        if uploaded or applied:
+            logger.info("🔄 Sincronización edge: %d intentos subidos, %d usuarios actualizados",
+                        uploaded, applied)
+        return True
+
+    def trigger(self):
+        """Sincronizar ya (p. ej. al volver la conexión) sin esperar al intervalo"""
+        self._wake.set()
+
+    def start(self):
+        if self._thread is not None:
+            return
+
+        def run():
+            while not self._stop.is_set():
+                self.sync_once()
+                self._wake.wait(self.interval)
+                self._wake.clear()
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name="edge-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,68 @@
+import sys
+
+FIELDS = ('tx_hash', 'user_id', 'timestamp', 'device_id', 'nfc_id',
+          'success', 'block_number', 'tx_index')
+
+
+class LedgerRecord:
+    """Registro compacto del ledger.
+
+    Usa __slots__ (sin __dict__ por instancia), guarda el hash como 32
+    bytes binarios en lugar de un texto hexadecimal de 66 caracteres e
+    interna los textos que se repiten en casi todos los registros
+    (usuario, dispositivo, tarjeta). Sigue aceptando acceso tipo dict
+    (record['tx_hash']) para el código que trataba los registros como dicts.
+    """
+
+    __slots__ = ('tx_digest', 'user_id', 'timestamp', 'device_id', 'nfc_id',
+                 'success', 'block_number', 'tx_index')
+
+    def __init__(self, tx_digest: bytes, user_id: str, timestamp: float,
+                 device_id: str, nfc_id: str, success: bool,
+                 block_number: int = None, tx_index: int = None):
+        self.tx_digest = tx_digest
+        self.user_id = sys.intern(user_id)
+        self.timestamp = timestamp
+        self.device_id = sys.intern(device_id)
+        self.nfc_id = sys.intern(nfc_id)
+        self.success = bool(success)
+        self.block_number = block_number
+        self.tx_index = tx_index
+
+    @classmethod
+    def from_row(cls, tx_hash: str, user_id: str, timestamp: float, device_id: str,
+                 nfc_id: str, success: bool, block_number: int = None,
+                 tx_index: int = None):
+        return cls(digest_from_hex(tx_hash), user_id, timestamp, device_id,
+                   nfc_id, success, block_number, tx_index)
+
+    @property
+    def tx_hash(self) -> str:
+        return "0x" + self.tx_digest.hex()
+
+    def as_row(self) -> tuple:
+        """(tx_hash, user_id, timestamp, device_id, nfc_id, success) para SQLite"""
+        return (self.tx_hash, self.user_id, self.timestamp,
+                self.device_id, self.nfc_id, self.success)
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in FIELDS}
+
+    def __getitem__(self, field: str):
+        if field not in FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __eq__(self, other):
+        if not isinstance(other, LedgerRecord):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in self.__slots__)
+
+    def __repr__(self):
+        return (f"LedgerRecord(tx_hash={self.tx_hash!r}, user_id={self.user_id!r}, "
+                f"device_id={self.device_id!r}, success={self.success}, "
+                f"block_number={self.block_number})")
+
+
+def digest_from_hex(tx_hash: str) -> bytes:
+    return bytes.fromhex(tx_hash[2:] if tx_hash.startswith("0x") else tx_hash)
@@ -0,0 +1,275 @@
+import hashlib
+import logging
+import time
+
+from connection_pool import ConnectionPool
+from ledger_record import LedgerRecord, digest_from_hex
+from merkle import decode_proof, encode_proof, merkle_proofs
+
+logger = logging.getLogger(__name__)
+
+GENESIS_HASH = "0x" + "00" * 32
+
+SCHEMA_VERSION = 2
+
+SQL_CREATE_BLOCKS = '''
+    CREATE TABLE IF NOT EXISTS ledger_blocks (
+        block_number INTEGER PRIMARY KEY,
+        prev_hash TEXT NOT NULL,
+        merkle_root TEXT NOT NULL,
+        block_hash TEXT NOT NULL UNIQUE,
+        sealed_at REAL NOT NULL,
+        tx_count INTEGER NOT NULL
+    )
+'''
+
+SQL_CREATE_LEDGER = '''
+    CREATE TABLE IF NOT EXISTS ledger_records (
+        seq INTEGER PRIMARY KEY,
+        tx_hash TEXT NOT NULL UNIQUE,
+        block_number INTEGER NOT NULL,
+        tx_index INTEGER NOT NULL,
+        user_id TEXT NOT NULL,
+        timestamp REAL NOT NULL,
+        device_id TEXT NOT NULL,
+        nfc_id TEXT NOT NULL,
+        success BOOLEAN NOT NULL,
+        merkle_proof BLOB
+    )
+'''
+
+SQL_CREATE_BLOCK_INDEX = '''
+    CREATE INDEX IF NOT EXISTS idx_ledger_records_block
+    ON ledger_records (block_number, tx_index)
+'''
+
+SQL_INSERT_RECORD = '''
+    INSERT INTO ledger_records
+    (tx_hash, block_number, tx_index, user_id, timestamp, device_id, nfc_id, success,
+     merkle_proof)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+SQL_SELECT_RECORD = '''
+    SELECT tx_hash, user_id, timestamp, device_id, nfc_id, success, block_number, tx_index
+    FROM ledger_records
+    WHERE tx_hash = ?
+'''
+
+# Prueba de inclusión guardada al sellar, con la raíz de su bloque
+SQL_SELECT_INCLUSION = '''
+    SELECT r.block_number, b.merkle_root, r.merkle_proof
+    FROM ledger_records r
+    JOIN ledger_blocks b ON b.block_number = r.block_number
+    WHERE r.tx_hash = ?
+'''
+
+SQL_SELECT_BLOCK = '''
+    SELECT block_number, prev_hash, merkle_root, block_hash, sealed_at, tx_count
+    FROM ledger_blocks
+    WHERE block_number = ?
+'''
+
+SQL_SELECT_LAST_BLOCK = '''
+    SELECT block_number, block_hash FROM ledger_blocks
+    ORDER BY block_number DESC LIMIT 1
+'''
+
+
+def compute_block_hash(block_number: int, prev_hash: str, root: str,
+                       sealed_at: float, tx_count: int) -> str:
+    header = f"{block_number}|{prev_hash}|{root}|{sealed_at!r}|{tx_count}"
+    return "0x" + hashlib.sha256(header.encode()).hexdigest()
+
+
+def _block_row_to_dict(row) -> dict:
+    return {
+        'block_number': row[0],
+        'prev_hash': row[1],
+        'merkle_root': row[2],
+        'block_hash': row[3],
+        'sealed_at': row[4],
+        'tx_count': row[5],
+    }
+
+
+class SQLiteLedgerStore:
+    """Almacenamiento persistente y de solo-anexar para el ledger simulado.
+
+    - Los registros se escriben por bloques: un bloque entero (sus
+      transacciones, su raíz de Merkle y el enlace al bloque anterior)
+      se confirma en una única transacción de SQLite.
+    - tx_hash tiene un índice UNIQUE: localizar una transacción es una
+      búsqueda por índice, no un recorrido de todo el ledger.
+    - block_number se asigna dentro de la transacción de escritura
+      (BEGIN IMMEDIATE), así es único aunque sellen varios procesos.
+    - La prueba de Merkle de cada transacción se calcula al sellar (un
+      solo árbol por bloque) y se guarda con el registro: servirla es
+      una lectura, no reconstruir el árbol del bloque.
+    - Al arrancar no se relee el historial: solo se abre el archivo.
+    """
+
+    def __init__(self, db_name: str = "blockchain_ledger.db", pool_size: int = 4):
+        self.db_name = db_name
+        if db_name == ":memory:":
+            # Cada conexión a ":memory:" sería una base distinta: una sola conexión
+            pool_size = 1
+        self.pool = ConnectionPool(db_name, size=pool_size)
+        with self.pool.connection() as conn:
+            self._migrate(conn)
+
+    def _migrate(self, conn):
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(ledger_records)")]
+        legacy = bool(columns) and "seq" not in columns
+        if legacy:
+            # Formato anterior: un "bloque" por registro, sin Merkle
+            conn.execute("ALTER TABLE ledger_records RENAME TO ledger_records_v0")
+
+        conn.execute(SQL_CREATE_BLOCKS)
+        conn.execute(SQL_CREATE_LEDGER)
+        conn.execute(SQL_CREATE_BLOCK_INDEX)
+        conn.commit()
+
+        if legacy:
+            rows = conn.execute('''
+                SELECT tx_hash, user_id, timestamp, device_id, nfc_id, success
+                FROM ledger_records_v0 ORDER BY block_number
+            ''').fetchall()
+            records = [LedgerRecord.from_row(*row) for row in rows]
+            for start in range(0, len(records), 1000):
+                self._write_block(conn, records[start:start + 1000])
+            conn.execute("DROP TABLE ledger_records_v0")
+            logger.info("🛠️  Ledger migrado: %d registros re-sellados en bloques", len(rows))
+
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(ledger_records)")]
+        if "merkle_proof" not in columns:
+            # Versión 1: bloques sellados sin sus pruebas guardadas
+            conn.execute("ALTER TABLE ledger_records ADD COLUMN merkle_proof BLOB")
+            self._backfill_proofs(conn)
+
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+
+    def _backfill_proofs(self, conn):
+        blocks = [row[0] for row in conn.execute("SELECT block_number FROM ledger_blocks")]
+        for block_number in blocks:
+            rows = conn.execute('''
+                SELECT seq, tx_hash FROM ledger_records
+                WHERE block_number = ? ORDER BY tx_index
+            ''', (block_number,)).fetchall()
+            _root, proofs = merkle_proofs([digest_from_hex(tx_hash) for _seq, tx_hash in rows])
+            conn.executemany("UPDATE ledger_records SET merkle_proof = ? WHERE seq = ?",
+                             [(encode_proof(proof), seq) for (seq, _), proof in zip(rows, proofs)])
+        conn.commit()
+        logger.info("🛠️  Pruebas de Merkle guardadas para %d bloques", len(blocks))
+
+    def _write_block(self, conn, records) -> dict:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            last = conn.execute(SQL_SELECT_LAST_BLOCK).fetchone()
+            block_number = last[0] + 1 if last else 1
+            prev_hash = last[1] if last else GENESIS_HASH
+
+            # Un tx_hash ya sellado (mismos datos exactos) no se repite
+            records = [r for r in records
+                       if conn.execute("SELECT 1 FROM ledger_records WHERE tx_hash = ?",
+                                       (r.tx_hash,)).fetchone() is None]
+            if not records:
+                conn.rollback()
+                return None
+
+            root, proofs = merkle_proofs([r.tx_digest for r in records])
+            root = "0x" + root.hex()
+            sealed_at = time.time()
+            block_hash = compute_block_hash(block_number, prev_hash, root,
+                                            sealed_at, len(records))
+
+            conn.execute('''
+                INSERT INTO ledger_blocks
+                (block_number, prev_hash, merkle_root, block_hash, sealed_at, tx_count)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (block_number, prev_hash, root, block_hash, sealed_at, len(records)))
+            conn.executemany(SQL_INSERT_RECORD, [
+                (r.tx_hash, block_number, tx_index, r.user_id, r.timestamp,
+                 r.device_id, r.nfc_id, r.success, encode_proof(proofs[tx_index]))
+                for tx_index, r in enumerate(records)
+            ])
+            conn.commit()
+            for tx_index, r in enumerate(records):
+                r.block_number = block_number
+                r.tx_index = tx_index
+        except Exception:
+            conn.rollback()
+            raise
+
+        return {
+            'block_number': block_number,
+            'prev_hash': prev_hash,
+            'merkle_root': root,
+            'block_hash': block_hash,
+            'sealed_at': sealed_at,
+            'tx_count': len(records),
+        }
+
+    def append_block(self, records) -> dict:
+        """Sellar un bloque con los registros dados y devolver su cabecera.
+
+        records: lista de LedgerRecord (se les asigna block_number y tx_index).
+        Devuelve None si todos los registros ya estaban sellados.
+        """
+        with self.pool.connection() as conn:
+            return self._write_block(conn, records)
+
+    def get(self, tx_hash: str):
+        with self.pool.connection() as conn:
+            row = conn.execute(SQL_SELECT_RECORD, (tx_hash,)).fetchone()
+
+        return LedgerRecord.from_row(*row) if row else None
+
+    def get_inclusion_proof(self, tx_hash: str):
+        """(block_number, merkle_root, prueba) guardados al sellar; None si no está sellada"""
+        with self.pool.connection() as conn:
+            row = conn.execute(SQL_SELECT_INCLUSION, (tx_hash,)).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], decode_proof(row[2])
+
+    def get_block(self, block_number: int):
+        with self.pool.connection() as conn:
+            row = conn.execute(SQL_SELECT_BLOCK, (block_number,)).fetchone()
+        return _block_row_to_dict(row) if row else None
+
+    def get_block_tx_hashes(self, block_number: int):
+        """tx_hash del bloque en orden (las hojas del árbol de Merkle)"""
+        with self.pool.connection() as conn:
+            rows = conn.execute('''
+                SELECT tx_hash FROM ledger_records
+                WHERE block_number = ? ORDER BY tx_index
+            ''', (block_number,)).fetchall()
+        return [row[0] for row in rows]
+
+    def iter_blocks(self):
+        with self.pool.connection() as conn:
+            cursor = conn.execute('''
+                SELECT block_number, prev_hash, merkle_root, block_hash, sealed_at, tx_count
+                FROM ledger_blocks ORDER BY block_number
+            ''')
+            for row in cursor:
+                yield _block_row_to_dict(row)
+
+    def count(self) -> int:
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT MAX(seq) FROM ledger_records").fetchone()
+        return row[0] or 0
+
+    def block_count(self) -> int:
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT MAX(block_number) FROM ledger_blocks").fetchone()
+        return row[0] or 0
+
+    def close(self):
+        self.pool.close()
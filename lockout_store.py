@@ -0,0 +1,133 @@
+import threading
+import time
+
+from connection_pool import ConnectionPool
+from observability import LOCKOUTS
+from user_cache import normalize_nfc_id
+
+# Un solo UPSERT atómico: varios procesos (workers de gunicorn) pueden
+# sumar fallos a la misma clave sin perder incrementos. Los fallos caducan
+# 'ttl' segundos después del último; al llegar a :max se bloquea la clave.
+SQL_REGISTER_FAILURE = '''
+    INSERT INTO lockouts (key, failures, locked_until, expires_at)
+    VALUES (:key, :first_failures, :first_locked_until, :expires_at)
+    ON CONFLICT (key) DO UPDATE SET
+        failures = CASE
+            WHEN (CASE WHEN expires_at <= :now THEN 1 ELSE failures + 1 END) >= :max THEN 0
+            ELSE (CASE WHEN expires_at <= :now THEN 1 ELSE failures + 1 END)
+        END,
+        locked_until = CASE
+            WHEN (CASE WHEN expires_at <= :now THEN 1 ELSE failures + 1 END) >= :max
+                THEN :now + :lockout_seconds
+            ELSE locked_until
+        END,
+        expires_at = :expires_at
+    RETURNING locked_until, failures
+'''
+
+
+class LockoutStore:
+    """Bloqueo por intentos fallidos compartido entre procesos (SQLite).
+
+    Sustituye al dict global por proceso: todos los workers ven los mismos
+    contadores, sobreviven a reinicios y caducan solos. check() y
+    register_failure() son una consulta por clave primaria (O(1)). Cada
+    'purge_interval' segundos se borran las claves caducadas y, si aun así
+    hay más de 'max_entries', las más próximas a caducar, así la tabla
+    nunca crece sin límite. Las claves son UIDs de tarjeta y se guardan
+    normalizados: "04:a1 b2..." y "04A1B2..." cuentan como la misma tarjeta.
+    """
+
+    def __init__(self, db_name: str = "nfc_lockouts.db", max_attempts: int = 3,
+                 lockout_seconds: float = 300, max_entries: int = 100_000,
+                 purge_interval: float = 60.0, pool_size: int = 4):
+        if max_attempts < 1:
+            raise ValueError("max_attempts debe ser al menos 1")
+
+        self.max_attempts = max_attempts
+        self.lockout_seconds = lockout_seconds
+        self.max_entries = max_entries
+        self.purge_interval = purge_interval
+        self.pool = ConnectionPool(db_name, size=1 if db_name == ":memory:" else pool_size)
+        self._next_purge = 0.0
+        self._purge_lock = threading.Lock()
+
+        with self.pool.connection() as conn:
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS lockouts (
+                    key TEXT PRIMARY KEY,
+                    failures INTEGER NOT NULL,
+                    locked_until REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_lockouts_expires ON lockouts (expires_at);
+            ''')
+            conn.commit()
+
+    def check(self, key: str, now: float = None) -> float:
+        """Segundos de bloqueo restantes para 'key' (0.0 si no está bloqueada)"""
+        now = time.time() if now is None else now
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT locked_until FROM lockouts WHERE key = ?",
+                               (normalize_nfc_id(key),)).fetchone()
+        return max(0.0, row[0] - now) if row else 0.0
+
+    def register_failure(self, key: str, now: float = None) -> bool:
+        """Contar un intento fallido; devuelve True si con él la clave queda bloqueada"""
+        now = time.time() if now is None else now
+        locks_now = self.max_attempts <= 1
+        params = {
+            'key': normalize_nfc_id(key),
+            'now': now,
+            'max': self.max_attempts,
+            'lockout_seconds': self.lockout_seconds,
+            'expires_at': now + self.lockout_seconds,
+            'first_failures': 0 if locks_now else 1,
+            'first_locked_until': now + self.lockout_seconds if locks_now else 0.0,
+        }
+
+        with self.pool.connection() as conn:
+            locked_until, failures = conn.execute(SQL_REGISTER_FAILURE, params).fetchone()
+            conn.commit()
+
+        # El contador vuelve a 0 justo en el fallo que bloquea la clave
+        if failures == 0:
+            LOCKOUTS.inc()
+        self._maybe_purge(now)
+        return locked_until > now
+
+    def reset(self, key: str):
+        """Olvidar los fallos de 'key' (p. ej. tras un PIN correcto)"""
+        with self.pool.connection() as conn:
+            conn.execute("DELETE FROM lockouts WHERE key = ?", (normalize_nfc_id(key),))
+            conn.commit()
+
+    def _maybe_purge(self, now: float):
+        if now < self._next_purge or not self._purge_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_purge = now + self.purge_interval
+            self.purge(now)
+        finally:
+            self._purge_lock.release()
+
+    def purge(self, now: float = None) -> int:
+        """Borrar claves caducadas y recortar al máximo de entradas"""
+        now = time.time() if now is None else now
+        with self.pool.connection() as conn:
+            removed = conn.execute("DELETE FROM lockouts WHERE expires_at <= ?",
+                                   (now,)).rowcount
+            removed += conn.execute('''
+                DELETE FROM lockouts WHERE key IN (
+                    SELECT key FROM lockouts ORDER BY expires_at DESC LIMIT -1 OFFSET ?
+                )
+            ''', (self.max_entries,)).rowcount
+            conn.commit()
+        return removed
+
+    def size(self) -> int:
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM lockouts").fetchone()[0]
+
+    def close(self):
+        self.pool.close()
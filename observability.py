@@ -0,0 +1,199 @@
+"""Métricas Prometheus y logging no bloqueante.
+
+Métricas (expuestas en GET /metrics de server.py y app.py):
+  - Histogramas de latencia: lectura de tarjeta (tap-to-read), búsqueda
+    de usuario, verificación de PIN, registro en el ledger y commit en DB.
+  - Contadores de accesos concedidos, denegados (por motivo), bloqueos
+    y anomalías detectadas (por regla).
+Sin prometheus_client instaladas las métricas no hacen nada y /metrics
+lo indica.
+
+Logging: los módulos usan logging.getLogger(__name__); setup_logging()
+(llamado por los puntos de entrada) envía los registros a una cola y un
+hilo aparte los escribe, así el camino caliente no espera a stdout.
+Nivel con NFC_LOG_LEVEL (INFO) y muestreo de los mensajes por petición
+con NFC_LOG_SAMPLE_RATE (1.0 = todos, 0.01 = uno de cada cien); los
+avisos y errores nunca se descartan.
+"""
+import atexit
+import contextlib
+import functools
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram
+    from prometheus_client import REGISTRY, generate_latest, multiprocess, start_http_server
+except ImportError:  # Opcional: sin prometheus_client las métricas no hacen nada
+    Counter = Histogram = None
+
+LOG_LEVEL_ENV = "NFC_LOG_LEVEL"
+LOG_SAMPLE_RATE_ENV = "NFC_LOG_SAMPLE_RATE"
+LOG_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+
+# extra= de los mensajes por petición, los únicos sujetos a muestreo
+SAMPLED = {"sampled": True}
+
+
+# ---------- métricas ----------
+class _NullMetric(contextlib.ContextDecorator):
+    """Sustituto sin efecto con la misma interfaz que usan los módulos"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+    def time(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _histogram(name, documentation, buckets, labelnames=()):
+    if Histogram is None:
+        return _NullMetric()
+    return Histogram(name, documentation, labelnames, buckets=buckets)
+
+
+def _counter(name, documentation, labelnames=()):
+    if Counter is None:
+        return _NullMetric()
+    return Counter(name, documentation, labelnames)
+
+
+# Las búsquedas en caché tardan microsegundos y un PBKDF2 decenas de
+# milisegundos: cubos desde 50 µs hasta 2.5 s
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+TAP_TO_READ_SECONDS = _histogram(
+    "nfc_tap_to_read_seconds", "Desde el aviso de tarjeta del lector hasta tener su UID",
+    LATENCY_BUCKETS)
+USER_LOOKUP_SECONDS = _histogram(
+    "nfc_user_lookup_seconds", "Búsqueda de usuario por NFC (caché o DB)", LATENCY_BUCKETS)
+PIN_VERIFY_SECONDS = _histogram(
+    "nfc_pin_verify_seconds", "Verificación PBKDF2 de un PIN", LATENCY_BUCKETS)
+LEDGER_RECORD_SECONDS = _histogram(
+    "nfc_ledger_record_seconds", "Registro de un intento en el ledger", LATENCY_BUCKETS)
+DB_COMMIT_SECONDS = _histogram(
+    "nfc_db_commit_seconds", "Commit de registros de autenticación en DB", LATENCY_BUCKETS,
+    ["mode"])
+
+AUTH_GRANTS = _counter("nfc_auth_grants_total", "Accesos concedidos")
+AUTH_DENIALS = _counter("nfc_auth_denials_total", "Accesos denegados", ["reason"])
+LOCKOUTS = _counter("nfc_lockouts_total", "Tarjetas bloqueadas por intentos fallidos")
+ANOMALIES = _counter("nfc_anomalies_total", "Anomalías detectadas por anomaly_detector", ["rule"])
+
+
+def timed(histogram):
+    """Decorador que observa la duración de cada llamada en 'histogram'.
+
+    Más barato que histogram.time() en funciones de microsegundos; sin
+    prometheus_client devuelve la función sin envolver.
+    """
+    def decorator(fn):
+        if isinstance(histogram, _NullMetric):
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def record_auth_result(success: bool, reason: str = None):
+    """Contar un acceso concedido o denegado ('reason' = failure_reason)"""
+    if success:
+        AUTH_GRANTS.inc()
+    else:
+        AUTH_DENIALS.labels(reason or "Desconocido").inc()
+
+
+def render_metrics():
+    """(cuerpo, content-type) en formato de texto de Prometheus.
+
+    Con varios workers (gunicorn) y PROMETHEUS_MULTIPROC_DIR definido se
+    agregan las métricas de todos los procesos.
+    """
+    if Histogram is None:
+        return b"# prometheus_client no instalado\n", "text/plain; charset=utf-8"
+
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def serve_metrics(port: int) -> bool:
+    """Exponer /metrics en un puerto propio (procesos sin servidor web, p. ej. kioscos)"""
+    if Histogram is None:
+        return False
+    start_http_server(port)
+    return True
+
+
+# ---------- logging ----------
+class SamplingFilter(logging.Filter):
+    """Deja pasar una fracción 'rate' de los mensajes marcados con SAMPLED"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record) -> bool:
+        if record.levelno >= logging.WARNING or not getattr(record, "sampled", False):
+            return True
+        return self.rate >= 1 or random.random() < self.rate
+
+
+_listener = None
+
+
+def setup_logging(level=None, sample_rate: float = None, stream=None):
+    """Logging raíz a través de una cola: emitir un registro no escribe en stdout.
+
+    Idempotente; los registros pendientes se escriben al salir del proceso.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    level = level or os.environ.get(LOG_LEVEL_ENV, "INFO").upper()
+    if sample_rate is None:
+        sample_rate = float(os.environ.get(LOG_SAMPLE_RATE_ENV, "1.0"))
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    # El filtro va antes de la cola: lo descartado ni se formatea
+    queue_handler.addFilter(SamplingFilter(sample_rate))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, output)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -0,0 +1,196 @@
+import threading
+import time
+from typing import Optional
+
+# Valores estándar de PC/SC (winscard.h / pcsclite.h)
+SCARD_STATE_UNAWARE = 0x0000
+SCARD_STATE_CHANGED = 0x0002
+SCARD_STATE_UNKNOWN = 0x0004
+SCARD_STATE_UNAVAILABLE = 0x0008
+SCARD_STATE_EMPTY = 0x0010
+SCARD_STATE_PRESENT = 0x0020
+
+# Lector especial de PC/SC que "cambia" cuando se conecta o desconecta un lector
+PNP_NOTIFICATION = "\\\\?PnP?\\Notification"
+
+# APDU para obtener UID (ACR122U)
+GET_UID_APDU = [0xFF, 0xCA, 0x00, 0x00, 0x00]
+
+
+def is_card_present(state: int) -> bool:
+    return bool(state & SCARD_STATE_PRESENT)
+
+
+def is_reader_gone(state: int) -> bool:
+    return bool(state & (SCARD_STATE_UNKNOWN | SCARD_STATE_UNAVAILABLE))
+
+
+def normalize_uid(uid_bytes) -> str:
+    # "A0F9001E" (sin espacios, mayúsculas)
+    return ''.join(f'{b:02X}' for b in uid_bytes)
+
+
+class PCSCBackend:
+    """Acceso a PC/SC con notificaciones de cambio de estado (pyscard).
+
+    wait_for_change() bloquea en SCardGetStatusChange hasta que cambia
+    el estado de algún lector (tarjeta puesta o retirada) o vence el
+    timeout: no hay sondeo ni APDUs mientras el lector está inactivo.
+    """
+
+    def __init__(self):
+        # Importación diferida: el backend falso no necesita pyscard
+        from smartcard import scard
+        self.scard = scard
+
+        hresult, self.context = scard.SCardEstablishContext(scard.SCARD_SCOPE_USER)
+        if hresult != scard.SCARD_S_SUCCESS:
+            raise RuntimeError(f"No se pudo crear el contexto PC/SC: "
+                               f"{scard.SCardGetErrorMessage(hresult)}")
+
+    def list_readers(self):
+        hresult, readers = self.scard.SCardListReaders(self.context, [])
+        if hresult != self.scard.SCARD_S_SUCCESS:
+            return []
+        return list(readers)
+
+    def wait_for_change(self, known: dict, timeout: float) -> dict:
+        """Esperar un cambio respecto a 'known' {lector: estado}; devuelve los que cambiaron"""
+        if not known:
+            time.sleep(timeout)
+            return {}
+
+        reader_states = [(reader, state) for reader, state in known.items()]
+        hresult, new_states = self.scard.SCardGetStatusChange(
+            self.context, int(timeout * 1000), reader_states)
+
+        if hresult in (self.scard.SCARD_E_TIMEOUT, self.scard.SCARD_E_CANCELLED):
+            return {}
+        if hresult == self.scard.SCARD_E_UNKNOWN_READER:
+            # Algún lector se desconectó: marcarlo como desaparecido
+            present = set(self.list_readers())
+            return {reader: SCARD_STATE_UNKNOWN for reader in known
+                    if reader != PNP_NOTIFICATION and reader not in present}
+        if hresult != self.scard.SCARD_S_SUCCESS:
+            raise RuntimeError(self.scard.SCardGetErrorMessage(hresult))
+
+        changed = {}
+        for reader, event_state, _atr in new_states:
+            if event_state & SCARD_STATE_CHANGED:
+                changed[reader] = event_state & ~SCARD_STATE_CHANGED
+        return changed
+
+    def read_uid(self, reader: str) -> Optional[str]:
+        scard = self.scard
+        hresult, hcard, protocol = scard.SCardConnect(
+            self.context, reader, scard.SCARD_SHARE_SHARED,
+            scard.SCARD_PROTOCOL_T0 | scard.SCARD_PROTOCOL_T1)
+        if hresult != scard.SCARD_S_SUCCESS:
+            return None
+
+        try:
+            hresult, response = scard.SCardTransmit(hcard, protocol, GET_UID_APDU)
+            if hresult != scard.SCARD_S_SUCCESS or len(response) < 2:
+                return None
+            data, sw1, sw2 = response[:-2], response[-2], response[-1]
+            if (sw1, sw2) == (0x90, 0x00):
+                return normalize_uid(data)
+            return None
+        finally:
+            scard.SCardDisconnect(hcard, scard.SCARD_LEAVE_CARD)
+
+    def cancel(self):
+        """Despertar un wait_for_change bloqueado (para detener el monitor)"""
+        self.scard.SCardCancel(self.context)
+
+    def close(self):
+        self.scard.SCardReleaseContext(self.context)
+
+
+class FakePCSCBackend:
+    """Backend PC/SC simulado para pruebas sin hardware.
+
+    insert_card()/remove_card() cambian el estado de un lector y
+    despiertan a quien esté en wait_for_change(), igual que haría el
+    servicio PC/SC. Cuenta las APDUs enviadas en 'apdu_count'.
+    """
+
+    def __init__(self, readers=("ACS ACR122U PICC Interface 0",)):
+        self._cards = {reader: None for reader in readers}
+        self._events = {reader: 0 for reader in readers}
+        self._cond = threading.Condition()
+        self._pnp_events = 0
+        self._cancelled = False
+        self.apdu_count = 0
+
+    def _state(self, reader: str) -> int:
+        if reader == PNP_NOTIFICATION:
+            return self._pnp_events << 16
+        if reader not in self._cards:
+            return SCARD_STATE_UNKNOWN | SCARD_STATE_UNAVAILABLE
+        presence = SCARD_STATE_PRESENT if self._cards[reader] else SCARD_STATE_EMPTY
+        # Como pcsc-lite: contador de eventos en los 16 bits altos, para que
+        # poner y quitar una tarjeta muy rápido siga contando como cambio
+        return presence | (self._events[reader] << 16)
+
+    def _touch(self, reader: str):
+        self._events[reader] = self._events.get(reader, 0) + 1
+        self._cond.notify_all()
+
+    # ---------- simulación ----------
+    def insert_card(self, uid: str, reader: str = None):
+        with self._cond:
+            reader = reader or next(iter(self._cards))
+            self._cards[reader] = uid
+            self._touch(reader)
+
+    def remove_card(self, reader: str = None):
+        with self._cond:
+            reader = reader or next(iter(self._cards))
+            self._cards[reader] = None
+            self._touch(reader)
+
+    def add_reader(self, reader: str):
+        with self._cond:
+            self._cards[reader] = None
+            self._pnp_events += 1
+            self._touch(reader)
+
+    def remove_reader(self, reader: str):
+        with self._cond:
+            self._cards.pop(reader, None)
+            self._pnp_events += 1
+            self._touch(reader)
+
+    # ---------- interfaz de backend ----------
+    def list_readers(self):
+        with self._cond:
+            return list(self._cards)
+
+    def wait_for_change(self, known: dict, timeout: float) -> dict:
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                changed = {reader: self._state(reader) for reader, state in known.items()
+                           if self._state(reader) != state}
+                if changed or self._cancelled:
+                    self._cancelled = False
+                    return changed
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return {}
+                self._cond.wait(remaining)
+
+    def read_uid(self, reader: str) -> Optional[str]:
+        with self._cond:
+            self.apdu_count += 1
+            return self._cards.get(reader)
+
+    def cancel(self):
+        with self._cond:
+            self._cancelled = True
+            self._cond.notify_all()
+
+    def close(self):
+        pass
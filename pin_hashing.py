@@ -0,0 +1,150 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from observability import PIN_VERIFY_SECONDS, timed
+
+# Formato guardado: "pbkdf2_sha256$<iteraciones>$<sal>$<hash>" (base64 sin relleno)
+ALGORITHM = "pbkdf2_sha256"
+DEFAULT_ITERATIONS = 100_000
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+def hash_pin(pin: str, iterations: int = DEFAULT_ITERATIONS, salt: bytes = None) -> str:
+    """Verificador salado del PIN (PBKDF2-HMAC-SHA256): nunca se guarda el PIN"""
+    salt = secrets.token_bytes(16) if salt is None else salt
+    digest = hashlib.pbkdf2_hmac("sha256", pin.encode(), salt, iterations)
+    return f"{ALGORITHM}${iterations}${_b64encode(salt)}${_b64encode(digest)}"
+
+
+@timed(PIN_VERIFY_SECONDS)
+def verify_pin(pin: str, encoded: str) -> bool:
+    """Comprobar 'pin' contra un verificador de hash_pin() en tiempo constante"""
+    try:
+        algorithm, iterations, salt, expected = encoded.split("$")
+        if algorithm != ALGORITHM:
+            return False
+        digest = hashlib.pbkdf2_hmac("sha256", pin.encode(), _b64decode(salt), int(iterations))
+        return hmac.compare_digest(digest, _b64decode(expected))
+    except (ValueError, AttributeError):
+        return False
+
+
+def pin_iterations(encoded: str):
+    """Coste (iteraciones) de un verificador, o None si no es válido"""
+    try:
+        algorithm, iterations, _salt, _digest = encoded.split("$")
+        return int(iterations) if algorithm == ALGORITHM else None
+    except (ValueError, AttributeError):
+        return None
+
+
+def calibrate_iterations(target_ms: float, probe_iterations: int = 20_000,
+                         rounds: int = 5) -> int:
+    """Iteraciones para que un hash tarde ~target_ms en esta máquina"""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        hashlib.pbkdf2_hmac("sha256", b"0000", b"calibration-salt", probe_iterations)
+        best = min(best, time.perf_counter() - start)
+
+    per_iteration_ms = best * 1000 / probe_iterations
+    # Múltiplo de 1000 para que el valor configurado sea legible
+    return max(1000, int(target_ms / per_iteration_ms) // 1000 * 1000)
+
+
+class HashingBusyError(RuntimeError):
+    """Hay demasiadas verificaciones de PIN en curso o en espera"""
+
+
+class PinHasher:
+    """Hash y verificación de PIN con coste configurable fuera del event loop.
+
+    PBKDF2 libera el GIL, así que un pool de 'max_workers' hilos da
+    paralelismo real y a la vez limita la CPU dedicada a hashing. Como
+    mucho 'max_pending' verificaciones pueden estar en curso o en cola;
+    las demás fallan al momento con HashingBusyError en lugar de
+    acumular latencia (p. ej. durante un ataque de fuerza bruta).
+    """
+
+    def __init__(self, iterations: int = DEFAULT_ITERATIONS, max_workers: int = 2,
+                 max_pending: int = 64):
+        self.iterations = iterations
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="pin-hasher")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._stats_lock = threading.Lock()
+        self.verified = 0
+        self.busy = 0
+        self.total_ms = 0.0
+
+    def hash(self, pin: str) -> str:
+        return hash_pin(pin, self.iterations)
+
+    def _hash_slot(self, pin: str) -> str:
+        try:
+            return self.hash(pin)
+        finally:
+            self._slots.release()
+
+    def needs_rehash(self, encoded: str) -> bool:
+        """¿El verificador usa un coste distinto del configurado?"""
+        return pin_iterations(encoded) != self.iterations
+
+    def _verify_timed(self, pin: str, encoded: str) -> bool:
+        start = time.perf_counter()
+        try:
+            return verify_pin(pin, encoded)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            with self._stats_lock:
+                self.verified += 1
+                self.total_ms += elapsed
+            self._slots.release()
+
+    def _acquire_slot(self):
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self.busy += 1
+            raise HashingBusyError("Demasiadas verificaciones de PIN en curso")
+
+    def submit(self, pin: str, encoded: str):
+        """Encolar una verificación; devuelve un Future con el resultado"""
+        self._acquire_slot()
+        return self._executor.submit(self._verify_timed, pin, encoded)
+
+    def verify(self, pin: str, encoded: str) -> bool:
+        return self.submit(pin, encoded).result()
+
+    async def verify_async(self, pin: str, encoded: str) -> bool:
+        return await asyncio.wrap_future(self.submit(pin, encoded))
+
+    async def hash_async(self, pin: str) -> str:
+        """Hash con el coste configurado, en el mismo pool y con el mismo límite"""
+        self._acquire_slot()
+        return await asyncio.wrap_future(self._executor.submit(self._hash_slot, pin))
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                'iterations': self.iterations,
+                'verified': self.verified,
+                'busy_rejections': self.busy,
+                'avg_ms': self.total_ms / self.verified if self.verified else 0.0,
+            }
+
+    def close(self):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,71 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenBucketLimiter:
+    """Limitador token-bucket por clave (dispositivo, IP...).
+
+    Cada clave tiene un cubo de 'burst' fichas que se rellena a 'rate'
+    fichas por segundo; cada petición gasta una. El estado por clave son
+    dos números y cada acquire() es O(1). Se guardan como mucho
+    'max_keys' cubos (LRU): uno olvidado vuelve lleno, que es lo que
+    tendría tras no usarse durante un rato.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 10_000):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate debe ser > 0 y burst al menos 1")
+
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_env(cls, prefix: str, rate: float, burst: float, **kwargs):
+        """Límite con valores por defecto sobrescribibles con <prefix>_RATE / <prefix>_BURST"""
+        return cls(float(os.environ.get(f"{prefix}_RATE", rate)),
+                   float(os.environ.get(f"{prefix}_BURST", burst)), **kwargs)
+
+    def acquire(self, key, now: float = None) -> float:
+        """Gastar una ficha de 'key': 0.0 si se permite, o segundos hasta poder reintentar"""
+        now = time.monotonic() if now is None else now
+
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [self.burst, now]
+                self._buckets[key] = bucket
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                self.allowed += 1
+                return 0.0
+
+            self.rejected += 1
+            return (1 - bucket[0]) / self.rate
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'allowed': self.allowed,
+                'rejected': self.rejected,
+                'keys': len(self._buckets),
+            }
+
+
+def retry_after_header(wait: float) -> str:
+    """Valor de Retry-After: segundos enteros, redondeando hacia arriba"""
+    return str(max(1, math.ceil(wait)))
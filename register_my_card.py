@@ -1,4 +1,7 @@
 from database import DatabaseManager
+from observability import setup_logging
+
+setup_logging()
 
 # Registrar tu tarjeta NFC física
 db = DatabaseManager()
@@ -7,9 +10,13 @@ tu_tarjeta = "A0F9001E"  # El UID que leímos anteriormente
 tu_usuario = "aimee"     # Cambia por tu usuario
 tu_nombre = "Aimee"      # Cambia por tu nombre
 tu_departamento = "Desarrollo"
+tu_pin = "0000"          # Se guarda solo su hash
 
-if db.register_nfc_user(tu_tarjeta, tu_usuario, tu_nombre, tu_departamento, 2):
+if db.register_nfc_user(tu_tarjeta, tu_usuario, tu_nombre, tu_departamento, 2, pin=tu_pin):
     print(f"✅ Tarjeta {tu_tarjeta} registrada para {tu_nombre}")
-    print("🔐 PIN asignado: 0000")  # Usaremos este PIN
+    print(f"🔐 PIN asignado: {tu_pin}")
+elif db.set_user_pin(tu_tarjeta, tu_pin):
+    # Ya registrada (p. ej. antes de que hubiera PIN por usuario): solo el PIN
+    print(f"🔁 Tarjeta {tu_tarjeta} ya registrada: PIN actualizado a {tu_pin}")
 else:
     print("❌ Error al registrar tarjeta")
\ No newline at end of file
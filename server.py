@@ -1,29 +1,206 @@
 # server.py
 
-from fastapi import FastAPI, Request, Form
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi import Depends, FastAPI, Request, Form, Header, HTTPException, Query
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
+from pydantic import BaseModel
 from datetime import datetime
+from typing import List, Optional
+import asyncio
+import functools
+import logging
+import os
 import time
 
 # --- Módulos de tu proyecto ---
 # Asume que DatabaseManager puede consultar usuarios y verificar PINs.
 # Asume que BlockchainSimulated registra el intento.
-from database import DatabaseManager
+from async_database import AsyncDatabaseManager
+from auth_event_feed import AuthEventFeed, format_sse
+from auth_log_export import EXPORT_FORMATS, export_auth_logs
 from blockchain_simulated import BlockchainSimulated
+from edge_station import import_offline_attempts
+from observability import record_auth_result, render_metrics, setup_logging
+from pin_hashing import HashingBusyError, PinHasher
+from rate_limiter import TokenBucketLimiter, retry_after_header
+from static_assets import StaticAssetCache, configure_jinja
+from station_auth import ADMIN_TOKEN_ENV, StationAuthError, StationVerifier, check_admin_token
+from tap_sessions import TapSessionStore
 
 # --- Configuración Inicial ---
+# Logs por una cola (no bloquean el event loop); NFC_LOG_LEVEL y
+# NFC_LOG_SAMPLE_RATE ajustan el nivel y el muestreo de los de cada petición
+setup_logging()
+logger = logging.getLogger("server")
 app = FastAPI()
-db_manager = DatabaseManager()
+
+# Hash de PIN (PBKDF2) en un pool propio: no bloquea el event loop y como
+# mucho PIN_HASH_WORKERS núcleos hashean a la vez. Ajustar las iteraciones
+# a la máquina con: python benchmark_pin_hashing.py --target-ms 50
+PIN_HASH_ITERATIONS = 100_000
+PIN_HASH_WORKERS = 2
+pin_hasher = PinHasher(PIN_HASH_ITERATIONS, max_workers=PIN_HASH_WORKERS)
+
+# Acceso a SQLite en un pool de hilos (no bloquea el event loop) y logs de
+# autenticación escritos por lotes, así verify_pin no espera el commit
+db_manager = AsyncDatabaseManager(async_logs=True, pin_iterations=PIN_HASH_ITERATIONS)
 blockchain = BlockchainSimulated()
-templates = Jinja2Templates(directory="templates") # Asume que index.html está en una carpeta 'templates'
+# Feed en vivo para el panel de seguridad: avisado en cada commit de logs
+auth_feed = AuthEventFeed(db_manager)
+db_manager.add_log_listener(auth_feed.notify)
+# Límite de intentos de PIN por dispositivo (X-Device-ID) y por IP, ajustable
+# con PIN_LIMIT_DEVICE_RATE/_BURST y PIN_LIMIT_IP_RATE/_BURST
+device_limiter = TokenBucketLimiter.from_env("PIN_LIMIT_DEVICE", rate=1.0, burst=5)
+ip_limiter = TokenBucketLimiter.from_env("PIN_LIMIT_IP", rate=2.0, burst=10)
+RATE_LIMITED_PATHS = {"/verify_pin", "/authenticate"}
+# Flujo web: templates/pin_form.html (formulario de PIN) y templates/result.html
+templates = Jinja2Templates(directory="templates")
+# Plantillas minificadas (python static_assets.py), caché de bytecode y sin
+# comprobar mtimes en cada render; CSS precomprimido servido desde memoria
+configure_jinja(templates.env)
+static_cache = StaticAssetCache()
+# Lectura de tarjeta -> PIN: /tap y /auth_pin resuelven al usuario una vez y
+# emiten un reto de un solo uso; /authenticate y /verify_pin no repiten la búsqueda
+tap_sessions = TapSessionStore(ttl=60.0)
+# Las estaciones edge firman sus peticiones con NFC_STATION_SECRET; sin él,
+# los endpoints de sincronización responden 401 a todo
+station_verifier = StationVerifier.from_env()
+if not station_verifier.configured:
+    logger.warning("⚠️  NFC_STATION_SECRET no configurado: sincronización de estaciones desactivada")
+# El panel de seguridad entra con 'Authorization: Bearer <NFC_ADMIN_TOKEN>'
+admin_token = os.environ.get(ADMIN_TOKEN_ENV)
 
 # --- Simulación de Usuario (Información obtenida de la DB tras lectura NFC) ---
-# Usamos el dato de Ana Lopez (UID: 04A1B2C3D4E5, Nivel 3)
+# Usamos el dato de Ana Lopez (UID: 04A1B2C3D4E5, Nivel 3, PIN de prueba 1234)
 TEST_NFC_ID = "04A1B2C3D4E5"
-TEST_PIN = "1234" # Pin de prueba de Ana Lopez
 DEVICE_ID = "ACR122U-STATION-01"
 
+
+@app.on_event("startup")
+async def start_auth_feed():
+    await auth_feed.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_database():
+    """Vaciar los logs pendientes y cerrar el pool al detener el servidor"""
+    await auth_feed.stop()
+    await db_manager.close()
+    blockchain.close()
+    pin_hasher.close()
+
+
+@app.exception_handler(HashingBusyError)
+async def pin_hasher_busy(request: Request, exc: HashingBusyError):
+    """Pool de hash saturado: pedir reintento en vez de encolar sin límite"""
+    return JSONResponse({"detail": str(exc)}, status_code=503, headers={"Retry-After": "1"})
+
+
+@app.middleware("http")
+async def rate_limit_pin_endpoints(request: Request, call_next):
+    """Rechazar con 429 los intentos de PIN por encima del límite, sin tocar la DB"""
+    if request.method != "POST" or request.url.path not in RATE_LIMITED_PATHS:
+        return await call_next(request)
+
+    wait = ip_limiter.acquire(request.client.host if request.client else None)
+    device_id = request.headers.get("X-Device-ID")
+    if not wait and device_id:
+        wait = device_limiter.acquire(device_id)
+    if not wait:
+        return await call_next(request)
+
+    headers = {"Retry-After": retry_after_header(wait)}
+    if request.url.path == "/verify_pin":
+        context = {
+            "request": request,
+            "result_state": "DENIED",
+            "message": "Demasiadas solicitudes. Espere unos segundos."
+        }
+        return templates.TemplateResponse("result.html", context, status_code=429, headers=headers)
+    return JSONResponse({"detail": "Demasiadas solicitudes"}, status_code=429, headers=headers)
+
+
+async def resolve_for_auth(nfc_id: str, device_id: str, challenge: Optional[str]):
+    """(usuario, verificador del PIN) para verificar un PIN.
+
+    Con reto, de la sesión abierta al leer la tarjeta (sin tocar la DB);
+    None si el reto caducó, ya se usó o es de otra tarjeta/dispositivo.
+    Sin reto (clientes antiguos), en una sola búsqueda en la DB.
+    """
+    if challenge:
+        return tap_sessions.consume(challenge, nfc_id, device_id)
+    return await db_manager.get_user_for_auth(nfc_id)
+
+
+async def process_auth(nfc_id: str, pin: str, device_id: str, user_data, pin_hash):
+    """Verificar el PIN y registrar el intento en Blockchain y DB.
+
+    Devuelve (usuario o None, éxito, tx_hash).
+    """
+    # 1. Verificar el PIN contra el verificador ya resuelto
+    is_success = bool(pin_hash and await pin_hasher.verify_async(pin, pin_hash))
+
+    # Al cambiar PIN_HASH_ITERATIONS, los hashes se actualizan al entrar. El
+    # hash nuevo se calcula en el pool de PinHasher, no en el de la DB; si
+    # está saturado se deja para el próximo acceso
+    if is_success and pin_hasher.needs_rehash(pin_hash):
+        try:
+            await db_manager.set_user_pin(nfc_id, pin_hash=await pin_hasher.hash_async(pin))
+        except HashingBusyError:
+            logger.info("⏳ Rehash del PIN de %s aplazado: PinHasher saturado", nfc_id)
+
+    # 2. Registrar el intento en la Blockchain Simulada (puede sellar un
+    # bloque: escrituras SQLite + Merkle, fuera del event loop)
+    tx_hash = await asyncio.get_running_loop().run_in_executor(None, functools.partial(
+        blockchain.record_auth_attempt,
+        user_id=user_data['username'] if user_data else "UNKNOWN",
+        timestamp=datetime.now().timestamp(),
+        device_id=device_id,
+        nfc_id=nfc_id,
+        success=is_success
+    ))
+    
+    # 3. Registrar el intento en la Base de Datos
+    if is_success:
+        failure_reason = None
+    elif user_data:
+        failure_reason = "PIN Incorrecto"
+    else:
+        failure_reason = "Tarjeta Invalida"
+    record_auth_result(is_success, failure_reason)
+
+    await db_manager.log_auth_attempt(
+        user_id=user_data['id'] if user_data else 0, # Usar el ID de la DB
+        nfc_id=nfc_id,
+        device_id=device_id,
+        success=is_success,
+        blockchain_tx_hash=tx_hash,
+        failure_reason=failure_reason
+    )
+    return user_data, is_success, tx_hash
+
+
+@app.get("/static/{name}")
+async def static_asset(request: Request, name: str):
+    result = static_cache.get_asset(name, request.headers.get("accept-encoding", ""),
+                                    request.headers.get("if-none-match"))
+    if result is None:
+        return JSONResponse({"detail": "Not Found"}, status_code=404)
+    status, body, headers = result
+    return Response(content=body, status_code=status, headers=headers)
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Métricas en formato Prometheus (latencias y contadores de acceso)"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 # --------------------------------------------------------------------
 # 1. RUTA PARA MOSTRAR EL FORMULARIO DE PIN
 # (Se ejecuta después de que el lector NFC envía el UID al servidor)
@@ -34,7 +211,7 @@ async def show_pin_form(request: Request, nfc_id: str):
     Simula la carga de la página después de que la tarjeta NFC ha sido leída.
     Busca los datos del usuario en la DB y rellena el HTML.
     """
-    user_data = db_manager.get_user_by_nfc_id(nfc_id)
+    user_data, pin_hash = await db_manager.get_user_for_auth(nfc_id)
     
     if not user_data:
         # Si la tarjeta no está registrada
@@ -46,17 +223,18 @@ async def show_pin_form(request: Request, nfc_id: str):
         return templates.TemplateResponse("result.html", context)
 
 
-    # Rellenar los placeholders del index.html
+    # Rellenar los placeholders de pin_form.html
     context = {
         "request": request,
         "nombre_completo": user_data['full_name'],
         "departamento": user_data['department'],
         "security_level": user_data['security_level'],
-        "nfc_id": user_data['nfc_id']
+        "nfc_id": user_data['nfc_id'],
+        # Campo oculto del formulario: /verify_pin no vuelve a buscar al usuario
+        "challenge": tap_sessions.open(user_data['nfc_id'], DEVICE_ID, user_data, pin_hash),
     }
     
     # Renderiza el archivo HTML con los datos
-    # Asume que el HTML (index.html) fue renombrado a 'pin_form.html'
     return templates.TemplateResponse("pin_form.html", context)
 
 
@@ -65,39 +243,25 @@ async def show_pin_form(request: Request, nfc_id: str):
 # (Esta es la ruta que causaba el error 404 en el navegador)
 # --------------------------------------------------------------------
 @app.post("/verify_pin", response_class=HTMLResponse)
-async def verify_pin(request: Request, nfc_id: str = Form(...), pin: str = Form(...)):
+async def verify_pin(request: Request, nfc_id: str = Form(...), pin: str = Form(...),
+                     challenge: Optional[str] = Form(None)):
     """
     Recibe el UID y el PIN, verifica la autenticación y registra en DB/Blockchain.
+    Con el reto emitido en /auth_pin no se vuelve a consultar la DB.
     """
-    
-    user_data = db_manager.get_user_by_nfc_id(nfc_id)
-    
-    # 1. Verificar si el usuario existe y si el PIN es correcto (Simulación)
-    # En un sistema real, el PIN no se almacenaría directamente, sino un hash
-    
-    # Simulación de la verificación del PIN
-    is_success = (user_data and pin == TEST_PIN) 
+    resolved = await resolve_for_auth(nfc_id, DEVICE_ID, challenge)
+    if resolved is None:
+        context = {
+            "request": request,
+            "result_state": "DENIED",
+            "message": "La lectura de la tarjeta caducó. Vuelva a pasarla.",
+            "nfc_id": nfc_id,
+        }
+        return templates.TemplateResponse("result.html", context, status_code=401)
 
-    # 2. Registrar el intento en la Blockchain Simulada
-    tx_hash = blockchain.record_auth_attempt(
-        user_id=user_data['username'] if user_data else "UNKNOWN",
-        timestamp=datetime.now().timestamp(),
-        device_id=DEVICE_ID,
-        nfc_id=nfc_id,
-        success=is_success
-    )
-    
-    # 3. Registrar el intento en la Base de Datos
-    db_manager.log_auth_attempt(
-        user_id=user_data['id'] if user_data else 0, # Usar el ID de la DB
-        nfc_id=nfc_id,
-        device_id=DEVICE_ID,
-        success=is_success,
-        tx_hash=tx_hash,
-        failure_reason="PIN Incorrecto" if not is_success and user_data else "Tarjeta Invalida"
-    )
+    user_data, is_success, tx_hash = await process_auth(nfc_id, pin, DEVICE_ID, *resolved)
 
-    # 4. Mostrar el resultado
+    # Mostrar el resultado
     if is_success:
         result_state = "PERMITTED"
         message = f"Acceso Concedido para {user_data['full_name']}."
@@ -116,9 +280,170 @@ async def verify_pin(request: Request, nfc_id: str = Form(...), pin: str = Form(
     # Renderiza la página de resultado (usamos un HTML diferente o la misma plantilla)
     return templates.TemplateResponse("result.html", context)
 
+
+# --------------------------------------------------------------------
+# 3. API PARA KIOSCOS (client_complete.py)
+# /tap devuelve en una llamada los datos del usuario y un reto de un solo
+# uso ligado a la tarjeta y al dispositivo; /authenticate con ese reto
+# verifica el PIN sin volver a buscar al usuario
+# --------------------------------------------------------------------
+class AuthRequest(BaseModel):
+    nfc_id: str
+    pin: str
+    device_id: str = DEVICE_ID
+    challenge: Optional[str] = None
+
+
+@app.post("/tap/{nfc_id}")
+async def tap(nfc_id: str, device_id: str = DEVICE_ID):
+    """Lectura de tarjeta: datos del usuario + reto para /authenticate"""
+    user_data, pin_hash = await db_manager.get_user_for_auth(nfc_id)
+    if not user_data:
+        return JSONResponse({"detail": "Tarjeta NFC no registrada o inactiva."}, status_code=404)
+
+    return {
+        "user": user_data,
+        "challenge": tap_sessions.open(user_data['nfc_id'], device_id, user_data, pin_hash),
+        "expires_in": tap_sessions.ttl,
+    }
+
+
+@app.post("/authenticate")
+async def authenticate(auth: AuthRequest):
+    resolved = await resolve_for_auth(auth.nfc_id, auth.device_id, auth.challenge)
+    if resolved is None:
+        return JSONResponse({"success": False,
+                             "message": "Lectura de tarjeta caducada o no válida: pase la tarjeta de nuevo",
+                             "user": None, "blockchain_tx": None}, status_code=401)
+
+    user_data, is_success, tx_hash = await process_auth(auth.nfc_id, auth.pin, auth.device_id,
+                                                        *resolved)
+
+    return {
+        "success": is_success,
+        "message": "Acceso concedido" if is_success else "PIN o Tarjeta inválida",
+        "user": user_data if is_success else None,
+        "blockchain_tx": tx_hash,
+    }
+
+
+# --------------------------------------------------------------------
+# 4. SINCRONIZACIÓN DE ESTACIONES EDGE (edge_station.py)
+# Las estaciones bajan solo los usuarios cambiados desde su marca de agua
+# y suben en bloque los intentos que autenticaron sin conexión
+# --------------------------------------------------------------------
+async def require_station(request: Request) -> str:
+    """Dependencia: petición firmada por una estación edge; devuelve su ID"""
+    body = await request.body()
+    try:
+        return station_verifier.verify(request.method, request.url.path, request.url.query,
+                                       body, request.headers)
+    except StationAuthError as e:
+        logger.warning("🚫 Petición de estación rechazada en %s: %s", request.url.path, e)
+        raise HTTPException(status_code=401, detail=str(e))
+
+
+class OfflineAttempt(BaseModel):
+    user_id: int
+    username: str
+    nfc_id: str
+    device_id: str
+    success: bool
+    failure_reason: Optional[str] = None
+    timestamp: float
+
+
+class OfflineUpload(BaseModel):
+    attempts: List[OfflineAttempt]
+
+
+@app.get("/sync/users")
+async def sync_users(cursor: Optional[str] = None, limit: int = Query(500, ge=1),
+                     station_id: str = Depends(require_station)):
+    """Cambios de usuarios con su verificador de PIN: solo para estaciones autenticadas"""
+    try:
+        return await db_manager.get_user_changes(cursor, min(limit, 5000))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/sync/auth_logs")
+async def sync_auth_logs(upload: OfflineUpload, station_id: str = Depends(require_station)):
+    # Validación contra nfc_users, ledger e importación: todo síncrono, en el pool de la DB
+    return await db_manager.run(import_offline_attempts, blockchain,
+                                [a.dict() for a in upload.attempts], station_id)
+
+# --------------------------------------------------------------------
+# 5. AUDITORÍA Y PANEL DE SEGURIDAD
+# La exportación se genera trozo a trozo desde la DB (memoria constante),
+# las estadísticas salen de los agregados auth_rollups y el panel recibe
+# los intentos nuevos por SSE en vez de sondear. Solo para el
+# administrador (token) o una estación firmada, como la sincronización
+# --------------------------------------------------------------------
+async def require_station_or_admin(request: Request) -> str:
+    """Dependencia: token de administrador o petición firmada por una estación"""
+    if check_admin_token(request.headers.get("Authorization"), admin_token):
+        return "admin"
+    return await require_station(request)
+
+
+@app.get("/auth_logs/export")
+async def export_logs(fmt: str = Query("csv", alias="format"), since: Optional[str] = None,
+                      until: Optional[str] = None, device_id: Optional[str] = None,
+                      nfc_id: Optional[str] = None, success: Optional[bool] = None,
+                      caller: str = Depends(require_station_or_admin)):
+    try:
+        body = export_auth_logs(db_manager, fmt, since=since, until=until, device_id=device_id,
+                                nfc_id=nfc_id, success=success)
+    except ValueError as e:
+        return JSONResponse({"detail": str(e)}, status_code=400)
+
+    _encode, media_type, extension = EXPORT_FORMATS[fmt]
+    headers = {"Content-Disposition": f'attachment; filename="auth_logs{extension}"'}
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+
+@app.get("/stats/auth")
+async def auth_stats(granularity: str = "hour", group_by: str = "department",
+                     since: Optional[str] = None, until: Optional[str] = None,
+                     department: Optional[str] = None, device_id: Optional[str] = None,
+                     per_bucket: bool = True, caller: str = Depends(require_station_or_admin)):
+    """Concedidos/denegados y tasa de éxito desde los agregados (auth_stats.py)"""
+    try:
+        stats = await db_manager.get_auth_stats(
+            granularity=granularity, since=since, until=until,
+            group_by=[d for d in group_by.split(",") if d], department=department,
+            device_id=device_id, per_bucket=per_bucket)
+    except ValueError as e:
+        return JSONResponse({"detail": str(e)}, status_code=400)
+    return {"granularity": granularity, "stats": stats}
+
+
+@app.get("/auth_logs/stream")
+async def stream_logs(request: Request, device_id: Optional[str] = None,
+                      success: Optional[bool] = None,
+                      last_event_id: Optional[str] = Header(None),
+                      caller: str = Depends(require_station_or_admin)):
+    """Server-sent events: un evento 'auth' por intento registrado"""
+    last_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+
+    async def events():
+        yield "retry: 3000\n\n"
+        async for logs in auth_feed.subscribe(last_id):
+            if await request.is_disconnected():
+                return
+            logs = [log for log in logs
+                    if (device_id is None or log['device_id'] == device_id)
+                    and (success is None or log['success'] == success)]
+            yield format_sse(logs)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
 # --------------------------------------------------------------------
 # CÓMO EJECUTAR ESTE SERVIDOR:
 # Guardas esto como server.py
-# Creas una carpeta llamada 'templates' y pones tu HTML dentro (ej: pin_form.html y result.html)
+# Las páginas están en la carpeta 'templates' (pin_form.html y result.html);
+# python static_assets.py las minifica junto al resto
 # Ejecutas en la terminal: uvicorn server:app --reload
 # --------------------------------------------------------------------
\ No newline at end of file
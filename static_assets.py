@@ -0,0 +1,256 @@
+"""Precompilación de páginas y recursos estáticos para los kioscos.
+
+python static_assets.py genera en static_build/:
+  - styles.css minificado y con huella en el nombre (styles.<hash>.css),
+    servible con caché "immutable" de un año,
+  - las plantillas HTML minificadas, con el enlace al CSS ya reescrito,
+  - las páginas que no dependen de la petición (Home, formularios) ya
+    renderizadas,
+  - de cada fichero, variantes .gz y .br comprimidas de antemano, y un
+    manifest.json con ETag, tipo y política de caché.
+
+En ejecución, StaticAssetCache sirve esos bytes desde memoria (200 o 304
+según If-None-Match) eligiendo la compresión por Accept-Encoding, y
+configure_jinja() hace que Jinja use las plantillas minificadas, una
+caché de bytecode en disco y sin comprobar mtimes en cada render.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin brotli solo se generan variantes gzip
+    brotli = None
+
+BUILD_DIR = "static_build"
+TEMPLATE_SOURCES = (".", "templates")
+ASSETS = ("styles.css",)
+# Plantillas que se renderizan sin datos de la petición
+STATIC_PAGES = ("Home.html", "pin_verification.html", "registro_usuario.html")
+
+CONTENT_TYPES = {
+    ".css": "text/css; charset=utf-8",
+    ".html": "text/html; charset=utf-8",
+    ".js": "application/javascript; charset=utf-8",
+}
+CACHE_IMMUTABLE = "public, max-age=31536000, immutable"
+# Páginas y recursos sin huella: siempre se revalidan (304 si no cambiaron)
+CACHE_REVALIDATE = "no-cache"
+
+
+# ---------- minificación ----------
+def minify_css(css: str) -> str:
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    # Solo tras ':' (antes cambiaría selectores como "a :hover")
+    css = re.sub(r":\s+", ":", css)
+    return css.replace(";}", "}").strip()
+
+
+_PRESERVE = re.compile(r"(<(pre|textarea|script)\b.*?</\2>)", re.S | re.I)
+_STYLE = re.compile(r"(<style\b[^>]*>)(.*?)(</style>)", re.S | re.I)
+
+
+def minify_html(html: str) -> str:
+    """Quitar comentarios y espacios redundantes sin cambiar cómo se ve la página"""
+    html = re.sub(r"<!--(?!\[if).*?-->", "", html, flags=re.S)
+    html = _STYLE.sub(lambda m: m.group(1) + minify_css(m.group(2)) + m.group(3), html)
+
+    parts = []
+    for i, part in enumerate(_PRESERVE.split(html)):
+        if i % 3 == 0:
+            # El navegador ya colapsa los espacios: basta uno (o un salto)
+            part = re.sub(r"\s*\n\s*", "\n", part)
+            part = re.sub(r"[ \t]+", " ", part)
+            parts.append(part)
+        elif i % 3 == 1:
+            parts.append(part)
+    return "".join(parts).strip()
+
+
+def rewrite_asset_links(html: str, fingerprinted: dict) -> str:
+    """Apuntar href/src de cada recurso (ruta cualquiera) a su nombre con huella"""
+    for name, hashed in fingerprinted.items():
+        html = re.sub(rf'((?:href|src)=")[^"]*?\b{re.escape(name)}"',
+                      rf'\g<1>/static/{hashed}"', html)
+    return html
+
+
+# ---------- construcción ----------
+def _etag(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def _write_variants(out_dir: str, filename: str, data: bytes) -> dict:
+    """Escribir el fichero y sus variantes comprimidas; devuelve {codificación: fichero}"""
+    files = {"identity": filename}
+    with open(os.path.join(out_dir, filename), "wb") as f:
+        f.write(data)
+
+    variants = {"gzip": (".gz", lambda d: gzip.compress(d, compresslevel=9, mtime=0))}
+    if brotli is not None:
+        variants["br"] = (".br", lambda d: brotli.compress(d, quality=11))
+
+    for encoding, (suffix, compress) in variants.items():
+        compressed = compress(data)
+        # Comprimir solo compensa si de verdad ahorra bytes
+        if len(compressed) < len(data):
+            with open(os.path.join(out_dir, filename + suffix), "wb") as f:
+                f.write(compressed)
+            files[encoding] = filename + suffix
+    return files
+
+
+def build_static(out_dir: str = BUILD_DIR, source_dir: str = ".",
+                 template_sources=TEMPLATE_SOURCES, assets=ASSETS,
+                 static_pages=STATIC_PAGES) -> dict:
+    """Minificar, poner huella, precomprimir y prerenderizar; escribe manifest.json"""
+    for sub in ("assets", "templates", "pages"):
+        os.makedirs(os.path.join(out_dir, sub), exist_ok=True)
+    manifest = {"assets": {}, "pages": {}}
+
+    fingerprinted = {}
+    for name in assets:
+        with open(os.path.join(source_dir, name), encoding="utf-8") as f:
+            data = minify_css(f.read()).encode() if name.endswith(".css") else f.read().encode()
+        etag = _etag(data)
+        stem, ext = os.path.splitext(name)
+        hashed = f"{stem}.{etag[:10]}{ext}"
+        fingerprinted[name] = hashed
+
+        files = _write_variants(os.path.join(out_dir, "assets"), hashed, data)
+        entry = {"files": files, "etag": etag, "content_type": CONTENT_TYPES.get(ext, "application/octet-stream")}
+        manifest["assets"][hashed] = dict(entry, cache_control=CACHE_IMMUTABLE)
+        manifest["assets"][name] = dict(entry, cache_control=CACHE_REVALIDATE)
+
+    templates_dir = os.path.join(out_dir, "templates")
+    for source in template_sources:
+        source = os.path.join(source_dir, source)
+        if not os.path.isdir(source):
+            continue
+        for name in sorted(os.listdir(source)):
+            if not name.endswith(".html"):
+                continue
+            with open(os.path.join(source, name), encoding="utf-8") as f:
+                html = rewrite_asset_links(minify_html(f.read()), fingerprinted)
+            with open(os.path.join(templates_dir, name), "w", encoding="utf-8") as f:
+                f.write(html)
+
+    from jinja2 import Environment, FileSystemLoader
+    env = Environment(loader=FileSystemLoader(templates_dir), autoescape=True)
+    for name in static_pages:
+        if not os.path.exists(os.path.join(templates_dir, name)):
+            continue
+        data = env.get_template(name).render().encode()
+        files = _write_variants(os.path.join(out_dir, "pages"), name, data)
+        manifest["pages"][name] = {"files": files, "etag": _etag(data),
+                                   "content_type": CONTENT_TYPES[".html"],
+                                   "cache_control": CACHE_REVALIDATE}
+
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+# ---------- servicio ----------
+def _accepted_encodings(accept_encoding: str) -> set:
+    accepted = set()
+    for token in (accept_encoding or "").split(","):
+        name, _, params = token.strip().partition(";")
+        if name and params.replace(" ", "") not in ("q=0", "q=0.0"):
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+class StaticAssetCache:
+    """Recursos y páginas precompilados, servidos desde memoria.
+
+    get_asset()/get_page() devuelven (estado, cuerpo, cabeceras) listos
+    para Flask o FastAPI, o None si el nombre no está en el manifiesto
+    (p. ej. si no se ejecutó el build: las rutas renderizan como siempre).
+    """
+
+    def __init__(self, build_dir: str = BUILD_DIR):
+        self.assets = {}
+        self.pages = {}
+        manifest_path = os.path.join(build_dir, "manifest.json")
+        if not os.path.exists(manifest_path):
+            return
+
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        for kind, target in (("assets", self.assets), ("pages", self.pages)):
+            for name, entry in manifest[kind].items():
+                target[name] = self._load(os.path.join(build_dir, kind), entry)
+
+    @staticmethod
+    def _load(directory: str, entry: dict) -> dict:
+        bodies = {}
+        for encoding, filename in entry["files"].items():
+            with open(os.path.join(directory, filename), "rb") as f:
+                bodies[encoding] = f.read()
+        # ETag fuerte distinto por codificación (son bytes distintos)
+        etags = {encoding: f'"{entry["etag"]}"' if encoding == "identity"
+                 else f'"{entry["etag"]}-{encoding}"' for encoding in bodies}
+        return {"bodies": bodies, "etags": etags, "content_type": entry["content_type"],
+                "cache_control": entry["cache_control"]}
+
+    def get_asset(self, name: str, accept_encoding: str = "", if_none_match: str = None):
+        entry = self.assets.get(name)
+        return self._respond(entry, accept_encoding, if_none_match) if entry else None
+
+    def get_page(self, name: str, accept_encoding: str = "", if_none_match: str = None):
+        entry = self.pages.get(name)
+        return self._respond(entry, accept_encoding, if_none_match) if entry else None
+
+    @staticmethod
+    def _respond(entry: dict, accept_encoding: str, if_none_match: str):
+        accepted = _accepted_encodings(accept_encoding)
+        encoding = next((e for e in ("br", "gzip") if e in entry["bodies"] and e in accepted),
+                        "identity")
+        headers = {
+            "ETag": entry["etags"][encoding],
+            "Cache-Control": entry["cache_control"],
+            "Vary": "Accept-Encoding",
+        }
+
+        if if_none_match:
+            candidates = {tag.strip() for tag in if_none_match.split(",")}
+            if "*" in candidates or candidates & set(entry["etags"].values()):
+                return 304, b"", headers
+
+        headers["Content-Type"] = entry["content_type"]
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return 200, entry["bodies"][encoding], headers
+
+
+def configure_jinja(env, build_dir: str = BUILD_DIR, auto_reload: bool = False):
+    """Plantillas minificadas primero, caché de bytecode en disco y sin recarga"""
+    from jinja2 import ChoiceLoader, FileSystemBytecodeCache, FileSystemLoader
+
+    templates_dir = os.path.join(build_dir, "templates")
+    if os.path.isdir(templates_dir):
+        env.loader = ChoiceLoader([FileSystemLoader(templates_dir), env.loader])
+
+    bytecode_dir = os.path.join(build_dir, "jinja_bytecode")
+    os.makedirs(bytecode_dir, exist_ok=True)
+    env.bytecode_cache = FileSystemBytecodeCache(bytecode_dir)
+    # Sin auto_reload Jinja no hace stat() de la plantilla en cada render
+    env.auto_reload = auto_reload
+
+
+if __name__ == "__main__":
+    manifest = build_static()
+    print(f"📦 Recursos precompilados en {BUILD_DIR}/")
+    for kind in ("assets", "pages"):
+        for name, entry in manifest[kind].items():
+            sizes = ", ".join(f"{encoding} {os.path.getsize(os.path.join(BUILD_DIR, kind, filename))} B"
+                              for encoding, filename in entry["files"].items())
+            print(f"   {name}: {sizes}")
+    if brotli is None:
+        print("ℹ️  Módulo brotli no instalado: solo variantes gzip")
@@ -0,0 +1,112 @@
+import hashlib
+import hmac
+import os
+import time
+
+# Secreto compartido por el servidor y las estaciones edge, y token de
+# administrador para el panel de seguridad (exportación, estadísticas, feed)
+STATION_SECRET_ENV = "NFC_STATION_SECRET"
+ADMIN_TOKEN_ENV = "NFC_ADMIN_TOKEN"
+
+STATION_ID_HEADER = "X-Station-ID"
+TIMESTAMP_HEADER = "X-Station-Timestamp"
+SIGNATURE_HEADER = "X-Station-Signature"
+
+# Desfase de reloj aceptado entre estación y servidor (segundos)
+MAX_CLOCK_SKEW = 300
+
+
+class StationAuthError(Exception):
+    """Petición sin firma de estación válida"""
+
+
+def _string_to_sign(method: str, path: str, query: str, timestamp: str,
+                    station_id: str, body: bytes) -> bytes:
+    # Se firma todo lo que decide la respuesta: método, ruta, parámetros y cuerpo
+    return "\n".join([method.upper(), path, query, timestamp, station_id,
+                      hashlib.sha256(body).hexdigest()]).encode()
+
+
+def _signature(secret: bytes, message: bytes) -> str:
+    return hmac.new(secret, message, hashlib.sha256).hexdigest()
+
+
+class StationSigner:
+    """Firma las peticiones de una estación edge (HMAC-SHA256 con el secreto compartido)"""
+
+    def __init__(self, station_id: str, secret: str):
+        if not secret:
+            raise ValueError("Hace falta un secreto de estación")
+        self.station_id = station_id
+        self._secret = secret.encode()
+
+    @classmethod
+    def from_env(cls, station_id: str):
+        """Firmante con el secreto de NFC_STATION_SECRET, o None si no está configurado"""
+        secret = os.environ.get(STATION_SECRET_ENV)
+        return cls(station_id, secret) if secret else None
+
+    def headers(self, method: str, path: str, query: str = "", body: bytes = b"",
+                now: float = None) -> dict:
+        """Cabeceras a añadir a la petición; 'query' es la cadena tal como se envía"""
+        timestamp = str(int(time.time() if now is None else now))
+        message = _string_to_sign(method, path, query, timestamp, self.station_id, body)
+        return {
+            STATION_ID_HEADER: self.station_id,
+            TIMESTAMP_HEADER: timestamp,
+            SIGNATURE_HEADER: _signature(self._secret, message),
+        }
+
+
+class StationVerifier:
+    """Comprueba la firma de una petición de estación en el servidor.
+
+    Sin secreto configurado falla siempre (cerrado): los endpoints de
+    sincronización sirven los verificadores de PIN y aceptan intentos
+    que acaban en el ledger, así que nunca deben quedar abiertos.
+    """
+
+    def __init__(self, secret: str = None, max_skew: float = MAX_CLOCK_SKEW):
+        self._secret = secret.encode() if secret else None
+        self.max_skew = max_skew
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        return cls(os.environ.get(STATION_SECRET_ENV), **kwargs)
+
+    @property
+    def configured(self) -> bool:
+        return self._secret is not None
+
+    def verify(self, method: str, path: str, query: str, body: bytes, headers,
+               now: float = None) -> str:
+        """Validar las cabeceras de firma; devuelve el ID de la estación o lanza StationAuthError"""
+        if self._secret is None:
+            raise StationAuthError("Autenticación de estaciones no configurada")
+
+        station_id = headers.get(STATION_ID_HEADER)
+        timestamp = headers.get(TIMESTAMP_HEADER)
+        signature = headers.get(SIGNATURE_HEADER)
+        if not (station_id and timestamp and signature):
+            raise StationAuthError("Faltan las cabeceras de firma de estación")
+
+        try:
+            skew = abs((time.time() if now is None else now) - int(timestamp))
+        except ValueError:
+            raise StationAuthError("Marca de tiempo de estación inválida") from None
+        if skew > self.max_skew:
+            raise StationAuthError("Marca de tiempo de estación fuera de la ventana permitida")
+
+        message = _string_to_sign(method, path, query, timestamp, station_id, body)
+        if not hmac.compare_digest(_signature(self._secret, message), signature):
+            raise StationAuthError("Firma de estación inválida")
+        return station_id
+
+
+def check_admin_token(authorization: str, token: str) -> bool:
+    """¿Trae la cabecera 'Authorization: Bearer <token>' el token de administrador?"""
+    if not (token and authorization):
+        return False
+    scheme, _, value = authorization.partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(value.strip().encode(),
+                                                              token.encode())
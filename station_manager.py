@@ -0,0 +1,111 @@
+import logging
+import queue
+import threading
+from collections import namedtuple
+
+from card_monitor import CardPresenceMonitor
+
+logger = logging.getLogger(__name__)
+
+# Lectura de tarjeta etiquetada con su lector y su estación
+StationTap = namedtuple("StationTap", ["uid", "reader", "device_id", "timestamp"])
+
+
+class ReaderStationManager:
+    """Atiende todos los lectores conectados al host a la vez.
+
+    Un único bucle de cambios de estado PC/SC vigila todos los lectores
+    (y los que se conectan en caliente). Cada lector tiene su propio hilo
+    trabajador con su cola, así una autenticación lenta en una puerta no
+    retrasa a las demás: el throughput crece con el número de lectores.
+
+    device_ids: {nombre_lector: device_id}. Los lectores sin entrada reciben
+    "<device_prefix>-NN" en orden de aparición, estable mientras corre el proceso.
+    """
+
+    def __init__(self, on_tap, backend=None, device_ids: dict = None,
+                 device_prefix: str = "ACR122U-STATION", on_removed=None,
+                 poll_timeout: float = 1.0):
+        self.on_tap = on_tap
+        self.on_removed = on_removed
+        self.device_ids = dict(device_ids or {})
+        self.device_prefix = device_prefix
+
+        self.monitor = CardPresenceMonitor(backend, poll_timeout=poll_timeout, hotplug=True)
+        self._workers = {}
+        self._lock = threading.Lock()
+        self._next_station = len(self.device_ids) + 1
+
+    def device_id_for(self, reader: str) -> str:
+        with self._lock:
+            if reader not in self.device_ids:
+                self.device_ids[reader] = f"{self.device_prefix}-{self._next_station:02d}"
+                self._next_station += 1
+            return self.device_ids[reader]
+
+    # ---------- trabajadores por lector ----------
+    def _start_worker(self, reader: str):
+        with self._lock:
+            if reader in self._workers:
+                return
+            tasks = queue.Queue()
+            thread = threading.Thread(target=self._work, args=(reader, tasks),
+                                      name=f"reader-{reader}", daemon=True)
+            self._workers[reader] = (thread, tasks)
+        thread.start()
+        logger.info("🔌 Lector conectado: %s (%s)", reader, self.device_id_for(reader))
+
+    def _stop_worker(self, reader: str):
+        with self._lock:
+            worker = self._workers.pop(reader, None)
+        if worker is not None:
+            worker[1].put(None)
+            logger.info("🔌 Lector desconectado: %s", reader)
+
+    def _work(self, reader: str, tasks: queue.Queue):
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            handler, tap = task
+            if handler is None:
+                continue
+            try:
+                handler(tap)
+            except Exception as e:
+                logger.warning("⚠️  Error atendiendo %s: %s", tap.device_id, e)
+
+    def _dispatch(self, event):
+        if event.kind == "reader_added":
+            self._start_worker(event.reader)
+            return
+        if event.kind == "reader_removed":
+            self._stop_worker(event.reader)
+            return
+
+        self._start_worker(event.reader)
+        tap = StationTap(event.uid, event.reader, self.device_id_for(event.reader), event.timestamp)
+        handler = self.on_tap if event.kind == "inserted" else self.on_removed
+        with self._lock:
+            worker = self._workers.get(event.reader)
+        if worker is not None:
+            worker[1].put((handler, tap))
+
+    # ---------- ciclo de vida ----------
+    def start(self):
+        for reader in list(self.monitor.readers):
+            self._start_worker(reader)
+        self.monitor.start(on_event=self._dispatch)
+
+    def stop(self):
+        self.monitor.stop()
+
+        with self._lock:
+            workers, self._workers = self._workers, {}
+        for thread, tasks in workers.values():
+            tasks.put(None)
+            thread.join()
+
+    def readers(self):
+        with self._lock:
+            return list(self._workers)
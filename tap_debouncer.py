@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import namedtuple
+
+# kind: "inserted" | "removed" | "reader_added" | "reader_removed"
+CardEvent = namedtuple("CardEvent", ["kind", "reader", "uid", "timestamp"])
+
+
+class _ReaderState:
+    __slots__ = ("uid", "lost_at")
+
+    def __init__(self):
+        self.uid = None
+        self.lost_at = None
+
+
+class TapDebouncer:
+    """Antirrebote de lecturas por lector.
+
+    Mientras una tarjeta sigue sobre el lector, las lecturas repetidas del
+    mismo UID se descartan: solo se emite un "inserted" al llegar y un
+    "removed" al retirarla. Si la tarjeta deja de leerse y vuelve antes de
+    'hold_off' segundos (parpadeo de RF, tarjeta que se mueve), se trata
+    como la misma presencia y no se emite nada.
+    """
+
+    def __init__(self, hold_off: float = 0.75):
+        self.hold_off = hold_off
+        self._readers = {}
+        self._lock = threading.Lock()
+        self.arrivals = 0
+        self.removals = 0
+        self.suppressed = 0
+
+    def _state(self, reader: str) -> _ReaderState:
+        state = self._readers.get(reader)
+        if state is None:
+            state = self._readers[reader] = _ReaderState()
+        return state
+
+    def seen(self, reader: str, uid: str, now: float = None):
+        """Se leyó 'uid' en 'reader'; devuelve los CardEvent a emitir"""
+        now = time.monotonic() if now is None else now
+        events = []
+
+        with self._lock:
+            state = self._state(reader)
+            if state.uid == uid:
+                # Misma tarjeta aún presente (o vuelve dentro del hold-off)
+                state.lost_at = None
+                self.suppressed += 1
+                return events
+
+            if state.uid is not None:
+                # Otra tarjeta distinta: la anterior se retiró
+                events.append(CardEvent("removed", reader, state.uid, now))
+                self.removals += 1
+
+            state.uid = uid
+            state.lost_at = None
+            events.append(CardEvent("inserted", reader, uid, now))
+            self.arrivals += 1
+        return events
+
+    def lost(self, reader: str, now: float = None):
+        """El lector dejó de ver tarjeta; empieza la ventana de hold-off"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            state = self._readers.get(reader)
+            if state is not None and state.uid is not None and state.lost_at is None:
+                state.lost_at = now
+
+    def forget(self, reader: str, now: float = None):
+        """El lector desapareció: retirar su tarjeta sin esperar el hold-off"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            state = self._readers.pop(reader, None)
+            if state is None or state.uid is None:
+                return []
+            self.removals += 1
+            return [CardEvent("removed", reader, state.uid, now)]
+
+    def expire(self, now: float = None):
+        """Emitir "removed" de las tarjetas ausentes durante más de hold_off"""
+        now = time.monotonic() if now is None else now
+        events = []
+
+        with self._lock:
+            for reader, state in self._readers.items():
+                if state.lost_at is not None and now - state.lost_at >= self.hold_off:
+                    events.append(CardEvent("removed", reader, state.uid, now))
+                    self.removals += 1
+                    state.uid = None
+                    state.lost_at = None
+        return events
+
+    def next_deadline(self):
+        """Instante (monotonic) del próximo "removed" pendiente, o None"""
+        with self._lock:
+            pending = [s.lost_at + self.hold_off for s in self._readers.values()
+                       if s.lost_at is not None]
+        return min(pending) if pending else None
+
+    def current_uid(self, reader: str):
+        with self._lock:
+            state = self._readers.get(reader)
+            return state.uid if state else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'arrivals': self.arrivals,
+                'removals': self.removals,
+                'suppressed': self.suppressed,
+            }
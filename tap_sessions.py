@@ -0,0 +1,76 @@
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from user_cache import normalize_nfc_id
+
+
+class TapSessionStore:
+    """Lecturas de tarjeta a la espera del PIN (/tap -> /authenticate).
+
+    /tap resuelve una vez el usuario y el verificador del PIN y abre una
+    sesión con un reto aleatorio de un solo uso, ligado a la tarjeta y al
+    dispositivo que la leyó. /authenticate (o /verify_pin) consume el reto
+    y verifica el PIN contra lo ya resuelto, sin volver a leer nfc_users.
+    Las sesiones caducan a los 'ttl' segundos y se guardan como mucho
+    'max_sessions' (se olvidan las más antiguas). Viven en memoria, como
+    los límites de intentos: con varios workers el reto solo vale en el
+    proceso que lo emitió.
+    """
+
+    def __init__(self, ttl: float = 60.0, max_sessions: int = 10_000):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        # reto -> (caducidad, nfc_id, device_id, usuario, verificador del PIN);
+        # con TTL fijo, el orden de inserción es el de caducidad
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.rejected = 0
+
+    def open(self, nfc_id: str, device_id: str, user: dict, pin_hash: str,
+             now: float = None) -> str:
+        """Abrir una sesión para la tarjeta leída; devuelve el reto"""
+        now = time.monotonic() if now is None else now
+        challenge = secrets.token_urlsafe(16)
+
+        with self._lock:
+            self._expire(now)
+            self._sessions[challenge] = (now + self.ttl, normalize_nfc_id(nfc_id), device_id,
+                                         user, pin_hash)
+            if len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            self.opened += 1
+        return challenge
+
+    def consume(self, challenge: str, nfc_id: str, device_id: str, now: float = None):
+        """(usuario, verificador) de la sesión, o None si el reto no vale.
+
+        El reto se gasta aunque no coincidan tarjeta o dispositivo: un reto
+        capturado no se puede probar contra otra tarjeta.
+        """
+        now = time.monotonic() if now is None else now
+
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.pop(challenge, None)
+            if session is None or session[1:3] != (normalize_nfc_id(nfc_id), device_id):
+                self.rejected += 1
+                return None
+        return session[3], session[4]
+
+    def _expire(self, now: float):
+        while self._sessions:
+            challenge, session = next(iter(self._sessions.items()))
+            if session[0] > now:
+                return
+            del self._sessions[challenge]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'opened': self.opened,
+                'rejected': self.rejected,
+                'sessions': len(self._sessions),
+            }
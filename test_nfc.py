@@ -1,4 +1,5 @@
 from acr122u_reader import ACR122UReader
+from observability import setup_logging
 import time
 
 def test_acr122u():
@@ -36,6 +37,7 @@ def test_acr122u():
         print("4. Prueba en otro puerto USB")
 
 if __name__ == "__main__":
+    setup_logging()
     test_acr122u()
     
     # Mantener la ventana abierta
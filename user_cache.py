@@ -0,0 +1,80 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_nfc_id(nfc_id: str) -> str:
+    """UID canónico: sin espacios ni ':' y en mayúsculas ("a0 f9:00 1e" -> "A0F9001E")"""
+    return nfc_id.replace(" ", "").replace(":", "").strip().upper()
+
+
+class UserCache:
+    """Caché LRU con TTL para las filas de nfc_users.
+
+    También guarda búsquedas negativas (tarjetas no registradas o
+    inactivas) para que una ráfaga de lecturas de la misma tarjeta
+    desconocida no llegue a SQLite. El TTL acota cuánto tiempo otro
+    proceso puede ver datos obsoletos; dentro del proceso, las escrituras
+    invalidan la entrada explícitamente.
+    """
+
+    # Marcador para distinguir "no está en caché" de "tarjeta desconocida"
+    MISSING = object()
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300.0,
+                 negative_ttl: float = 30.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, nfc_id: str):
+        """Devuelve el usuario (o None si se cacheó como desconocido), o UserCache.MISSING"""
+        key = normalize_nfc_id(nfc_id)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                user, expires_at = entry
+                if now < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return user
+                del self._entries[key]
+
+            self.misses += 1
+            return self.MISSING
+
+    def put(self, nfc_id: str, user):
+        ttl = self.ttl if user is not None else self.negative_ttl
+        key = normalize_nfc_id(nfc_id)
+
+        with self._lock:
+            self._entries[key] = (user, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, nfc_id: str):
+        with self._lock:
+            self._entries.pop(normalize_nfc_id(nfc_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+            }